@@ -0,0 +1,135 @@
+"""转换热点路径基准测试
+
+用法:
+
+    python3 benchmarks/bench_convert.py                                  # 运行并写出结果
+    python3 benchmarks/bench_convert.py --save-baseline                  # 将本次结果保存为基线
+    python3 benchmarks/bench_convert.py --baseline benchmarks/baseline_convert.json --threshold 0.25
+"""
+
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+import click
+
+from harness import BENCHMARKS_DIR, finish, measure, write_results
+import corpus
+
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline_convert.json"
+
+
+def run_benchmarks(work_dir: Path, repeat: int, only: str = "") -> list:
+    from converters import StyleManager, WechatHTMLBuilder
+    from covers.template_maker import TemplateCoverGenerator
+    from parsers.markdown import MarkdownParser
+    from parsers.pdf import PDFParser
+    from parsers.word import WordParser
+
+    results = []
+
+    def selected(name: str) -> bool:
+        return not only or only in name
+
+    md_parser = MarkdownParser()
+    style_manager = StyleManager()
+    builder = WechatHTMLBuilder()
+
+    print("Markdown:")
+    for name in corpus.MARKDOWN_CORPORA:
+        path = corpus.write_markdown(work_dir, name)
+        size = path.stat().st_size
+        parsed = md_parser.parse(path)
+
+        if selected(f"markdown.parse.{name}"):
+            results.append(
+                measure(f"markdown.parse.{name}", lambda: md_parser.parse(path), repeat, bytes=size)
+            )
+        if selected(f"style.inline.{name}"):
+            results.append(
+                measure(
+                    f"style.inline.{name}",
+                    lambda: style_manager.apply_inline_styles(parsed.content),
+                    repeat,
+                    bytes=len(parsed.content),
+                )
+            )
+        if selected(f"builder.build.{name}"):
+            results.append(measure(f"builder.build.{name}", lambda: builder.build(parsed), repeat))
+
+    print("\n封面:")
+    cover_gen = TemplateCoverGenerator()
+    titles = {
+        "short": "短标题",
+        "long": "一个非常非常长的中文标题用来测试自动换行与字号自适应在封面渲染中的开销" * 2,
+    }
+    for name, title in titles.items():
+        if selected(f"cover.generate.{name}"):
+            output = work_dir / f"cover_{name}"
+            results.append(
+                measure(
+                    f"cover.generate.{name}",
+                    lambda: cover_gen.generate(title, "", output_path=output),
+                    repeat,
+                )
+            )
+
+    print("\n文档:")
+    if selected("word.parse.large"):
+        docx_path = corpus.write_large_docx(work_dir / "large.docx")
+        word_parser = WordParser()
+        results.append(
+            measure(
+                "word.parse.large",
+                lambda: word_parser.parse(docx_path),
+                max(1, repeat // 2),
+                bytes=docx_path.stat().st_size,
+            )
+        )
+    if selected("pdf.parse.large"):
+        pdf_path = corpus.write_large_pdf(work_dir / "large.pdf")
+        pdf_parser = PDFParser(image_dir=work_dir / "pdf_images")
+        results.append(
+            measure(
+                "pdf.parse.large",
+                lambda: pdf_parser.parse(pdf_path),
+                max(1, repeat // 2),
+                bytes=pdf_path.stat().st_size,
+            )
+        )
+
+    return results
+
+
+@click.command()
+@click.option("--repeat", default=5, help="每项重复次数")
+@click.option(
+    "--output", type=click.Path(dir_okay=False), help="结果 JSON 路径，默认写入 benchmarks/results/"
+)
+@click.option(
+    "--baseline", type=click.Path(dir_okay=False), help="基线 JSON，超过阈值时以非零状态退出"
+)
+@click.option("--threshold", default=0.25, help="允许的回退比例（0.25 表示慢 25%）")
+@click.option("--save-baseline", is_flag=True, help=f"将结果保存为基线 ({DEFAULT_BASELINE.name})")
+@click.option("--only", default="", help="只运行名称包含该字符串的项目")
+def main(repeat: int, output: str, baseline: str, threshold: float, save_baseline: bool, only: str):
+    """转换热点路径基准测试"""
+    # 基准测试期间关闭 INFO 日志，避免 I/O 干扰计时
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="mp-bench-") as tmp:
+        results = run_benchmarks(Path(tmp), repeat, only)
+
+    if save_baseline:
+        write_results(DEFAULT_BASELINE, "convert", results)
+        return
+
+    output_path = Path(output) if output else BENCHMARKS_DIR / "results" / "convert.json"
+    sys.exit(
+        finish(results, "convert", output_path, Path(baseline) if baseline else None, threshold)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""端到端发布基准测试 - 针对本地模拟微信 API 运行 publish 与 upload-images
+
+用法:
+
+    python3 benchmarks/bench_publish.py                          # 运行全部场景
+    python3 benchmarks/bench_publish.py --latency-ms 100 --images 40
+    python3 benchmarks/bench_publish.py --only publish.warm      # 只运行名称包含该字符串的场景
+    python3 benchmarks/bench_publish.py --baseline benchmarks/baseline_publish.json
+"""
+
+import logging
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import click
+from click.testing import CliRunner
+
+from harness import BENCHMARKS_DIR, BenchResult, finish, measure, write_results
+from mock_wechat import MockSettings, MockWechatServer
+import corpus
+
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline_publish.json"
+
+
+@dataclass
+class Scenario:
+    """一个基准场景：模拟服务器行为 + CLI 环境变量"""
+
+    name: str
+    settings: MockSettings
+    env: Dict[str, str] = field(default_factory=dict)
+    warm: bool = False  # 复用缓存目录（首轮预热后缓存命中）
+
+
+def write_article(directory: Path, base_url: str, images: int) -> Path:
+    """生成一篇引用远程图片（由模拟服务器提供）的文章"""
+    directory.mkdir(parents=True, exist_ok=True)
+    parts = ["# 发布基准文章", ""]
+    for i in range(images):
+        parts += [
+            f"## 第 {i} 节",
+            "",
+            corpus.PARAGRAPH,
+            "",
+            f"![插图 {i}]({base_url}/mock-images/figure-{i}.png)",
+            "",
+        ]
+    path = directory / "article.md"
+    path.write_text("\n".join(parts), encoding="utf-8")
+    return path
+
+
+def write_images(directory: Path, count: int) -> Path:
+    """生成待批量上传的本地图片"""
+    from PIL import Image
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        Image.new("RGB", (800, 600), (i * 37 % 256, i * 59 % 256, i * 83 % 256)).save(
+            directory / f"img_{i:03d}.png"
+        )
+    return directory
+
+
+@contextmanager
+def cli_environment(work_dir: Path, server: MockWechatServer, extra: Dict[str, str]):
+    """将 CLI 指向模拟服务器，输出与缓存写入 work_dir（结束时恢复环境变量和工作目录）"""
+    env = {
+        "WECHAT_APP_ID": server.state.settings.app_id,
+        "WECHAT_APP_SECRET": server.state.settings.app_secret,
+        "WECHAT_API_BASE_URL": server.base_url,
+        "OUTPUT_DIR": str(work_dir / "output"),
+        "TEMP_DIR": str(work_dir / "temp"),
+        "CACHE_DIR": str(work_dir / "cache"),
+        "LOG_LEVEL": "WARNING",
+        **extra,
+    }
+    saved = {key: os.environ.get(key) for key in env}
+    cwd = os.getcwd()
+    os.environ.update(env)
+    os.chdir(work_dir)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def invoke(args: List[str]) -> bool:
+    """在进程内运行 CLI 命令，返回是否成功（错误注入场景下封面上传也可能失败）"""
+    from cli import main
+
+    result = CliRunner().invoke(main, ["--env", os.devnull, *args])
+    if result.exception and not isinstance(result.exception, SystemExit):
+        raise result.exception
+    return result.exit_code == 0
+
+
+def run_scenario(
+    scenario: Scenario, work_dir: Path, repeat: int, images: int, command: str
+) -> BenchResult:
+    """在独立的模拟服务器上运行一个场景"""
+    with MockWechatServer(scenario.settings) as server:
+        case_dir = work_dir / scenario.name
+        article = write_article(case_dir / "source", server.base_url, images)
+        image_dir = (
+            write_images(case_dir / "images", images) if command == "upload-images" else None
+        )
+        runs = [0]
+        failures = [0]
+
+        def run():
+            # 冷缓存场景每轮使用新的缓存目录
+            run_dir = case_dir if scenario.warm else case_dir / f"run_{runs[0]}"
+            runs[0] += 1
+            run_dir.mkdir(parents=True, exist_ok=True)
+            with cli_environment(run_dir, server, scenario.env):
+                if command == "publish":
+                    ok = invoke(["publish", str(article)])
+                else:
+                    ok = invoke(["upload-images", str(image_dir), "--pattern", "*.png"])
+            if not ok:
+                failures[0] += 1
+
+        result = measure(scenario.name, run, repeat, images=images)
+        summary = server.state.summary()
+
+    # 每轮（含预热）平均的 API 调用次数与错误
+    total_runs = runs[0]
+    result.extra.update(
+        latency_ms=scenario.settings.latency_ms,
+        api_calls_per_run=round(sum(summary["calls"].values()) / total_runs, 1),
+        api_errors=summary["errors"],
+        failed_runs=failures[0],
+        bytes_per_run=summary["bytes_received"] // total_runs,
+        images_per_second=(
+            round(images / (result.median_ms / 1000), 2) if result.median_ms else None
+        ),
+    )
+    return result
+
+
+def scenarios(latency_ms: float, image_latency_ms: float, error_rate: float) -> List[Scenario]:
+    def settings(**kwargs) -> MockSettings:
+        return MockSettings(latency_ms=latency_ms, image_latency_ms=image_latency_ms, **kwargs)
+
+    return [
+        # 下载并发：串行 vs 默认并发
+        Scenario(
+            "publish.cold.download1", settings(), {"DOWNLOAD_WORKERS": "1", "IMAGE_WORKERS": "1"}
+        ),
+        Scenario(
+            "publish.cold.download8", settings(), {"DOWNLOAD_WORKERS": "8", "IMAGE_WORKERS": "4"}
+        ),
+        # 缓存：第二次发布时下载、优化与解析缓存全部命中
+        Scenario("publish.warm", settings(), warm=True),
+        # 限流与错误注入下的吞吐（上传失败的图片保留原链接）
+        Scenario("publish.rate_limited", settings(rate_limits={"upload_media": 20})),
+        Scenario("publish.upload_errors", settings(errors={"upload_media": (error_rate, -1)})),
+        Scenario("upload_images.batch", settings()),
+    ]
+
+
+@click.command()
+@click.option("--repeat", default=3, help="每个场景重复次数")
+@click.option("--images", default=20, help="每篇文章/每批上传的图片数")
+@click.option("--latency-ms", default=20.0, help="模拟 API 延迟")
+@click.option("--image-latency-ms", default=20.0, help="模拟远程图片下载延迟")
+@click.option("--error-rate", default=0.1, help="upload_errors 场景中上传接口的出错概率")
+@click.option(
+    "--output", type=click.Path(dir_okay=False), help="结果 JSON 路径，默认写入 benchmarks/results/"
+)
+@click.option(
+    "--baseline", type=click.Path(dir_okay=False), help="基线 JSON，超过阈值时以非零状态退出"
+)
+@click.option("--threshold", default=0.25, help="允许的回退比例（0.25 表示慢 25%）")
+@click.option("--save-baseline", is_flag=True, help=f"将结果保存为基线 ({DEFAULT_BASELINE.name})")
+@click.option("--only", default="", help="只运行名称包含该字符串的场景")
+def main(
+    repeat: int,
+    images: int,
+    latency_ms: float,
+    image_latency_ms: float,
+    error_rate: float,
+    output: str,
+    baseline: str,
+    threshold: float,
+    save_baseline: bool,
+    only: str,
+):
+    """端到端发布基准测试"""
+    logging.basicConfig(level=logging.WARNING)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="mp-bench-publish-") as tmp:
+        print(
+            f"发布链路（API 延迟 {latency_ms}ms，图片延迟 {image_latency_ms}ms，{images} 张图片）:"
+        )
+        for scenario in scenarios(latency_ms, image_latency_ms, error_rate):
+            if only and only not in scenario.name:
+                continue
+            command = "upload-images" if scenario.name.startswith("upload_images") else "publish"
+            results.append(run_scenario(scenario, Path(tmp), repeat, images, command))
+
+    if save_baseline:
+        write_results(DEFAULT_BASELINE, "publish", results)
+        return
+
+    output_path = Path(output) if output else BENCHMARKS_DIR / "results" / "publish.json"
+    sys.exit(
+        finish(results, "publish", output_path, Path(baseline) if baseline else None, threshold)
+    )
+
+
+if __name__ == "__main__":
+    main()
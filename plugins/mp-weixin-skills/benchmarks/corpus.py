@@ -0,0 +1,128 @@
+"""基准测试语料 - 运行时生成，不随仓库提交大文件"""
+
+import random
+from pathlib import Path
+
+# 固定随机种子，保证每次生成的语料一致
+SEED = 20240601
+
+PARAGRAPH = (
+    "微信公众号文章发布工具将 Markdown、Word 与 PDF 文档转换为符合公众号排版要求的 HTML，"
+    "支持 **加粗**、*斜体*、`行内代码` 与 [链接](https://example.com/article)。"
+)
+
+
+def small_markdown() -> str:
+    """一篇普通长度的文章（约 2KB）"""
+    parts = ["# 小型文章", ""]
+    for i in range(1, 4):
+        parts += [f"## 第 {i} 节", "", PARAGRAPH, "", f"- 要点 {i}.1", f"- 要点 {i}.2", ""]
+    return "\n".join(parts)
+
+
+def large_markdown(sections: int = 400) -> str:
+    """长文（约 1MB），混合标题、段落、列表、引用与图片"""
+    rng = random.Random(SEED)
+    parts = ["# 大型文章", ""]
+    for i in range(sections):
+        parts += [f"## 章节 {i}", ""]
+        for _ in range(rng.randint(3, 6)):
+            parts += [PARAGRAPH * rng.randint(1, 3), ""]
+        parts += [f"> 引用 {i}：{PARAGRAPH}", ""]
+        parts += [f"1. 步骤 {i}.{j}" for j in range(1, 5)] + [""]
+        parts += [f"![插图 {i}](images/figure-{i % 20}.png)", ""]
+    return "\n".join(parts)
+
+
+def pathological_markdown() -> str:
+    """病态输入：深层嵌套、超长行、大量未闭合的强调与转义字符"""
+    parts = ["# 病态文档", ""]
+    parts += [">" * 40 + " 深层引用", ""]
+    parts += ["  " * depth + "- 嵌套列表" for depth in range(60)] + [""]
+    parts += ["**" * 2000 + "未闭合" + "_" * 2000, ""]
+    parts += ["超长行" * 20000, ""]
+    parts += ["<>&\"'" * 5000, ""]
+    parts += ["[" * 3000 + "链接" + "]" * 3000 + "(http://x)", ""]
+    return "\n".join(parts)
+
+
+def table_heavy_markdown(tables: int = 80, rows: int = 40) -> str:
+    """大量表格"""
+    parts = ["# 表格文档", ""]
+    for t in range(tables):
+        parts += [f"## 表 {t}", "", "| 名称 | 数值 | 说明 | 状态 |", "| --- | ---: | --- | :---: |"]
+        parts += [f"| 项目 {r} | {r * t} | **说明** {r} | ✅ |" for r in range(rows)]
+        parts.append("")
+    return "\n".join(parts)
+
+
+def code_heavy_markdown(blocks: int = 200) -> str:
+    """大量代码块"""
+    code = "\n".join(
+        f"    result_{i} = compute(value_{i}, factor={i}) # 注释 <tag> & {i}" for i in range(30)
+    )
+    parts = ["# 代码文档", ""]
+    for b in range(blocks):
+        parts += [f"### 示例 {b}", "", "```python", f"def example_{b}():", code, "```", ""]
+    return "\n".join(parts)
+
+
+MARKDOWN_CORPORA = {
+    "small": small_markdown,
+    "large": large_markdown,
+    "pathological": pathological_markdown,
+    "tables": table_heavy_markdown,
+    "code": code_heavy_markdown,
+}
+
+
+def write_markdown(directory: Path, name: str) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.md"
+    path.write_text(MARKDOWN_CORPORA[name](), encoding="utf-8")
+    return path
+
+
+def write_large_docx(path: Path, paragraphs: int = 5000) -> Path:
+    """大型 Word 文档：标题、格式化段落、列表与表格"""
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading("大型 Word 文档", level=1)
+    for i in range(paragraphs):
+        if i % 100 == 0:
+            doc.add_heading(f"章节 {i // 100}", level=2)
+        para = doc.add_paragraph(f"段落 {i}：")
+        para.add_run("加粗内容").bold = True
+        para.add_run(PARAGRAPH)
+        if i % 50 == 0:
+            doc.add_paragraph(f"列表项 {i}", style="List Bullet")
+        if i % 500 == 0:
+            table = doc.add_table(rows=10, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = "单元格"
+    doc.save(path)
+    return path
+
+
+def write_large_pdf(path: Path, pages: int = 100) -> Path:
+    """大型 PDF：每页一个标题和若干正文段落"""
+    import fitz
+
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 60), f"第 {p + 1} 章", fontname="china-s", fontsize=20)
+        y = 100
+        for i in range(12):
+            page.insert_text(
+                (50, y),
+                f"正文段落 {i} 第一行内容\n正文段落 {i} 第二行内容",
+                fontname="china-s",
+                fontsize=11,
+            )
+            y += 50
+    doc.save(path)
+    doc.close()
+    return path
@@ -0,0 +1,112 @@
+"""基准测试公共工具 - 计时、结果记录与基线比较"""
+
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = BENCHMARKS_DIR.parent / "scripts"
+
+# 与 `python3 scripts/cli.py` 相同的导入方式
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+@dataclass
+class BenchResult:
+    """单项基准结果（毫秒）"""
+
+    name: str
+    repeat: int
+    min_ms: float
+    median_ms: float
+    mean_ms: float
+    max_ms: float
+    extra: Dict = field(default_factory=dict)
+
+
+def measure(
+    name: str, func: Callable[[], object], repeat: int = 5, warmup: int = 1, **extra
+) -> BenchResult:
+    """重复执行 func 并统计耗时，预热轮次不计入"""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    result = BenchResult(
+        name=name,
+        repeat=repeat,
+        min_ms=round(min(samples), 3),
+        median_ms=round(statistics.median(samples), 3),
+        mean_ms=round(statistics.fmean(samples), 3),
+        max_ms=round(max(samples), 3),
+        extra=extra,
+    )
+    print(f"  {name:<40} median {result.median_ms:>10.2f}ms  min {result.min_ms:>10.2f}ms")
+    return result
+
+
+def write_results(path: Path, suite: str, results: List[BenchResult]):
+    """写出结果 JSON"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "suite": suite,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [asdict(result) for result in results],
+    }
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n结果已写入: {path}")
+
+
+def compare_baseline(
+    results: List[BenchResult], baseline_path: Path, threshold: float
+) -> List[str]:
+    """与基线比较，返回超过阈值的回退描述（基线中没有的项目跳过）"""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    expected = {item["name"]: item for item in baseline["results"]}
+
+    regressions = []
+    for result in results:
+        base: Optional[Dict] = expected.get(result.name)
+        if not base or base["median_ms"] <= 0:
+            continue
+        ratio = result.median_ms / base["median_ms"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{result.name}: {base['median_ms']:.2f}ms -> {result.median_ms:.2f}ms (+{(ratio - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def finish(
+    results: List[BenchResult], suite: str, output: Path, baseline: Optional[Path], threshold: float
+) -> int:
+    """写出结果并与基线比较，返回进程退出码"""
+    write_results(output, suite, results)
+    if baseline is None:
+        return 0
+    if not baseline.exists():
+        print(f"⚠️  基线文件不存在，跳过比较: {baseline}")
+        return 0
+
+    regressions = compare_baseline(results, baseline, threshold)
+    if regressions:
+        print(f"\n❌ 以下项目超过基线 {threshold * 100:.0f}%:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print(f"\n✅ 未超过基线阈值 ({threshold * 100:.0f}%)")
+    return 0
@@ -0,0 +1,328 @@
+"""本地模拟微信 API 服务器 - 用于离线测量发布链路吞吐
+
+实现 token、add_material、draft add/get/update 接口，可配置延迟、错误码注入和限流；
+另外提供 /mock-images/<name>.png 作为远程图片源，用于测量下载并发与缓存。
+
+    python3 benchmarks/mock_wechat.py --port 8801 --latency-ms 50
+    WECHAT_API_BASE_URL=http://127.0.0.1:8801 python3 scripts/cli.py publish article.md
+"""
+
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import click
+
+ENDPOINTS = {
+    "/cgi-bin/token": "token",
+    "/cgi-bin/material/add_material": "upload_media",
+    "/cgi-bin/draft/add": "upload_draft",
+    "/cgi-bin/draft/get": "get_draft",
+    "/cgi-bin/draft/update": "update_draft",
+}
+
+# 微信常见错误码
+ERRCODE_INVALID_TOKEN = 40001
+ERRCODE_DAILY_QUOTA = 45009
+ERRCODE_RATE_LIMIT = 45011
+ERRCODE_NOT_FOUND = 40007
+
+
+@dataclass
+class MockSettings:
+    """模拟服务器行为"""
+
+    app_id: str = "wx-mock"
+    app_secret: str = "mock-secret"
+    latency_ms: float = 0.0  # 每个请求的固定延迟
+    jitter_ms: float = 0.0  # 额外的随机延迟上限
+    image_latency_ms: float = 0.0  # 远程图片源的延迟
+    # 按接口注入错误: {接口: (概率, errcode)}
+    errors: Dict[str, Tuple[float, int]] = field(default_factory=dict)
+    # 按接口限流: {接口: 每秒请求数}，超出返回 45011
+    rate_limits: Dict[str, float] = field(default_factory=dict)
+    # 按接口的总调用配额，超出返回 45009
+    quotas: Dict[str, int] = field(default_factory=dict)
+    # 返回 HTTP 503 的概率（用于验证重试）
+    http_error_rate: float = 0.0
+    # 获取新 token 时作废之前的 token（与微信一致：其他进程刷新后旧 token 返回 40001）
+    rotate_tokens: bool = False
+    seed: int = 0
+
+
+class MockWechatState:
+    """服务器状态与统计（线程安全）"""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.rng = random.Random(settings.seed)
+        self.tokens = set()
+        self.media: Dict[str, int] = {}
+        self.drafts: Dict[str, list] = {}
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.bytes_received = 0
+        self._windows: Dict[str, Deque[float]] = {}
+        self._images: Dict[str, bytes] = {}
+
+    def check_limits(self, endpoint: str) -> Optional[int]:
+        """返回应注入的 errcode，无需注入时返回 None"""
+        settings = self.settings
+        with self.lock:
+            self.calls[endpoint] += 1
+
+            quota = settings.quotas.get(endpoint)
+            if quota is not None and self.calls[endpoint] > quota:
+                return ERRCODE_DAILY_QUOTA
+
+            rate = settings.rate_limits.get(endpoint)
+            if rate:
+                now = time.monotonic()
+                window = self._windows.setdefault(endpoint, deque())
+                while window and now - window[0] > 1.0:
+                    window.popleft()
+                if len(window) >= rate:
+                    return ERRCODE_RATE_LIMIT
+                window.append(now)
+
+            error = settings.errors.get(endpoint)
+            if error and self.rng.random() < error[0]:
+                return error[1]
+        return None
+
+    def image(self, name: str) -> bytes:
+        """按名称生成并缓存一张 PNG"""
+        with self.lock:
+            data = self._images.get(name)
+        if data is None:
+            from PIL import Image
+
+            seed = sum(name.encode())
+            buffer = io.BytesIO()
+            Image.new("RGB", (640, 360), (seed % 256, (seed * 7) % 256, (seed * 13) % 256)).save(
+                buffer, "PNG"
+            )
+            data = buffer.getvalue()
+            with self.lock:
+                self._images[name] = data
+        return data
+
+    def summary(self) -> Dict:
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "errors": dict(self.errors),
+                "bytes_received": self.bytes_received,
+                "media": len(self.media),
+                "drafts": len(self.drafts),
+            }
+
+
+class MockWechatHandler(BaseHTTPRequestHandler):
+    """请求处理"""
+
+    server: "MockWechatServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/mock-images/"):
+            self._serve_image(url.path.rsplit("/", 1)[-1])
+            return
+        self._dispatch(url)
+
+    def do_POST(self):
+        self._dispatch(urlparse(self.path))
+
+    def _dispatch(self, url):
+        state = self.server.state
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with state.lock:
+            state.bytes_received += len(body)
+
+        endpoint = ENDPOINTS.get(url.path)
+        if endpoint is None:
+            self._send_json({"errcode": 404, "errmsg": "not found"}, status=404)
+            return
+
+        self._delay(state.settings.latency_ms, state.settings.jitter_ms)
+
+        if state.settings.http_error_rate and state.rng.random() < state.settings.http_error_rate:
+            self._send_json({"errcode": -1, "errmsg": "system busy"}, status=503)
+            return
+
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        errcode = state.check_limits(endpoint)
+        if (
+            errcode is None
+            and endpoint != "token"
+            and query.get("access_token") not in state.tokens
+        ):
+            errcode = ERRCODE_INVALID_TOKEN
+        if errcode is not None:
+            with state.lock:
+                state.errors[f"{endpoint}:{errcode}"] += 1
+            self._send_json({"errcode": errcode, "errmsg": f"mock error {errcode}"})
+            return
+
+        handler = getattr(self, f"_handle_{endpoint}")
+        self._send_json(handler(query, body))
+
+    def _handle_token(self, query, body):
+        settings = self.server.state.settings
+        if query.get("appid") != settings.app_id or query.get("secret") != settings.app_secret:
+            return {"errcode": 40125, "errmsg": "invalid appsecret"}
+        token = uuid.uuid4().hex
+        with self.server.state.lock:
+            if settings.rotate_tokens:
+                self.server.state.tokens.clear()
+            self.server.state.tokens.add(token)
+        return {"access_token": token, "expires_in": 7200}
+
+    def _handle_upload_media(self, query, body):
+        media_id = uuid.uuid4().hex
+        with self.server.state.lock:
+            self.server.state.media[media_id] = len(body)
+        return {"media_id": media_id, "url": f"http://mmbiz.qpic.cn/mock/{media_id}/0"}
+
+    def _handle_upload_draft(self, query, body):
+        payload = json.loads(body or b"{}")
+        media_id = uuid.uuid4().hex
+        with self.server.state.lock:
+            self.server.state.drafts[media_id] = payload.get("articles", [])
+        return {"media_id": media_id}
+
+    def _handle_get_draft(self, query, body):
+        media_id = json.loads(body or b"{}").get("media_id")
+        with self.server.state.lock:
+            articles = self.server.state.drafts.get(media_id)
+        if articles is None:
+            return {"errcode": ERRCODE_NOT_FOUND, "errmsg": "invalid media_id"}
+        return {"news_item": articles}
+
+    def _handle_update_draft(self, query, body):
+        payload = json.loads(body or b"{}")
+        media_id = payload.get("media_id")
+        with self.server.state.lock:
+            articles = self.server.state.drafts.get(media_id)
+            if articles is None:
+                return {"errcode": ERRCODE_NOT_FOUND, "errmsg": "invalid media_id"}
+            index = int(payload.get("index", 0))
+            if index < len(articles):
+                articles[index] = payload.get("articles", {})
+        return {"errcode": 0, "errmsg": "ok"}
+
+    def _serve_image(self, name: str):
+        state = self.server.state
+        self._delay(state.settings.image_latency_ms, 0)
+        data = state.image(name)
+        etag = f'"{len(data)}-{name}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay(self, latency_ms: float, jitter_ms: float):
+        delay = latency_ms + (self.server.state.rng.random() * jitter_ms if jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _send_json(self, payload: Dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockWechatServer(ThreadingHTTPServer):
+    """多线程模拟服务器，可用作上下文管理器::
+
+    with MockWechatServer(MockSettings(latency_ms=20)) as server:
+        os.environ["WECHAT_API_BASE_URL"] = server.base_url
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, settings: Optional[MockSettings] = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        super().__init__((host, port), MockWechatHandler)
+        self.state = MockWechatState(settings or MockSettings())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockWechatServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-wechat", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockWechatServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", help="监听地址")
+@click.option("--port", default=8801, help="监听端口")
+@click.option("--latency-ms", default=0.0, help="每个 API 请求的延迟")
+@click.option("--jitter-ms", default=0.0, help="随机延迟上限")
+@click.option("--image-latency-ms", default=0.0, help="远程图片源的延迟")
+@click.option("--upload-error-rate", default=0.0, help="上传接口返回错误码的概率")
+@click.option("--upload-rate-limit", default=0.0, help="上传接口每秒请求上限（0 表示不限）")
+def main(host, port, latency_ms, jitter_ms, image_latency_ms, upload_error_rate, upload_rate_limit):
+    """启动模拟微信 API 服务器"""
+    settings = MockSettings(
+        latency_ms=latency_ms, jitter_ms=jitter_ms, image_latency_ms=image_latency_ms
+    )
+    if upload_error_rate:
+        settings.errors["upload_media"] = (upload_error_rate, -1)
+    if upload_rate_limit:
+        settings.rate_limits["upload_media"] = upload_rate_limit
+
+    server = MockWechatServer(settings, host, port)
+    click.echo(
+        f"模拟微信 API 已启动: {server.base_url} (AppID={settings.app_id}, Secret={settings.app_secret})"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        click.echo(json.dumps(server.state.summary(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""批量转换 - 使用进程池将整个目录的文档转换为 HTML 和封面"""
+
+import logging
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from parsers import ParsedContent, ParserFactory, ParseCache
+from parsers.pdf import PDFParser
+from converters import WechatHTMLBuilder
+from covers.template_maker import TemplateCoverGenerator
+from utils.image_processor import replace_image_srcs
+from utils.logger import log_context, new_job_id
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConvertResult:
+    """单个文件的转换结果"""
+
+    source: Path
+    html_path: Optional[Path] = None
+    cover_path: Optional[Path] = None
+    title: str = ""
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchSummary:
+    """批量转换汇总"""
+
+    results: List[ConvertResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for r in self.results if r.ok)
+
+    @property
+    def failed(self) -> List[ConvertResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def files_per_second(self) -> float:
+        return len(self.results) / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass
+class BatchOptions:
+    """批量转换参数（传给每个工作进程）"""
+
+    source_root: Path
+    output_dir: Path
+    template: str = "default"
+    theme_color: str = "#07c160"
+    covers: bool = True
+    parse_cache_dir: Optional[Path] = None
+    parse_cache_max_bytes: int = 64 * 1024 * 1024
+    pdf_image_dir: Optional[Path] = None  # 为 None 时使用 PDFParser 的默认目录
+    pdf_min_image_size: int = 64
+    log_level: str = "WARNING"
+    log_format: str = "text"
+
+
+# 工作进程内常驻的解析器、构建器和封面生成器（含已加载的字体）
+_worker: Dict[str, object] = {}
+
+
+def _init_worker_process(options: BatchOptions):
+    """进程池工作进程的 initializer：配置本进程的日志后构建转换对象"""
+    from utils.logger import setup_logging
+
+    setup_logging(options.log_level, log_format=options.log_format)
+    _init_worker(options)
+
+
+def _init_worker(options: BatchOptions):
+    """构建一次解析器、构建器和封面生成器等重量级对象（不改动日志配置，可在当前进程中调用）"""
+    if options.pdf_image_dir is not None:
+        ParserFactory.register(
+            ".pdf",
+            PDFParser(image_dir=options.pdf_image_dir, min_image_size=options.pdf_min_image_size),
+        )
+    if options.parse_cache_dir is not None:
+        ParserFactory.enable_cache(
+            ParseCache(options.parse_cache_dir, options.parse_cache_max_bytes)
+        )
+
+    _worker["options"] = options
+    _worker["builder"] = WechatHTMLBuilder(options.template)
+    _worker["cover"] = TemplateCoverGenerator(options.theme_color) if options.covers else None
+
+
+def _convert_file(source: Path) -> ConvertResult:
+    """在工作进程中转换单个文件（日志带有该文件的任务 ID）"""
+    with log_context(job_id=new_job_id(), source_file=str(source)):
+        return _convert(source)
+
+
+def _convert(source: Path) -> ConvertResult:
+    options: BatchOptions = _worker["options"]
+    start = time.perf_counter()
+    result = ConvertResult(source=source)
+
+    try:
+        relative = source.relative_to(options.source_root)
+        parsed = ParserFactory.parse(source)
+        result.title = parsed.title
+
+        result.html_path = options.output_dir / relative.with_suffix(".html")
+        result.html_path.parent.mkdir(parents=True, exist_ok=True)
+        html_content = _export_images(parsed, _worker["builder"].build(parsed), result.html_path)
+        result.html_path.write_text(html_content, encoding="utf-8")
+
+        cover_gen = _worker["cover"]
+        if cover_gen is not None:
+            cover_path = options.output_dir / relative.parent / f"{relative.stem}_cover"
+            result.cover_path = cover_gen.generate(
+                parsed.title, "", output_path=cover_path
+            ).image_path
+    except Exception as e:
+        logger.error("[Batch] 转换失败: %s, 错误: %s", source, e)
+        result.error = str(e)
+
+    result.elapsed_ms = (time.perf_counter() - start) * 1000
+    return result
+
+
+def _export_images(parsed: ParsedContent, html_content: str, html_path: Path) -> str:
+    """将文档中的本地与内嵌图片复制到 HTML 旁的 `<文件名>_files/` 目录，并改写为相对路径
+
+    docx 内嵌图片的 src 指向文档包成员（word/media/...），PDF 图片指向临时目录，
+    Markdown 相对路径相对于源文件，不复制的话输出目录中的图片全部失效。
+    远程图片保持不变。
+    """
+    assets = html_path.parent / f"{html_path.stem}_files"
+    mapping: Dict[str, str] = {}
+    used = set()
+    packages: Dict[Path, zipfile.ZipFile] = {}
+
+    try:
+        for ref in parsed.image_refs:
+            if ref.kind == "remote" or ref.src in mapping:
+                continue
+            if ref.kind == "embedded":
+                name = Path(ref.part_name).name
+            elif ref.resolved_path is not None and Path(ref.resolved_path).is_file():
+                name = Path(ref.resolved_path).name
+            else:
+                logger.warning("[Batch] 图片不存在，保留原链接: %s", ref.src)
+                continue
+
+            # 不同目录下的同名图片加序号区分
+            stem, suffix = os.path.splitext(name)
+            counter = 1
+            while name in used:
+                name = f"{stem}_{counter}{suffix}"
+                counter += 1
+            used.add(name)
+
+            assets.mkdir(parents=True, exist_ok=True)
+            target = assets / name
+            if ref.kind == "embedded":
+                container = Path(ref.container)
+                if container not in packages:
+                    packages[container] = zipfile.ZipFile(container)
+                with packages[container].open(ref.part_name) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            else:
+                shutil.copyfile(ref.resolved_path, target)
+            mapping[ref.src] = f"{quote(assets.name)}/{quote(name)}"
+    finally:
+        for package in packages.values():
+            package.close()
+
+    return replace_image_srcs(html_content, mapping)
+
+
+class BatchConverter:
+    """目录批量转换
+
+    文件分发到进程池，每个工作进程在 initializer 中构建一次解析器、HTML 构建器和
+    封面生成器，后续文件复用已加载的样式与字体，避免每个文件重复支付启动开销。
+    workers=1 时在当前进程中顺序执行。
+    """
+
+    def __init__(self, options: BatchOptions, workers: int = 0):
+        self.options = options
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+
+    def discover(self, pattern: str = "*") -> List[Path]:
+        """递归查找目录中所有受支持的文档"""
+        output_dir = self.options.output_dir.resolve()
+        files = []
+        for path in sorted(self.options.source_root.rglob(pattern)):
+            if not path.is_file() or not ParserFactory.supports(path):
+                continue
+            if output_dir in path.resolve().parents:
+                continue
+            files.append(path)
+        return files
+
+    def run(
+        self, files: List[Path], progress: Optional[Callable[[ConvertResult], None]] = None
+    ) -> BatchSummary:
+        """转换文件列表，每完成一个文件调用一次 progress"""
+        summary = BatchSummary()
+        if not files:
+            return summary
+
+        workers = min(self.workers, len(files))
+        logger.info("[Batch] 开始批量转换 %s 个文件 (workers=%s)", len(files), workers)
+        start = time.perf_counter()
+
+        if workers == 1:
+            # 在当前进程中转换：结束后恢复全局的解析器注册与解析缓存
+            with ParserFactory.isolated():
+                _init_worker(self.options)
+                try:
+                    for source in files:
+                        result = _convert_file(source)
+                        summary.results.append(result)
+                        if progress:
+                            progress(result)
+                finally:
+                    _worker.clear()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker_process, initargs=(self.options,)
+            ) as pool:
+                futures = [pool.submit(_convert_file, source) for source in files]
+                for future in as_completed(futures):
+                    result = future.result()
+                    summary.results.append(result)
+                    if progress:
+                        progress(result)
+
+        summary.elapsed = time.perf_counter() - start
+        logger.info(
+            "[Batch] 批量转换完成: %s/%s 成功, 耗时 %.2fs, %.1f 文件/秒",
+            summary.succeeded,
+            len(files),
+            summary.elapsed,
+            summary.files_per_second,
+        )
+        return summary
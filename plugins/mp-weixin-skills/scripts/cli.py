@@ -2,32 +2,294 @@
 
 import sys
 import logging
+import time
 from pathlib import Path
+from typing import Optional
 import click
 
 from config import AppConfig
-from utils.logger import setup_logging
-from parsers import ParserFactory
-from converters import WechatHTMLBuilder
-from covers.template_maker import TemplateCoverGenerator
+from utils.logger import (
+    bind_log_context,
+    new_job_id,
+    reset_log_context,
+    setup_logging,
+    shutdown_logging,
+)
+from utils.metrics import REGISTRY
+from utils.profiling import Profiler
+from utils.timing import get_timings
+from parsers import ParserFactory, ParseCache
+from parsers.pdf import PDFParser
 from wechat import WechatApiClient, WechatConfig
 from exceptions import MpWeixinError
+from journal import JobJournal, JobRunner, JOB_STATUSES
+from publisher import Publisher
 
 logger = logging.getLogger(__name__)
 
 
-@click.group()
+class CliContext:
+    """命令行上下文
+
+    配置和 API 客户端在首次使用时创建，并在一次命令调用内共享：同一命令中的所有
+    API 调用复用同一个 HTTP 连接池，access_token 最多请求一次。
+    """
+
+    def __init__(
+        self,
+        env_file: str = ".env",
+        verbose: bool = False,
+        timings: bool = False,
+        timings_json: Optional[Path] = None,
+        metrics_file: Optional[Path] = None,
+        profile: Optional[str] = None,
+        profiler: Optional[Profiler] = None,
+    ):
+        self.env_file = env_file
+        self.verbose = verbose
+        self.timings = timings
+        self.timings_json = timings_json
+        self.metrics_file = metrics_file
+        self.profile = profile
+        self.profiler = profiler
+        self.command: Optional[str] = None
+        self._config: Optional[AppConfig] = None
+        self._api_client: Optional[WechatApiClient] = None
+        self._journal: Optional[JobJournal] = None
+        self._job_token = None
+
+    def use_env(self, env_file: Optional[str]):
+        """子命令单独指定环境文件（需在首次读取配置前调用）"""
+        if env_file and self._config is None:
+            self.env_file = env_file
+
+    @property
+    def config(self) -> AppConfig:
+        """加载配置并初始化日志（只执行一次）"""
+        if self._config is None:
+            self._config = AppConfig.from_env(self.env_file)
+            setup_logging(
+                self.log_level,
+                self._config.log_file,
+                use_queue=self._config.log_queue,
+                log_format=self._config.log_format,
+                max_bytes=self._config.log_max_bytes,
+                backup_count=self._config.log_backup_count,
+            )
+        return self._config
+
+    def start_job(self, source: Path, job_id: Optional[str] = None) -> str:
+        """为本次命令处理的文章分配任务 ID，之后的日志都带上 job_id 与 source_file（close 时解除）"""
+        job_id = job_id or new_job_id()
+        self._job_token = bind_log_context(job_id=job_id, source_file=str(source))
+        return job_id
+
+    @property
+    def log_level(self) -> str:
+        return "DEBUG" if self.verbose else self.config.log_level
+
+    @property
+    def api_client(self) -> WechatApiClient:
+        """微信 API 客户端（首次访问时创建）"""
+        if self._api_client is None:
+            config = self.config
+            self._api_client = WechatApiClient(
+                WechatConfig(
+                    config.wechat_app_id,
+                    config.wechat_app_secret,
+                    base_url=config.wechat_api_base_url,
+                )
+            )
+        return self._api_client
+
+    @property
+    def journal(self) -> Optional[JobJournal]:
+        """任务日志（JOB_JOURNAL 关闭时为 None）"""
+        if self._journal is None and self.config.job_journal:
+            self._journal = JobJournal(self.config.job_journal_path)
+        return self._journal
+
+    def job_runner(self, publisher: Publisher, concurrency: Optional[int] = None) -> JobRunner:
+        """按配置的重试策略执行任务日志中的任务"""
+        config = self.config
+        return JobRunner(
+            self.journal,
+            publisher.run_job,
+            concurrency=concurrency or config.job_concurrency,
+            max_attempts=config.job_max_attempts,
+            retry_base=config.job_retry_base,
+            retry_max=config.job_retry_max,
+        )
+
+    def close(self):
+        """命令结束时关闭 API 客户端的连接池，并按需输出阶段耗时与剖析结果"""
+        if self.profiler is not None:
+            self.profiler.stop()
+        if self._api_client is not None:
+            self._api_client.close()
+            self._api_client = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self.report_timings()
+        self.write_metrics()
+        self.report_profile()
+        # 写出队列中剩余的日志
+        shutdown_logging()
+        if self._job_token is not None:
+            reset_log_context(self._job_token)
+            self._job_token = None
+
+    def report_profile(self):
+        """写出 --profile 的结果并打印累计耗时最高的函数"""
+        if self.profiler is None:
+            return
+        base = Path(self.profile) if self.profile else self._default_profile_path()
+        report = self.profiler.write(base, get_timings())
+
+        click.echo(f"\n🔬 累计耗时最高的 {self.profiler.top} 个函数")
+        click.echo(report.top.rstrip())
+        if report.memory_peak_kb is not None:
+            click.echo(
+                f"\n🔬 内存峰值: {report.memory_peak_kb / 1024:.1f}MB（tracemalloc 开启时耗时偏高）"
+            )
+            for stage in report.memory:
+                click.echo(
+                    f"   {stage.name:<24} {stage.count:>4} 次  峰值 {stage.peak_kb / 1024:>8.1f}MB"
+                )
+        click.echo(f"\n🔬 剖析结果: {report.pstats_path}")
+        click.echo(f"   火焰图折叠栈: {report.collapsed_path}（flamegraph.pl / speedscope）")
+
+    def _default_profile_path(self) -> Path:
+        """未指定路径时写入 输出目录/profile/<命令>-<时间>"""
+        output_dir = self._config.output_dir if self._config is not None else Path("./output")
+        return output_dir / "profile" / f"{self.command or 'main'}-{time.strftime('%Y%m%d-%H%M%S')}"
+
+    def write_metrics(self):
+        """写出 Prometheus textfile（--metrics-file 或 METRICS_FILE）"""
+        metrics_file = self.metrics_file
+        if metrics_file is None and self._config is not None:
+            metrics_file = self._config.metrics_file
+        if metrics_file:
+            REGISTRY.write_textfile(metrics_file)
+            logger.info(f"[CLI] 指标已写入: {metrics_file}")
+
+    def report_timings(self):
+        """输出阶段耗时（--timings 打印表格，--timings-json 写入文件）"""
+        timings = get_timings()
+        if self.timings:
+            click.echo(f"\n⏱  阶段耗时（并发阶段的累计耗时可能超过总耗时）")
+            click.echo(timings.format_table())
+        if self.timings_json:
+            timings.write_json(self.timings_json, command=self.command)
+            click.echo(f"⏱  阶段耗时已写入: {self.timings_json}")
+
+
+def configure_parsers(config: AppConfig):
+    """按配置注册 PDF 解析器（图片写入 TEMP_DIR）并启用解析结果缓存"""
+    ParserFactory.register(
+        ".pdf",
+        PDFParser(
+            image_dir=config.temp_dir / "pdf_images", min_image_size=config.pdf_min_image_size
+        ),
+    )
+    if config.parse_cache:
+        ParserFactory.enable_cache(
+            ParseCache(config.cache_dir / "parsed", config.parse_cache_max_bytes)
+        )
+
+
+def run_journaled(ctx: click.Context, publisher: Publisher, job_type: str, params: dict) -> dict:
+    """通过任务日志执行任务：存在参数相同的未完成任务时从断点继续，失败时记录已完成的步骤后退出"""
+    journal = ctx.obj.journal
+    job = journal.find_unfinished(job_type, params)
+    if job is None:
+        job = journal.create(job_type, params)
+    else:
+        click.echo(f"↻ 继续未完成的任务 {job.id}（已完成 {len(journal.steps(job.id))} 个步骤）")
+    ctx.obj.start_job(Path(params["file"]), job.id)
+
+    record = ctx.obj.job_runner(publisher).execute(job.id)
+    if record is None:
+        click.echo(f"⚠️  任务 {job.id} 正在其他进程中执行")
+        sys.exit(1)
+    if record.status == "succeeded":
+        return record.result
+
+    click.echo(record.error)
+    if record.status == "pending":
+        wait = max(0, record.next_run_at - time.time())
+        click.echo(f"\n↻ 已完成的步骤已记录（任务 {record.id}）。重新运行同一命令将从断点继续，")
+        click.echo(f"   或运行 `jobs run` 在 {wait:.0f} 秒后自动重试")
+    else:
+        click.echo(
+            f"\n⚠️  任务 {record.id} 已放弃（已尝试 {record.attempts} 次），重新运行同一命令仍会跳过已完成的步骤"
+        )
+    sys.exit(1)
+
+
+class MainGroup(click.Group):
+    """主命令组：`--profile` 的路径可省略"""
+
+    def parse_args(self, ctx: click.Context, args: list) -> list:
+        # `--profile publish ...` 中紧跟的是子命令名而不是路径，按未指定路径处理
+        args = list(args)
+        for i, arg in enumerate(args[:-1]):
+            if arg == "--profile" and args[i + 1] in self.commands:
+                args[i] = "--profile="
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=MainGroup)
 @click.option("--verbose", "-v", is_flag=True, help="详细输出")
 @click.option("--env", default=".env", help="环境文件路径")
+@click.option("--timings", is_flag=True, help="命令结束时打印各阶段耗时")
+@click.option("--timings-json", type=click.Path(dir_okay=False), help="将各阶段耗时写入 JSON 文件")
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    help="命令结束时写入 Prometheus 指标文件 (.prom)",
+)
+@click.option(
+    "--profile",
+    is_flag=False,
+    flag_value="",
+    default=None,
+    metavar="[PATH]",
+    help="使用 cProfile 剖析命令，写入 PATH.pstats 与 PATH.collapsed（默认 输出目录/profile/）",
+)
+@click.option("--profile-top", default=30, show_default=True, help="打印累计耗时最高的函数个数")
+@click.option("--profile-memory", is_flag=True, help="剖析时用 tracemalloc 记录各阶段的内存峰值")
 @click.pass_context
-def main(ctx: click.Context, verbose: bool, env: str):
+def main(
+    ctx: click.Context,
+    verbose: bool,
+    env: str,
+    timings: bool,
+    timings_json: str,
+    metrics_file: str,
+    profile: Optional[str],
+    profile_top: int,
+    profile_memory: bool,
+):
     """微信公众号文章发布工具
 
     一个强大的工具，将 Markdown 文档转换为符合微信公众号排版要求的格式。
     """
-    ctx.ensure_object(dict)
-    ctx.obj["verbose"] = verbose
-    ctx.obj["env"] = env
+    profiler = Profiler(profile_top, profile_memory) if profile is not None else None
+    ctx.obj = CliContext(
+        env,
+        verbose,
+        timings,
+        Path(timings_json) if timings_json else None,
+        Path(metrics_file) if metrics_file else None,
+        profile,
+        profiler,
+    )
+    ctx.obj.command = ctx.invoked_subcommand
+    ctx.call_on_close(ctx.obj.close)
+    if profiler is not None:
+        profiler.start()
 
 
 @main.command()
@@ -51,93 +313,33 @@ def publish(ctx: click.Context, file: str, no_api: bool, template: str, cover_ty
     """
     try:
         # 加载配置
-        config = AppConfig.from_env(ctx.obj["env"])
-        log_level = "DEBUG" if ctx.obj["verbose"] else config.log_level
-        setup_logging(log_level, config.log_file)
+        config = ctx.obj.config
 
         logger.info("[CLI] 微信公众号文章发布工具启动")
 
-        # 解析文档
         file_path = Path(file)
-        parser = ParserFactory.get_parser(file_path)
-        parsed = parser.parse(file_path)
-
-        logger.info(f"[CLI] 文章标题: {parsed.title}")
-
-        # 转换内容
-        builder = WechatHTMLBuilder(template)
-        html_content = builder.build(parsed)
-
-        # 生成封面
-        cover_gen = TemplateCoverGenerator(config.theme_color)
-        cover_result = cover_gen.generate(parsed.title, "")
-
-        if no_api or not config.has_wechat_api():
-            # 手动模式
-            logger.info("[CLI] 运行在手动模式")
-
-            output_dir = config.output_dir
-            output_dir.mkdir(parents=True, exist_ok=True)
-
-            # 保存 HTML
-            html_file = output_dir / f"{file_path.stem}.html"
-            html_file.write_text(html_content, encoding="utf-8")
+        configure_parsers(config)
+
+        use_api = not no_api and config.has_wechat_api()
+        publisher = Publisher(config, ctx.obj.api_client if use_api else None)
+        if use_api and ctx.obj.journal is not None:
+            # 记录每个步骤，中断后重新运行不会重复上传
+            params = {"file": str(file_path.resolve()), "template": template, "no_api": False}
+            result = run_journaled(ctx, publisher, "publish", params)
+        else:
+            ctx.obj.start_job(file_path)
+            result = publisher.publish(file_path, template, use_api).to_dict()
 
+        if result["media_id"] is None:
             click.echo(f"✅ 转换完成!")
-            click.echo(f"   HTML: {html_file}")
-            click.echo(f"   封面: {cover_result.image_path}")
+            click.echo(f"   HTML: {result['html_path']}")
+            click.echo(f"   封面: {result['cover_path']}")
             click.echo(f"\n📝 请手动上传到微信公众号后台")
-
         else:
-            # API 模式
-            logger.info("[CLI] 运行在 API 模式")
-
-            api_config = WechatConfig(config.wechat_app_id, config.wechat_app_secret)
-            api_client = WechatApiClient(api_config)
-
-            # 处理文章中的图片：提取、上传到微信素材库、替换链接
-            from utils.image_extractor import ImageExtractor
-            from utils.image_processor import ImageProcessor
-
-            logger.info("[CLI] 开始处理文章中的图片")
-
-            # 提取并处理图片
-            extractor = ImageExtractor(config.temp_dir)
-            image_processor = ImageProcessor(api_client, config.temp_dir)
-
-            # 从原始 Markdown 中提取图片信息（如果有）
-            markdown_content = file_path.read_text(encoding='utf-8')
-            images, local_images = extractor.extract_and_prepare_images(
-                markdown_content, 'markdown', file_path.parent
-            )
-
-            if images:
-                logger.info(f"[CLI] 发现 {len(images)} 张图片，正在上传到微信素材库")
-
-                # 处理图片并替换 HTML 中的链接
-                html_content = image_processor.process_images(html_content, images, "image")
-
-                # 显示上传结果
-                success_count = sum(1 for img in images if 'wechat_url' in img or img.get('uploaded'))
-                click.echo(f"   图片上传: {success_count}/{len(images)} 张成功")
-            else:
-                logger.info("[CLI] 文章中没有发现图片")
-
-            # 上传封面
-            cover_data = api_client.upload_media(str(cover_result.image_path), "thumb")
-
-            # 构建文章数据
-            article = {
-                "title": parsed.title,
-                "content": html_content,
-                "thumb_media_id": cover_data["media_id"],
-                "need_open_comment": 0,
-                "only_fans_can_comment": 0,
-            }
-
-            # 上传草稿
-            result = api_client.upload_draft([article])
-
+            if result["images_total"]:
+                click.echo(
+                    f"   图片上传: {result['images_uploaded']}/{result['images_total']} 张成功"
+                )
             click.echo(f"✅ 文章发布成功!")
             click.echo(f"   Media ID: {result['media_id']}")
             click.echo(f"   📝 请在微信公众号后台查看草稿")
@@ -171,9 +373,7 @@ def update(ctx: click.Context, media_id: str, source: str, regenerate_cover: boo
     """
     try:
         # 加载配置
-        config = AppConfig.from_env(ctx.obj["env"])
-        log_level = "DEBUG" if ctx.obj["verbose"] else config.log_level
-        setup_logging(log_level, config.log_file)
+        config = ctx.obj.config
 
         logger.info("[CLI] 微信公众号文章更新工具启动")
         logger.info(f"[CLI] Media ID: {media_id}")
@@ -185,64 +385,24 @@ def update(ctx: click.Context, media_id: str, source: str, regenerate_cover: boo
             logger.warning(f"[CLI] 未指定源文件，使用默认: {source}")
 
         file_path = Path(source)
-
-        # 解析文档
-        parser = ParserFactory.get_parser(file_path)
-        parsed = parser.parse(file_path)
-
-        logger.info(f"[CLI] 文章标题: {parsed.title}")
-
-        # 转换内容
-        builder = WechatHTMLBuilder(config.template_name)
-        html_content = builder.build(parsed)
-
-        # 生成封面（如果需要）
-        if regenerate_cover:
-            logger.info("[CLI] 重新生成封面")
-            cover_gen = TemplateCoverGenerator(config.theme_color)
-            cover_result = cover_gen.generate(parsed.title, "")
-
-            # 上传新封面
-            api_config = WechatConfig(config.wechat_app_id, config.wechat_app_secret)
-            api_client = WechatApiClient(api_config)
-            cover_data = api_client.upload_media(str(cover_result.image_path), "thumb")
-            thumb_media_id = cover_data["media_id"]
-            logger.info(f"[CLI] 新封面 media_id: {thumb_media_id}")
+        configure_parsers(config)
+
+        # 封面上传/草稿读取与草稿更新共用同一客户端
+        publisher = Publisher(config, ctx.obj.api_client)
+        if ctx.obj.journal is not None:
+            params = {
+                "file": str(file_path.resolve()),
+                "media_id": media_id,
+                "regenerate_cover": regenerate_cover,
+            }
+            result = run_journaled(ctx, publisher, "update", params)
         else:
-            # 获取原草稿的 thumb_media_id
-            logger.info("[CLI] 保持原封面")
-            api_config = WechatConfig(config.wechat_app_id, config.wechat_app_secret)
-            api_client = WechatApiClient(api_config)
-            original_draft = api_client.get_draft(media_id)
-            thumb_media_id = original_draft.get("thumb_media_id", "")
-            logger.info(f"[CLI] 原封面 media_id: {thumb_media_id}")
-
-        # 构建文章数据（按照微信 API 格式）
-        # 注意：articles 是对象，不是数组！
-        article_data = {
-            "article_type": "news",
-            "title": parsed.title,
-            "author": parsed.metadata.get("author", ""),
-            "digest": "",  # 单图文消息的摘要
-            "content": html_content,
-            "content_source_url": "",  # 原文链接
-            "need_open_comment": 0,
-            "only_fans_can_comment": 0,
-        }
-
-        # 如果有新封面，添加到文章数据
-        if thumb_media_id:
-            article_data["thumb_media_id"] = thumb_media_id
-
-        # 更新草稿
-        api_config = WechatConfig(config.wechat_app_id, config.wechat_app_secret)
-        api_client = WechatApiClient(api_config)
-
-        result = api_client.update_draft(media_id, 0, article_data)
+            ctx.obj.start_job(file_path)
+            result = publisher.update(media_id, file_path, regenerate_cover).to_dict()
 
         click.echo(f"✅ 草稿更新成功!")
         click.echo(f"   Media ID: {media_id}")
-        click.echo(f"   标题: {parsed.title}")
+        click.echo(f"   标题: {result['title']}")
         click.echo(f"   📝 请在微信公众号后台查看更新后的草稿")
 
     except MpWeixinError as e:
@@ -256,8 +416,14 @@ def update(ctx: click.Context, media_id: str, source: str, regenerate_cover: boo
 
 @main.command()
 @click.argument("file", type=click.Path(exists=True))
-@click.option("--type", "media_type", default="image", type=click.Choice(["thumb", "image"], case_sensitive=False), help="素材类型")
-@click.option("--env", default=".env", help="环境文件路径")
+@click.option(
+    "--type",
+    "media_type",
+    default="image",
+    type=click.Choice(["thumb", "image"], case_sensitive=False),
+    help="素材类型",
+)
+@click.option("--env", default=None, help="环境文件路径，默认使用全局 --env")
 @click.pass_context
 def upload_image(ctx: click.Context, file: str, media_type: str, env: str):
     """上传单张图片到微信素材库
@@ -270,8 +436,8 @@ def upload_image(ctx: click.Context, file: str, media_type: str, env: str):
     """
     try:
         # 加载配置
-        config = AppConfig.from_env(env or ctx.obj.get("env", ".env"))
-        setup_logging(config.log_level, config.log_file)
+        ctx.obj.use_env(env)
+        config = ctx.obj.config
 
         logger.info("[CLI] 微信公众号图片上传工具启动")
         logger.info(f"[CLI] 文件: {file}")
@@ -283,8 +449,7 @@ def upload_image(ctx: click.Context, file: str, media_type: str, env: str):
             sys.exit(1)
 
         # 初始化 API 客户端
-        api_config = WechatConfig(config.wechat_app_id, config.wechat_app_secret)
-        api_client = WechatApiClient(api_config)
+        api_client = ctx.obj.api_client
 
         # 上传图片
         result = api_client.upload_media(file, media_type)
@@ -305,9 +470,15 @@ def upload_image(ctx: click.Context, file: str, media_type: str, env: str):
 
 @main.command()
 @click.argument("directory", type=click.Path(exists=True, file_okay=False))
-@click.option("--type", "media_type", default="image", type=click.Choice(["thumb", "image"], case_sensitive=False), help="素材类型")
+@click.option(
+    "--type",
+    "media_type",
+    default="image",
+    type=click.Choice(["thumb", "image"], case_sensitive=False),
+    help="素材类型",
+)
 @click.option("--pattern", default="*.jpg", help="文件匹配模式")
-@click.option("--env", default=".env", help="环境文件路径")
+@click.option("--env", default=None, help="环境文件路径，默认使用全局 --env")
 @click.pass_context
 def upload_images(ctx: click.Context, directory: str, media_type: str, pattern: str, env: str):
     """批量上传文件夹中的图片到微信素材库
@@ -322,8 +493,8 @@ def upload_images(ctx: click.Context, directory: str, media_type: str, pattern:
     """
     try:
         # 加载配置
-        config = AppConfig.from_env(env or ctx.obj.get("env", ".env"))
-        setup_logging(config.log_level, config.log_file)
+        ctx.obj.use_env(env)
+        config = ctx.obj.config
 
         logger.info("[CLI] 微信公众号批量图片上传工具启动")
         logger.info(f"[CLI] 目录: {directory}")
@@ -336,8 +507,7 @@ def upload_images(ctx: click.Context, directory: str, media_type: str, pattern:
             sys.exit(1)
 
         # 初始化 API 客户端
-        api_config = WechatConfig(config.wechat_app_id, config.wechat_app_secret)
-        api_client = WechatApiClient(api_config)
+        api_client = ctx.obj.api_client
 
         # 查找图片文件
         dir_path = Path(directory)
@@ -391,6 +561,235 @@ def upload_images(ctx: click.Context, directory: str, media_type: str, pattern:
         sys.exit(1)
 
 
+@main.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--workers", "-w", default=0, type=int, help="工作进程数，默认使用 CPU 核数")
+@click.option(
+    "--output-dir", "-o", type=click.Path(file_okay=False), help="输出目录，默认使用 OUTPUT_DIR"
+)
+@click.option("--template", default=None, help="样式模板名称，默认使用 TEMPLATE_NAME")
+@click.option("--pattern", default="*", help="文件匹配模式")
+@click.option("--no-cover", is_flag=True, help="不生成封面")
+@click.pass_context
+def convert(
+    ctx: click.Context,
+    directory: str,
+    workers: int,
+    output_dir: str,
+    template: str,
+    pattern: str,
+    no_cover: bool,
+):
+    """批量转换目录中的文档（不调用 API）
+
+    递归查找目录中的 Markdown/Word/PDF 文件，使用进程池并行转换，
+    HTML 与封面按原目录结构写入输出目录。
+
+    示例:
+
+        mp-weixin convert articles/
+
+        mp-weixin convert articles/ --workers 8 -o output/archive
+
+        mp-weixin convert articles/ --pattern "*.md" --no-cover
+    """
+    try:
+        from batch import BatchConverter, BatchOptions
+
+        config = ctx.obj.config
+
+        options = BatchOptions(
+            source_root=Path(directory),
+            output_dir=Path(output_dir) if output_dir else config.output_dir,
+            template=template or config.template_name,
+            theme_color=config.theme_color,
+            covers=not no_cover,
+            parse_cache_dir=config.cache_dir / "parsed" if config.parse_cache else None,
+            parse_cache_max_bytes=config.parse_cache_max_bytes,
+            pdf_image_dir=config.temp_dir / "pdf_images",
+            pdf_min_image_size=config.pdf_min_image_size,
+            # 工作进程只输出警告，避免多进程日志交错
+            log_level=ctx.obj.log_level if ctx.obj.verbose else "WARNING",
+            log_format=config.log_format,
+        )
+        converter = BatchConverter(options, workers)
+
+        files = converter.discover(pattern)
+        if not files:
+            click.echo(f"⚠️  目录中没有可转换的文件: {directory}")
+            return
+
+        click.echo(
+            f"📂 找到 {len(files)} 个文件，使用 {min(converter.workers, len(files))} 个进程转换\n"
+        )
+
+        def show_progress(result):
+            status = "✅" if result.ok else f"❌ ({result.error})"
+            click.echo(f"   {status} {result.source} ({result.elapsed_ms:.0f}ms)")
+
+        summary = converter.run(files, progress=show_progress)
+
+        click.echo(f"\n{'='*60}")
+        click.echo(f"✅ 转换完成!")
+        click.echo(f"   成功: {summary.succeeded}")
+        click.echo(f"   失败: {len(summary.failed)}")
+        click.echo(f"   耗时: {summary.elapsed:.2f}s ({summary.files_per_second:.1f} 文件/秒)")
+        click.echo(f"   输出: {options.output_dir}")
+        click.echo(f"{'='*60}\n")
+
+        if summary.failed:
+            sys.exit(1)
+
+    except MpWeixinError as e:
+        click.echo(e.user_message())
+        sys.exit(1)
+    except Exception as e:
+        logger.exception(f"[CLI] 未处理的异常")
+        click.echo(f"❌ 发生错误: {e}")
+        sys.exit(1)
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", help="监听地址")
+@click.option("--port", default=8800, type=int, help="监听端口")
+@click.option(
+    "--socket", "socket_path", type=click.Path(dir_okay=False), help="改为监听 Unix socket"
+)
+@click.option("--workers", "-w", default=2, type=int, help="同时执行的任务数")
+@click.option(
+    "--root", type=click.Path(exists=True, file_okay=False), help="只接受该目录下的源文件"
+)
+@click.pass_context
+def serve(ctx: click.Context, host: str, port: int, socket_path: str, workers: int, root: str):
+    """启动常驻发布服务（本地 HTTP/JSON 任务接口）
+
+    进程常驻并复用 API 客户端、access_token、连接池与各类缓存，
+    外部系统通过接口提交发布/更新任务并轮询状态。
+
+    示例:
+
+        mp-weixin serve --port 8800 --workers 4
+
+        curl -X POST localhost:8800/jobs -d '{"type": "publish", "file": "/data/article.md", "wait": 60}'
+
+        curl localhost:8800/jobs/<job_id>
+    """
+    import signal
+
+    from server import JobManager, create_server
+
+    config = ctx.obj.config
+    configure_parsers(config)
+    # 常驻进程只保留最近的阶段耗时记录
+    get_timings().limit(10000)
+
+    api_client = None
+    if config.has_wechat_api():
+        api_client = ctx.obj.api_client
+        try:
+            # 预热：提前获取 access_token 并建立连接
+            api_client.get_access_token()
+        except MpWeixinError as e:
+            click.echo(f"⚠️  预热 access_token 失败，将在首个任务时重试: {e.user_message()}")
+    else:
+        click.echo("⚠️  未配置微信 API 凭证，仅支持 no_api 发布（生成 HTML）")
+
+    publisher = Publisher(config, api_client)
+    runner = ctx.obj.job_runner(publisher, workers) if ctx.obj.journal is not None else None
+    manager = JobManager(publisher, workers, root=Path(root) if root else None, runner=runner)
+    server = create_server(manager, host, port, Path(socket_path) if socket_path else None)
+    recovered = manager.recover()
+    if recovered:
+        click.echo(f"↻ 已恢复 {recovered} 个未完成的任务")
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    click.echo(f"🚀 发布服务已启动: {server.url} (workers={manager.workers})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        click.echo("\n正在停止，等待进行中的任务完成...")
+    finally:
+        server.server_close()
+        manager.shutdown(wait=True)
+
+
+@main.group()
+def jobs():
+    """查看与执行任务日志中的任务
+
+    publish / update（API 模式）与 serve 的任务都记录在任务日志（JOB_JOURNAL_PATH）中，
+    每个步骤的结果都会保存，失败的任务可以从断点继续。
+    """
+
+
+@jobs.command("list")
+@click.option("--status", type=click.Choice(JOB_STATUSES), help="只显示该状态的任务")
+@click.option("--limit", default=20, help="最多显示的任务数")
+@click.pass_context
+def jobs_list(ctx: click.Context, status: str, limit: int):
+    """列出最近的任务"""
+    journal = ctx.obj.journal
+    if journal is None:
+        click.echo("任务日志未启用（JOB_JOURNAL=false）")
+        return
+
+    records = journal.list(status, limit)
+    if not records:
+        click.echo("没有任务")
+        return
+    for record in records:
+        created = time.strftime("%m-%d %H:%M:%S", time.localtime(record.created_at))
+        steps = len(journal.steps(record.id))
+        click.echo(
+            f"{record.id}  {created}  {record.type:<7} {record.status:<9} "
+            f"尝试 {record.attempts}  步骤 {steps:>3}  {Path(record.params.get('file', '')).name}"
+        )
+        if record.error and record.status != "succeeded":
+            click.echo(f"    {record.error.strip().splitlines()[-1]}")
+
+
+@jobs.command("run")
+@click.option("--concurrency", "-c", type=int, help="同时执行的任务数，默认 JOB_CONCURRENCY")
+@click.option(
+    "--failed", "include_failed", is_flag=True, help="同时重新执行已放弃的任务（尝试次数清零）"
+)
+@click.pass_context
+def jobs_run(ctx: click.Context, concurrency: Optional[int], include_failed: bool):
+    """执行所有未完成的任务（含中断与等待重试的任务），直到全部成功或放弃
+
+    失败的任务按指数退避重试，已完成的步骤不会重复执行。
+    """
+    config = ctx.obj.config
+    journal = ctx.obj.journal
+    if journal is None:
+        click.echo("任务日志未启用（JOB_JOURNAL=false）")
+        return
+    configure_parsers(config)
+
+    if include_failed:
+        for record in journal.list("failed", limit=10000):
+            journal.requeue(record.id)
+
+    publisher = Publisher(config, ctx.obj.api_client if config.has_wechat_api() else None)
+    records = ctx.obj.job_runner(publisher, concurrency).run_pending()
+    if not records:
+        click.echo("没有待执行的任务")
+        return
+
+    succeeded = [record for record in records if record.status == "succeeded"]
+    failed = [record for record in records if record.status != "succeeded"]
+    click.echo(f"✅ 完成 {len(succeeded)} 个任务，失败 {len(failed)} 个")
+    for record in failed:
+        click.echo(
+            f"   ❌ {record.id} {Path(record.params.get('file', '')).name}（已尝试 {record.attempts} 次）"
+        )
+    if failed:
+        sys.exit(1)
+
+
 @main.command()
 def version():
     """显示版本信息"""
@@ -17,6 +17,7 @@ class AppConfig:
     # 微信公众号配置
     wechat_app_id: str
     wechat_app_secret: str
+    wechat_api_base_url: str = "https://api.weixin.qq.com"
 
     # 封面生成配置
     cover_generator: str = "auto"
@@ -26,6 +27,22 @@ class AppConfig:
     # 输出配置
     output_dir: Path = field(default_factory=lambda: Path("./output"))
     temp_dir: Path = field(default_factory=lambda: Path("./temp"))
+    cache_dir: Path = field(default_factory=lambda: Path("./temp/cache"))
+
+    # 图片优化配置
+    image_max_width: int = 1080
+    image_max_bytes: int = 1024 * 1024
+    image_workers: int = 4
+    image_cache_max_bytes: int = 256 * 1024 * 1024
+    download_workers: int = 8
+    download_cache_max_bytes: int = 512 * 1024 * 1024
+
+    # PDF 解析配置（提取的图片写入 TEMP_DIR/pdf_images）
+    pdf_min_image_size: int = 64  # 宽或高小于该像素值的图片视为装饰图片跳过，0 表示不跳过
+
+    # 解析缓存配置
+    parse_cache: bool = True
+    parse_cache_max_bytes: int = 64 * 1024 * 1024
 
     # 样式配置
     template_name: str = "default"
@@ -34,6 +51,21 @@ class AppConfig:
     # 日志配置
     log_level: str = "INFO"
     log_file: Optional[Path] = None
+    log_queue: bool = True  # 后台线程写日志，调用线程只入队
+    log_format: str = "text"  # text 或 json（JSON Lines，带任务 ID 等上下文字段）
+    log_max_bytes: int = 10 * 1024 * 1024  # 单个日志文件上限，超过后轮转
+    log_backup_count: int = 5
+
+    # 指标配置（命令结束时写入 Prometheus textfile）
+    metrics_file: Optional[Path] = None
+
+    # 任务日志配置（SQLite 记录发布步骤，失败后续传并按指数退避重试）
+    job_journal: bool = True
+    job_journal_path: Path = field(default_factory=lambda: Path("./output/jobs.sqlite3"))
+    job_max_attempts: int = 5
+    job_retry_base: float = 2.0  # 首次重试前等待的秒数，之后每次翻倍
+    job_retry_max: float = 300.0
+    job_concurrency: int = 2
 
     @classmethod
     def from_env(cls, env_file: str = ".env") -> "AppConfig":
@@ -45,15 +77,44 @@ class AppConfig:
         config = cls(
             wechat_app_id=os.getenv("WECHAT_APP_ID", ""),
             wechat_app_secret=os.getenv("WECHAT_APP_SECRET", ""),
+            wechat_api_base_url=os.getenv(
+                "WECHAT_API_BASE_URL", "https://api.weixin.qq.com"
+            ).rstrip("/"),
             cover_generator=os.getenv("COVER_GENERATOR", "auto"),
             openai_api_key=os.getenv("OPENAI_API_KEY"),
             unsplash_api_key=os.getenv("UNSPLASH_API_KEY"),
             output_dir=Path(os.getenv("OUTPUT_DIR", "./output")),
             temp_dir=Path(os.getenv("TEMP_DIR", "./temp")),
+            cache_dir=Path(os.getenv("CACHE_DIR", "./temp/cache")),
+            image_max_width=int(os.getenv("IMAGE_MAX_WIDTH", "1080")),
+            image_max_bytes=int(os.getenv("IMAGE_MAX_BYTES", str(1024 * 1024))),
+            image_workers=int(os.getenv("IMAGE_WORKERS", "4")),
+            image_cache_max_bytes=int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            download_workers=int(os.getenv("DOWNLOAD_WORKERS", "8")),
+            download_cache_max_bytes=int(
+                os.getenv("DOWNLOAD_CACHE_MAX_BYTES", str(512 * 1024 * 1024))
+            ),
+            pdf_min_image_size=int(os.getenv("PDF_MIN_IMAGE_SIZE", "64")),
+            parse_cache=os.getenv("PARSE_CACHE", "true").lower() not in ("0", "false", "no"),
+            parse_cache_max_bytes=int(os.getenv("PARSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
             template_name=os.getenv("TEMPLATE_NAME", "default"),
             theme_color=os.getenv("THEME_COLOR", "#07c160"),
             log_level=os.getenv("LOG_LEVEL", "INFO"),
             log_file=Path(os.getenv("LOG_FILE")) if os.getenv("LOG_FILE") else None,
+            log_queue=os.getenv("LOG_QUEUE", "true").lower() not in ("0", "false", "no"),
+            log_format=os.getenv("LOG_FORMAT", "text").lower(),
+            log_max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            log_backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            metrics_file=Path(os.getenv("METRICS_FILE")) if os.getenv("METRICS_FILE") else None,
+            job_journal=os.getenv("JOB_JOURNAL", "true").lower() not in ("0", "false", "no"),
+            job_journal_path=Path(
+                os.getenv("JOB_JOURNAL_PATH")
+                or Path(os.getenv("OUTPUT_DIR", "./output")) / "jobs.sqlite3"
+            ),
+            job_max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "5")),
+            job_retry_base=float(os.getenv("JOB_RETRY_BASE", "2")),
+            job_retry_max=float(os.getenv("JOB_RETRY_MAX", "300")),
+            job_concurrency=int(os.getenv("JOB_CONCURRENCY", "2")),
         )
 
         logger.info(f"[Config] 配置加载完成")
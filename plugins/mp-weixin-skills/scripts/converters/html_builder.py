@@ -3,6 +3,7 @@
 import logging
 from parsers.base import ParsedContent
 from converters.style_manager import StyleManager
+from utils.timing import timed
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,7 @@ class WechatHTMLBuilder:
         self.style_manager = StyleManager()
         logger.info(f"[HTMLBuilder] 初始化构建器 - 模板: {template_name}")
 
+    @timed("build")
     def build(self, parsed: ParsedContent) -> str:
         """构建微信公众号 HTML 内容"""
         logger.info("[HTMLBuilder] 开始构建 HTML")
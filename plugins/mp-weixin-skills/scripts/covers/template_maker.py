@@ -8,6 +8,9 @@ from datetime import datetime
 
 from PIL import Image, ImageDraw, ImageFont
 from covers.base import BaseCoverGenerator, CoverResult
+from covers.text_layout import GlyphMetricsCache, TextLayout, TextLayoutResult
+from utils.image_encoder import ImageEncoder, WECHAT_MEDIA_MAX_BYTES
+from utils.timing import timed
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +31,19 @@ class TemplateCoverGenerator(BaseCoverGenerator):
         "/System/Library/Fonts/Supplemental/NotoSansCJK-Regular.ttc",  # Noto Sans CJK（如果存在）
     ]
 
+    # 标题排版
+    TITLE_MARGIN = 100
+    TITLE_MAX_LINES = 3
+    TITLE_MAX_FONT_SIZE = 56
+    TITLE_MIN_FONT_SIZE = 36
+
+    # 字形宽度缓存在所有生成器实例间共享
+    _glyph_metrics = GlyphMetricsCache()
+
     def __init__(self, theme_color: str = "#07c160"):
         self.theme_color = theme_color
+        self._fonts: Dict[int, ImageFont.FreeTypeFont] = {}
+        self._layout = TextLayout(self._glyph_metrics)
         # 将十六进制颜色转换为 RGB
         self.theme_rgb = self._hex_to_rgb(theme_color)
         logger.info(f"[TemplateCover] 初始化 - 主题色: {theme_color}")
@@ -38,6 +52,7 @@ class TemplateCoverGenerator(BaseCoverGenerator):
         """本地模板始终可用"""
         return True
 
+    @timed("cover")
     def generate(
         self, title: str, content: str, **kwargs
     ) -> CoverResult:
@@ -58,28 +73,50 @@ class TemplateCoverGenerator(BaseCoverGenerator):
         self._draw_decorations(draw, width, height)
 
         # 绘制标题（支持中文）
-        self._draw_title(draw, title, width, height)
+        title_layout = self._draw_title(draw, title, width, height)
 
         # 绘制副标题（如果有）
         subtitle = kwargs.get("subtitle", "")
         if subtitle:
-            self._draw_subtitle(draw, subtitle, width, height)
-
-        # 保存图片
-        output_dir = Path("./temp")
-        output_dir.mkdir(exist_ok=True)
+            title_bottom = height // 2 + title_layout.block_height // 2 - 20
+            self._draw_subtitle(draw, subtitle, width, height, top=title_bottom + 16)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"cover_{timestamp}.jpg"
-        file_path = output_dir / filename
+        # 按微信缩略图大小限制编码
+        encoder = ImageEncoder(
+            image_format=kwargs.get("image_format", "JPEG"),
+            max_bytes=kwargs.get("max_bytes", WECHAT_MEDIA_MAX_BYTES["thumb"]),
+        )
 
-        img.save(file_path, "JPEG", quality=95)
-        logger.info(f"[TemplateCover] 封面已保存: {file_path}")
+        # 保存图片（未指定 output_path 时按时间戳写入临时目录）
+        output_path = kwargs.get("output_path")
+        if output_path:
+            file_path = Path(output_path).with_suffix(encoder.extension)
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            output_dir = Path("./temp")
+            output_dir.mkdir(exist_ok=True)
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"cover_{timestamp}{encoder.extension}"
+            file_path = output_dir / filename
+
+        encoded = encoder.encode_to_file(img, file_path)
+        logger.info(
+            f"[TemplateCover] 封面已保存: {file_path} "
+            f"({encoded.byte_size} 字节, 质量 {encoded.quality}, 编码耗时 {encoded.elapsed_ms:.1f}ms)"
+        )
 
         return CoverResult(
             image_path=file_path,
             source_type="template",
-            metadata={"template": "modern", "title": title, "theme_color": self.theme_color},
+            metadata={
+                "template": "modern",
+                "title": title,
+                "theme_color": self.theme_color,
+                "title_lines": title_layout.lines,
+                "title_font_size": title_layout.font_size,
+                "encode": encoded.summary(),
+            },
             needs_upload=True,
         )
 
@@ -89,7 +126,15 @@ class TemplateCoverGenerator(BaseCoverGenerator):
         return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
     def _get_font(self, size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
-        """获取支持中文的字体"""
+        """获取支持中文的字体（按字号缓存）"""
+        font = self._fonts.get(size)
+        if font is None:
+            font = self._load_font(size)
+            self._fonts[size] = font
+        return font
+
+    def _load_font(self, size: int) -> ImageFont.FreeTypeFont:
+        """加载支持中文的字体"""
         # 尝试使用系统字体
         for font_path in self.FONT_PATHS:
             if os.path.exists(font_path):
@@ -101,7 +146,11 @@ class TemplateCoverGenerator(BaseCoverGenerator):
 
         # 如果所有字体都失败，使用默认字体
         logger.warning("[TemplateCover] 无法加载中文字体，使用默认字体")
-        return ImageFont.load_default()
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:
+            # Pillow < 10.1 的 load_default 不支持字号，只有固定大小的位图字体
+            return ImageFont.load_default()
 
     def _draw_modern_background(self, draw, width: int, height: int):
         """绘制现代化背景"""
@@ -151,48 +200,47 @@ class TemplateCoverGenerator(BaseCoverGenerator):
             x = 60 + i * 30
             draw.ellipse([(x, dot_y), (x + 8, dot_y + 8)], fill=self.theme_rgb)
 
-    def _draw_title(self, draw, title: str, width: int, height: int):
-        """绘制标题文字（支持中文）"""
-        # 获取中文字体
-        font = self._get_font(56, bold=True)
-
-        # 如果标题太长，进行截断
-        max_chars = 20
-        if len(title) > max_chars:
-            title = title[:max_chars-2] + "..."
-            logger.info(f"[TemplateCover] 标题过长，已截断: {title}")
-
-        # 计算文字位置（居中偏上）
-        bbox = draw.textbbox((0, 0), title, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-
-        x = (width - text_width) // 2
-        y = height // 2 - text_height // 2 - 20
-
-        # 绘制阴影（增加立体感）
-        shadow_offset = 3
-        draw.text(
-            (x + shadow_offset, y + shadow_offset),
+    def _draw_title(self, draw, title: str, width: int, height: int) -> TextLayoutResult:
+        """绘制标题文字（支持中文，自动换行并适配字号）"""
+        layout = self._layout.fit(
             title,
-            font=font,
-            fill=(180, 180, 180)
+            lambda size: self._get_font(size, bold=True),
+            max_width=width - 2 * self.TITLE_MARGIN,
+            max_lines=self.TITLE_MAX_LINES,
+            max_size=self.TITLE_MAX_FONT_SIZE,
+            min_size=self.TITLE_MIN_FONT_SIZE,
         )
 
-        # 绘制主文字
-        draw.text((x, y), title, font=font, fill=(33, 33, 33))
+        # 计算文字位置（整体居中偏上）
+        y = height // 2 - layout.block_height // 2 - 20
+
+        for line, line_width in zip(layout.lines, layout.line_widths):
+            x = int((width - line_width) // 2)
+
+            # 绘制阴影（增加立体感）
+            shadow_offset = 3
+            draw.text(
+                (x + shadow_offset, y + shadow_offset), line, font=layout.font, fill=(180, 180, 180)
+            )
+
+            # 绘制主文字
+            draw.text((x, y), line, font=layout.font, fill=(33, 33, 33))
+            y += layout.line_height
+
+        return layout
 
-    def _draw_subtitle(self, draw, subtitle: str, width: int, height: int):
+    def _draw_subtitle(
+        self, draw, subtitle: str, width: int, height: int, top: Optional[int] = None
+    ):
         """绘制副标题"""
         # 使用较小的字体
         font = self._get_font(32)
 
         # 计算文字位置
-        bbox = draw.textbbox((0, 0), subtitle, font=font)
-        text_width = bbox[2] - bbox[0]
+        text_width = self._layout.metrics.text_width(font, subtitle)
 
-        x = (width - text_width) // 2
-        y = height // 2 + 40
+        x = int((width - text_width) // 2)
+        y = max(height // 2 + 40, top or 0)
 
         # 绘制副标题
         draw.text((x, y), subtitle, font=font, fill=(102, 102, 102))
@@ -0,0 +1,199 @@
+"""封面文字排版 - 中日韩文字换行与字号自适应"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional
+
+from PIL import ImageFont
+
+logger = logging.getLogger(__name__)
+
+# 不能出现在行首的标点（避头）
+NO_LINE_START = set("，。、；：？！）》」』】〕〉”’…—·,.;:?!)]}%")
+# 不能出现在行尾的标点（避尾）
+NO_LINE_END = set("（《「『【〔〈“‘([{")
+
+# 连续的拉丁字母、数字等视为一个不可拆分的单词
+_UNIT_PATTERN = re.compile(r"[A-Za-z0-9_\-'.@#&+/]+|\s+|.", re.DOTALL)
+
+ELLIPSIS = "…"
+
+
+class GlyphMetricsCache:
+    """字形宽度缓存
+
+    按 (字体文件, 字号) 缓存每个字符的前进宽度，排版时每个字符只测量一次，
+    候选行宽度通过累加得到，无需对每个候选行调用 textbbox。
+    """
+
+    def __init__(self):
+        self._tables: Dict[Hashable, Dict[str, float]] = {}
+        self.measurements = 0
+
+    @staticmethod
+    def font_key(font: ImageFont.ImageFont) -> Optional[Hashable]:
+        """字体的缓存键；无法可靠标识的字体（如 load_default 返回的内存字体）返回 None，不缓存
+
+        缓存在所有封面生成器间共享，不能使用 id(font)：字体被回收后 id 可能被新字体复用。
+        """
+        size = getattr(font, "size", None)
+        path = getattr(font, "path", None)
+        if isinstance(path, (str, os.PathLike)):
+            return (os.fspath(path), getattr(font, "index", 0), size)
+        if path is None and size is not None and hasattr(font, "getname"):
+            return (font.getname(), size)
+        return None
+
+    def advance(self, font: ImageFont.ImageFont, char: str) -> float:
+        """单个字符的前进宽度"""
+        key = self.font_key(font)
+        if key is None:
+            self.measurements += 1
+            return font.getlength(char)
+        table = self._tables.setdefault(key, {})
+        width = table.get(char)
+        if width is None:
+            width = font.getlength(char)
+            table[char] = width
+            self.measurements += 1
+        return width
+
+    def text_width(self, font: ImageFont.ImageFont, text: str) -> float:
+        """文本宽度（字符宽度之和）"""
+        return sum(self.advance(font, char) for char in text)
+
+    def clear(self):
+        self._tables.clear()
+        self.measurements = 0
+
+
+@dataclass
+class TextLayoutResult:
+    """排版结果"""
+
+    lines: List[str]
+    font: ImageFont.ImageFont
+    font_size: int
+    line_height: int
+    line_widths: List[float]
+    truncated: bool = False
+
+    @property
+    def block_height(self) -> int:
+        return self.line_height * len(self.lines)
+
+
+class TextLayout:
+    """支持中日韩文字的换行排版"""
+
+    def __init__(self, metrics: Optional[GlyphMetricsCache] = None):
+        self.metrics = metrics or GlyphMetricsCache()
+
+    def split_units(self, text: str) -> List[str]:
+        """将文本拆分为换行单元
+
+        中日韩字符可在任意两字之间断行；拉丁单词保持完整；
+        避头标点并入前一个单元，避尾标点并入后一个单元。
+        """
+        units: List[str] = []
+        carry = ""
+        for unit in _UNIT_PATTERN.findall(text):
+            if carry:
+                unit = carry + unit
+                carry = ""
+            if unit[-1] in NO_LINE_END:
+                carry = unit
+                continue
+            if units and unit[0] in NO_LINE_START and not units[-1].isspace():
+                units[-1] += unit
+                continue
+            units.append(unit)
+        if carry:
+            units.append(carry)
+        return units
+
+    def wrap(self, text: str, font: ImageFont.ImageFont, max_width: float) -> List[str]:
+        """按最大宽度贪心换行"""
+        lines: List[str] = []
+        current = ""
+        current_width = 0.0
+
+        for unit in self.split_units(text):
+            unit_width = self.metrics.text_width(font, unit)
+
+            if current_width + unit_width <= max_width:
+                current += unit
+                current_width += unit_width
+                continue
+
+            if unit.isspace():
+                # 行尾空白直接丢弃
+                continue
+
+            if current.strip():
+                lines.append(current.rstrip())
+
+            if unit_width <= max_width:
+                current, current_width = unit, unit_width
+            else:
+                # 超长单词按字符拆分
+                current, current_width = "", 0.0
+                for char in unit:
+                    char_width = self.metrics.advance(font, char)
+                    if current and current_width + char_width > max_width:
+                        lines.append(current)
+                        current, current_width = "", 0.0
+                    current += char
+                    current_width += char_width
+
+        if current.strip():
+            lines.append(current.rstrip())
+        return lines
+
+    def fit(
+        self,
+        text: str,
+        font_loader: Callable[[int], ImageFont.ImageFont],
+        max_width: float,
+        max_lines: int = 3,
+        max_size: int = 56,
+        min_size: int = 32,
+        step: int = 4,
+        line_spacing: float = 1.25,
+    ) -> TextLayoutResult:
+        """在行数限制内选择最大的字号，最小字号仍放不下时截断末行"""
+        text = " ".join(text.split())
+        size = max_size
+        while True:
+            font = font_loader(size)
+            lines = self.wrap(text, font, max_width)
+            if len(lines) <= max_lines or size - step < min_size:
+                break
+            size -= step
+
+        truncated = len(lines) > max_lines
+        if truncated:
+            lines = lines[:max_lines]
+            lines[-1] = self._truncate(lines[-1], font, max_width)
+            logger.info(f"[TextLayout] 标题过长，最小字号下仍超出 {max_lines} 行，已截断")
+
+        return TextLayoutResult(
+            lines=lines,
+            font=font,
+            font_size=size,
+            line_height=int(size * line_spacing),
+            line_widths=[self.metrics.text_width(font, line) for line in lines],
+            truncated=truncated,
+        )
+
+    def _truncate(self, line: str, font: ImageFont.ImageFont, max_width: float) -> str:
+        """截断行并追加省略号"""
+        budget = max_width - self.metrics.advance(font, ELLIPSIS)
+        width = 0.0
+        for i, char in enumerate(line):
+            width += self.metrics.advance(font, char)
+            if width > budget:
+                return line[:i].rstrip() + ELLIPSIS
+        return line.rstrip() + ELLIPSIS
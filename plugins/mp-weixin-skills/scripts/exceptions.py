@@ -60,8 +60,10 @@ class WechatApiError(MpWeixinError):
     """微信公众号 API 异常"""
 
     ERROR_CODES = {
-        40001: "AppSecret 错误",
+        40001: "AppSecret 错误或 access_token 无效",
         40013: "不合法的 AppID",
+        40014: "不合法的 access_token",
+        40125: "AppSecret 无效",
         42001: "access_token 超时",
         45011: "API 调用太频繁",
     }
@@ -77,6 +79,12 @@ class WechatApiError(MpWeixinError):
         return f"❌ 微信公众号 API 错误\n\n{self.message}"
 
 
+class MediaTooLargeError(WechatApiError):
+    """素材超出微信大小限制（本地预检，重试也不会成功）"""
+
+    pass
+
+
 class ConversionError(MpWeixinError):
     """内容转换异常"""
     pass
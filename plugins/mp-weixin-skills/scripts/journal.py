@@ -0,0 +1,548 @@
+"""任务日志 - 基于 SQLite 的持久化任务队列，支持断点续传、失败重试与崩溃恢复
+
+每个发布/更新任务及其步骤（解析、封面、每张图片上传、草稿新增）都记录在同一个
+SQLite 文件中。步骤按键幂等：已完成的步骤直接返回记录的结果，不再重复调用微信 API，
+因此中途失败或进程崩溃后重新运行同一任务只会执行剩余的步骤。
+
+任务状态:
+
+    pending     等待执行（新任务，或失败后等待 next_run_at 到达再重试）
+    running     正在执行（记录执行进程 owner 与心跳；owner 已退出或心跳超时的任务由 recover() 改回 pending）
+    succeeded   已完成
+    failed      已放弃（不可重试的错误，或重试次数用尽）
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from exceptions import (
+    ConversionError,
+    MediaTooLargeError,
+    MpWeixinError,
+    ParserError,
+    WechatApiError,
+)
+from utils.logger import ContextThreadPoolExecutor, log_context, new_job_id
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("pending", "running", "succeeded", "failed")
+
+# AppID / AppSecret 错误重试也不会成功；40001/40014/42001 多为 token 被其他进程刷新，
+# API 客户端会作废旧 token，任务重试时使用新 token
+FATAL_ERRCODES = (40013, 40125)
+
+# 执行中的任务每隔 HEARTBEAT_INTERVAL 秒刷新心跳，超过 OWNER_STALE_SECONDS 未刷新视为执行进程已退出
+HEARTBEAT_INTERVAL = 10.0
+OWNER_STALE_SECONDS = 60.0
+
+# run_pending 等待重试任务到期时的最短轮询间隔
+MIN_POLL_SECONDS = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_run_at REAL NOT NULL,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, next_run_at);
+CREATE TABLE IF NOT EXISTS steps (
+    job_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, key)
+);
+"""
+
+
+@dataclass
+class JournalJob:
+    """任务日志中的一条任务记录"""
+
+    id: str
+    type: str
+    params: Dict
+    status: str
+    attempts: int
+    next_run_at: float
+    error: Optional[str]
+    result: Optional[Dict]
+    created_at: float
+    updated_at: float
+    owner: Optional[str] = None  # 执行进程 "主机名:pid"
+    heartbeat_at: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "JournalJob":
+        return cls(
+            id=row["id"],
+            type=row["type"],
+            params=json.loads(row["params"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            next_run_at=row["next_run_at"],
+            error=row["error"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+            owner=row["owner"],
+            heartbeat_at=row["heartbeat_at"],
+        )
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+class JobJournal:
+    """SQLite 任务日志（线程安全，所有线程共用一个连接）
+
+    使用 WAL 模式，每次状态变更和步骤记录都立即提交，进程崩溃时最多丢失正在执行的那一步。
+
+    多个进程（CLI publish、jobs run、serve）可以共用同一个日志文件：start() 以
+    "主机名:pid" 认领任务并由后台线程定期刷新心跳，其他进程不会执行、恢复或续传
+    owner 仍然存活的任务。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._heartbeat: Optional[threading.Thread] = None
+        self._closing = threading.Event()
+
+    def _migrate(self):
+        """为旧版本创建的日志文件补充 owner / heartbeat_at 列"""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def close(self):
+        self._closing.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        with self._lock:
+            self._conn.close()
+
+    def is_owner_alive(self, job: JournalJob, now: Optional[float] = None) -> bool:
+        """执行该任务的进程是否仍然存活（本进程认领的任务总是视为存活）"""
+        if not job.owner:
+            return False
+        if job.owner == self.owner:
+            return True
+        now = now if now is not None else time.time()
+        if job.heartbeat_at is None or now - job.heartbeat_at > OWNER_STALE_SECONDS:
+            return False
+        host, _, pid = job.owner.rpartition(":")
+        if host == socket.gethostname() and pid.isdigit():
+            # 同一主机上可以直接检查进程是否存在，进程退出后无需等待心跳超时
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return False
+            except PermissionError:
+                pass
+        return True
+
+    def _is_running_elsewhere(self, job: JournalJob) -> bool:
+        return job.status == "running" and job.owner != self.owner and self.is_owner_alive(job)
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(
+                target=self._heartbeat_loop, name="journal-heartbeat", daemon=True
+            )
+            self._heartbeat.start()
+
+    def _heartbeat_loop(self):
+        while not self._closing.wait(HEARTBEAT_INTERVAL):
+            try:
+                self._execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = 'running'",
+                    (time.time(), self.owner),
+                )
+            except sqlite3.Error as e:
+                logger.warning("[Journal] 刷新心跳失败: %s", e)
+
+    def _execute(self, sql: str, args: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    # ---- 任务 ----
+
+    def create(self, job_type: str, params: Dict, job_id: Optional[str] = None) -> JournalJob:
+        """新建待执行的任务"""
+        now = time.time()
+        job_id = job_id or new_job_id()
+        self._execute(
+            "INSERT INTO jobs (id, type, params, status, next_run_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+            (job_id, job_type, _dumps(params), now, now, now),
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[JournalJob]:
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return JournalJob.from_row(rows[0]) if rows else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[JournalJob]:
+        """最近的任务（新的在前）"""
+        if status:
+            rows = self._execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                (status, limit),
+            )
+        else:
+            rows = self._execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [JournalJob.from_row(row) for row in rows]
+
+    def find_unfinished(self, job_type: str, params: Dict) -> Optional[JournalJob]:
+        """参数完全相同且尚未成功的最近一个任务（用于重新运行时续传）
+
+        跳过正在由其他存活进程执行的任务。
+        """
+        rows = self._execute(
+            "SELECT * FROM jobs WHERE type = ? AND params = ? AND status != 'succeeded'"
+            " ORDER BY created_at DESC",
+            (job_type, _dumps(params)),
+        )
+        for row in rows:
+            job = JournalJob.from_row(row)
+            if not self._is_running_elsewhere(job):
+                return job
+        return None
+
+    def start(self, job_id: str) -> Optional[JournalJob]:
+        """认领任务：标记为执行中、记录 owner 并累加尝试次数
+
+        任务正由其他存活进程执行，或在读取与更新之间被其他进程抢先认领时返回 None。
+        """
+        job = self.get(job_id)
+        if job is None or self._is_running_elsewhere(job):
+            return None
+
+        now = time.time()
+        with self._lock:
+            # 乐观锁：只有状态与 owner 仍与读取时一致才认领
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?,"
+                " heartbeat_at = ?, updated_at = ?"
+                " WHERE id = ? AND status = ? AND IFNULL(owner, '') = ? AND IFNULL(heartbeat_at, 0) = ?",
+                (self.owner, now, now, job_id, job.status, job.owner or "", job.heartbeat_at or 0),
+            ).rowcount
+        if not claimed:
+            return None
+        self._start_heartbeat()
+        return self.get(job_id)
+
+    def succeed(self, job_id: str, result: Dict) -> JournalJob:
+        self._execute(
+            "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+            (_dumps(result), time.time(), job_id),
+        )
+        return self.get(job_id)
+
+    def fail(self, job_id: str, error: str, retry_at: Optional[float] = None) -> JournalJob:
+        """记录失败：指定 retry_at 时等待重试，否则放弃"""
+        now = time.time()
+        if retry_at is None:
+            self._execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                (error, now, job_id),
+            )
+        else:
+            self._execute(
+                "UPDATE jobs SET status = 'pending', error = ?, next_run_at = ?, updated_at = ? WHERE id = ?",
+                (error, retry_at, now, job_id),
+            )
+        return self.get(job_id)
+
+    def requeue(self, job_id: str) -> JournalJob:
+        """将已放弃的任务重新放回队列（尝试次数清零，已完成的步骤保留）"""
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, next_run_at = ?, updated_at = ? WHERE id = ?",
+            (now, now, job_id),
+        )
+        return self.get(job_id)
+
+    def recover(self) -> List[JournalJob]:
+        """崩溃恢复：将 owner 已退出或心跳超时的 running 任务改回 pending，返回所有待执行任务"""
+        now = time.time()
+        interrupted = 0
+        for row in self._execute("SELECT * FROM jobs WHERE status = 'running'"):
+            job = JournalJob.from_row(row)
+            if job.owner == self.owner or self.is_owner_alive(job, now):
+                continue
+            with self._lock:
+                interrupted += self._conn.execute(
+                    "UPDATE jobs SET status = 'pending', owner = NULL, updated_at = ?"
+                    " WHERE id = ? AND status = 'running' AND IFNULL(heartbeat_at, 0) = ?",
+                    (now, job.id, job.heartbeat_at or 0),
+                ).rowcount
+        if interrupted:
+            logger.info("[Journal] 恢复 %s 个中断的任务", interrupted)
+        rows = self._execute("SELECT * FROM jobs WHERE status = 'pending' ORDER BY next_run_at")
+        return [JournalJob.from_row(row) for row in rows]
+
+    def due(self, now: Optional[float] = None, limit: int = 100) -> List[JournalJob]:
+        """已到执行时间的待执行任务"""
+        rows = self._execute(
+            "SELECT * FROM jobs WHERE status = 'pending' AND next_run_at <= ? ORDER BY next_run_at LIMIT ?",
+            (now if now is not None else time.time(), limit),
+        )
+        return [JournalJob.from_row(row) for row in rows]
+
+    def next_run_at(self) -> Optional[float]:
+        """最早的待执行时间，没有待执行任务时返回 None"""
+        rows = self._execute("SELECT MIN(next_run_at) AS at FROM jobs WHERE status = 'pending'")
+        return rows[0]["at"]
+
+    # ---- 步骤 ----
+
+    def get_step(self, job_id: str, key: str) -> Optional[Any]:
+        rows = self._execute("SELECT result FROM steps WHERE job_id = ? AND key = ?", (job_id, key))
+        return json.loads(rows[0]["result"]) if rows else None
+
+    def put_step(self, job_id: str, key: str, result: Any):
+        self._execute(
+            "INSERT OR REPLACE INTO steps (job_id, key, result, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, key, _dumps(result), time.time()),
+        )
+
+    def steps(self, job_id: str) -> Dict[str, Any]:
+        rows = self._execute(
+            "SELECT key, result FROM steps WHERE job_id = ? ORDER BY created_at", (job_id,)
+        )
+        return {row["key"]: json.loads(row["result"]) for row in rows}
+
+
+class JobSteps:
+    """一个任务的幂等步骤记录"""
+
+    def __init__(self, journal: JobJournal, job_id: str):
+        self.journal = journal
+        self.job_id = job_id
+        self.skipped = 0
+
+    def run(self, key: str, func: Callable[[], Any]) -> Any:
+        """执行步骤并记录结果；该步骤已完成时直接返回记录的结果"""
+        done = self.journal.get_step(self.job_id, key)
+        if done is not None:
+            self.skipped += 1
+            logger.info("[Journal] 跳过已完成的步骤: %s", key)
+            return done
+        result = func()
+        self.journal.put_step(self.job_id, key, result)
+        return result
+
+    def wrap(self, api_client) -> "JournaledApiClient":
+        """包装 API 客户端，使素材上传按内容幂等"""
+        return JournaledApiClient(api_client, self)
+
+
+def _content_digest(file_path: str, fileobj: Optional[BinaryIO]) -> str:
+    digest = hashlib.sha256()
+    if fileobj is not None:
+        for chunk in iter(lambda: fileobj.read(1 << 16), b""):
+            digest.update(chunk)
+        fileobj.seek(0)
+    else:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class JournaledApiClient:
+    """按文件内容记录素材上传结果的 API 客户端代理
+
+    同一任务中内容相同的文件只上传一次，续传时已上传的图片直接使用记录的 URL。
+    其余方法原样转发给被包装的客户端。
+    """
+
+    def __init__(self, api_client, steps: JobSteps):
+        self._client = api_client
+        self._steps = steps
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def upload_media(
+        self, file_path: str, media_type: str = "thumb", fileobj: Optional[BinaryIO] = None
+    ) -> Dict:
+        key = f"upload:{media_type}:{_content_digest(file_path, fileobj)}"
+        return self._steps.run(
+            key, lambda: self._client.upload_media(file_path, media_type, fileobj=fileobj)
+        )
+
+
+def is_retryable(error: Exception) -> bool:
+    """判断任务失败后是否值得重试
+
+    源文件或参数错误、AppID/AppSecret 错误、素材超限、图片无法压缩到预算内不重试；
+    网络错误、响应截断、限流、token 失效与微信服务端错误等可以重试。
+    """
+    if isinstance(error, json.JSONDecodeError):
+        # 响应被截断等导致的 JSON 解析失败（含 requests 的 JSONDecodeError）
+        return True
+    if isinstance(
+        error, (ParserError, ConversionError, ValueError, FileNotFoundError, MediaTooLargeError)
+    ):
+        return False
+    if isinstance(error, WechatApiError) and error.errcode in FATAL_ERRCODES:
+        return False
+    return True
+
+
+def retry_delay(attempt: int, base: float, maximum: float) -> float:
+    """第 attempt 次失败后的等待秒数：指数退避，取上限后在 [delay/2, delay] 之间随机"""
+    delay = min(maximum, base * 2 ** max(0, attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class JobRunner:
+    """执行任务日志中的任务
+
+    handler(job_type, params, steps) 执行任务并返回结果字典。失败时按指数退避安排重试，
+    达到 max_attempts 或遇到不可重试的错误后放弃。
+    """
+
+    def __init__(
+        self,
+        journal: JobJournal,
+        handler: Callable[[str, Dict, JobSteps], Dict],
+        concurrency: int = 2,
+        max_attempts: int = 5,
+        retry_base: float = 2.0,
+        retry_max: float = 300.0,
+    ):
+        self.journal = journal
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+    def execute(self, job_id: str) -> Optional[JournalJob]:
+        """执行一次任务，返回更新后的记录（不抛出任务本身的异常）
+
+        任务正由其他进程执行时不执行，返回 None。
+        """
+        job = self.journal.start(job_id)
+        if job is None:
+            logger.warning("[Journal] 任务正在其他进程中执行，跳过: %s", job_id)
+            return None
+        steps = JobSteps(self.journal, job.id)
+        with log_context(job_id=job.id, source_file=job.params.get("file", "")):
+            logger.info("[Journal] 执行任务: %s %s（第 %s 次）", job.id, job.type, job.attempts)
+            try:
+                result = self.handler(job.type, job.params, steps)
+            except Exception as e:
+                message = e.user_message() if isinstance(e, MpWeixinError) else str(e)
+                if isinstance(e, MpWeixinError):
+                    logger.error("[Journal] 任务失败: %s, 错误: %s", job.id, message)
+                else:
+                    logger.exception("[Journal] 任务异常: %s", job.id)
+                return self._fail(job, e, message)
+
+            if steps.skipped:
+                logger.info("[Journal] 任务续传完成，跳过 %s 个已完成的步骤", steps.skipped)
+            return self.journal.succeed(job.id, result)
+
+    def _fail(self, job: JournalJob, error: Exception, message: str) -> JournalJob:
+        if not is_retryable(error) or job.attempts >= self.max_attempts:
+            logger.warning("[Journal] 放弃任务: %s（已尝试 %s 次）", job.id, job.attempts)
+            return self.journal.fail(job.id, message)
+        delay = retry_delay(job.attempts, self.retry_base, self.retry_max)
+        logger.info("[Journal] 任务将在 %.1f 秒后重试: %s", delay, job.id)
+        return self.journal.fail(job.id, message, retry_at=time.time() + delay)
+
+    def run_pending(self, stop: Optional[threading.Event] = None) -> List[JournalJob]:
+        """恢复中断的任务并执行所有待执行任务（含重试），直到没有待执行任务或 stop 被设置
+
+        任一任务完成后立即从队列补充新任务，始终保持最多 concurrency 个任务同时执行，
+        慢任务不会阻塞其他空闲的执行槽。stop 被设置后等待执行中的任务结束再返回。
+        返回本次执行过的任务的最终记录。
+        """
+        self.journal.recover()
+        stop = stop or threading.Event()
+        finished: Dict[str, JournalJob] = {}
+        running: Dict[Future, str] = {}
+
+        with ContextThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="journal"
+        ) as pool:
+            while True:
+                if not stop.is_set():
+                    self._fill(pool, running)
+
+                next_run_at = self.journal.next_run_at()
+                if not running:
+                    if stop.is_set() or next_run_at is None:
+                        break
+                    stop.wait(max(0.0, next_run_at - time.time()))
+                    continue
+
+                # 有空闲执行槽时，在下一个重试任务到期时醒来补充
+                timeout = None
+                if len(running) < self.concurrency and next_run_at is not None:
+                    timeout = max(MIN_POLL_SECONDS, next_run_at - time.time())
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    record = future.result()
+                    if record is not None:
+                        finished[record.id] = record
+        return list(finished.values())
+
+    def _fill(self, pool: ContextThreadPoolExecutor, running: Dict[Future, str]):
+        """将到期的任务提交到空闲的执行槽"""
+        free = self.concurrency - len(running)
+        if free <= 0:
+            return
+        # 已提交但尚未开始执行的任务仍是 pending，需要排除
+        in_flight = set(running.values())
+        for job in self.journal.due(limit=free + len(in_flight)):
+            if job.id in in_flight:
+                continue
+            running[pool.submit(self.execute, job.id)] = job.id
+            free -= 1
+            if free == 0:
+                break
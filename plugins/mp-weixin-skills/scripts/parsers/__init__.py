@@ -1,6 +1,7 @@
 """文档解析器模块"""
 
-from parsers.base import ParserFactory, BaseParser, ParsedContent
+from parsers.base import ParserFactory, BaseParser, ParsedContent, ImageRef
+from parsers.cache import ParseCache
 from parsers.markdown import MarkdownParser
 from parsers.word import WordParser
 from parsers.pdf import PDFParser
@@ -11,4 +12,4 @@ ParserFactory.register(".docx", WordParser())
 ParserFactory.register(".doc", WordParser())
 ParserFactory.register(".pdf", PDFParser())
 
-__all__ = ["BaseParser", "ParsedContent", "ParserFactory"]
+__all__ = ["BaseParser", "ParsedContent", "ImageRef", "ParserFactory", "ParseCache"]
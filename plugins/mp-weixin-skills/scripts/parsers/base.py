@@ -1,10 +1,42 @@
 """解析器基类"""
 
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass
 from typing import List, Optional
 from pathlib import Path
 
+from utils.timing import span
+
+
+@dataclass
+class ImageRef:
+    """文档中的图片引用
+
+    由解析器在解析时统一生成，下游的下载、优化、上传和链接替换都基于该索引，
+    无需再次读取或扫描源文件。
+    """
+
+    src: str  # 文档中的原始地址（即 HTML 中 <img src> 对应的路径）
+    alt: str = ""
+    kind: str = "relative"  # remote | absolute | relative | embedded
+    resolved_path: Optional[Path] = None  # 本地图片的完整路径，远程/内嵌图片为 None
+    position: int = 0  # 在文档图片序列中的序号
+    line: Optional[int] = None  # 源文件中的行号或段落序号（从 1 开始）
+    container: Optional[Path] = None  # 内嵌图片所在的文档包（如 .docx）
+    part_name: Optional[str] = None  # 内嵌图片在文档包中的成员名（如 word/media/image1.png）
+    digest: Optional[str] = None  # 内嵌图片内容哈希，用于去重
+    byte_size: Optional[int] = None  # 内嵌图片大小
+
+    @staticmethod
+    def classify(src: str) -> str:
+        """判断图片地址类型"""
+        if src.startswith(("http://", "https://")):
+            return "remote"
+        if src.startswith("/"):
+            return "absolute"
+        return "relative"
+
 
 @dataclass
 class ParsedContent:
@@ -15,6 +47,7 @@ class ParsedContent:
     images: List[Path]
     metadata: dict
     toc: Optional[List[dict]] = None
+    image_refs: Optional[List[ImageRef]] = None
 
     def __post_init__(self):
         if self.images is None:
@@ -23,6 +56,8 @@ class ParsedContent:
             self.metadata = {}
         if self.toc is None:
             self.toc = []
+        if self.image_refs is None:
+            self.image_refs = []
 
 
 class BaseParser(ABC):
@@ -38,11 +73,19 @@ class BaseParser(ABC):
         """判断是否支持该文件类型"""
         pass
 
+    def cache_config(self) -> dict:
+        """影响解析结果的配置，作为解析缓存的指纹（需可 JSON 序列化）"""
+        return {}
+
 
 class ParserFactory:
-    """解析器工厂"""
+    """解析器工厂
+
+    启用缓存（enable_cache）后，parse() 在所有已注册解析器之前透明地查询解析结果缓存。
+    """
 
     _parsers = {}
+    _cache = None
 
     @classmethod
     def register(cls, suffix: str, parser: BaseParser):
@@ -59,6 +102,41 @@ class ParserFactory:
             raise UnsupportedFileTypeError(str(file_path), ext)
         return parser
 
+    @classmethod
+    def enable_cache(cls, cache):
+        """启用解析结果缓存（传入 None 关闭）"""
+        cls._cache = cache
+
+    @classmethod
+    @contextmanager
+    def isolated(cls):
+        """with 块内对解析器注册和解析缓存的修改在退出时撤销
+
+        用于在当前进程中临时套用其他配置（如批量转换的顺序执行），不影响之后的解析。
+        """
+        parsers, cache = dict(cls._parsers), cls._cache
+        try:
+            yield
+        finally:
+            cls._parsers.clear()
+            cls._parsers.update(parsers)
+            cls._cache = cache
+
+    @classmethod
+    def parse(cls, file_path: Path) -> ParsedContent:
+        """解析文档，启用缓存时优先复用未变化文件的解析结果"""
+        parser = cls.get_parser(file_path)
+        with span("parse", parser=type(parser).__name__) as attrs:
+            if cls._cache is None:
+                return parser.parse(file_path)
+
+            parsed = cls._cache.get(file_path, parser)
+            attrs["cached"] = parsed is not None
+            if parsed is None:
+                parsed = parser.parse(file_path)
+                cls._cache.put(file_path, parser, parsed)
+            return parsed
+
     @classmethod
     def supports(cls, file_path: Path) -> bool:
         """判断是否支持该文件类型"""
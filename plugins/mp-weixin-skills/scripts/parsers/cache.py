@@ -0,0 +1,220 @@
+"""解析结果缓存 - 按文件路径、修改时间、大小和内容哈希复用解析结果"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Optional
+
+from parsers.base import BaseParser, ImageRef, ParsedContent
+from utils.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# ImageRef 中的路径字段，序列化为字符串
+_REF_PATH_FIELDS = ("resolved_path", "container")
+
+
+class ParseCache:
+    """磁盘上的解析结果缓存（JSON，不使用 pickle）
+
+    每个源文件与解析器配置（cache_config）对应一个条目文件，条目中记录源文件的 mtime、大小和 sha256：
+    - mtime 与大小都未变化时直接命中，只需一次 stat()
+    - 任一变化时计算内容哈希，内容相同（如 touch、git checkout）仍命中并刷新记录
+    条目按文件名写入并原子替换，多进程同时读写也不会读到半个文件。
+    总大小超过 max_bytes 时按最近访问时间淘汰。
+    """
+
+    # 缓存格式版本，解析器输出变化时递增
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 总大小只在首次写入时扫描一次，之后随写入累加，超出上限时才扫描淘汰
+        self._tracked_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path: Path, parser: BaseParser) -> Optional[ParsedContent]:
+        """查找缓存，未命中或已失效时返回 None"""
+        entry_path = self._entry_path(file_path, parser)
+        try:
+            entry = json.loads(entry_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return self._miss()
+        except ValueError as e:
+            logger.warning(f"[ParseCache] 缓存条目损坏，已忽略: {entry_path.name}, 错误: {e}")
+            return self._miss()
+
+        if (
+            entry.get("version") != self.CACHE_VERSION
+            or entry.get("parser") != self._parser_name(parser)
+            or entry.get("config") != self._parser_config(parser)
+        ):
+            return self._miss()
+
+        stat = file_path.stat()
+        if (entry["mtime_ns"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+            if entry["sha256"] != self._file_hash(file_path):
+                return self._miss()
+            # 内容未变，仅时间戳变化：刷新记录，下次只需 stat()
+            entry["mtime_ns"], entry["size"] = stat.st_mtime_ns, stat.st_size
+            self._write_entry(entry_path, entry)
+
+        # 解析时生成的文件（如 PDF 提取的图片）已被清理则视为失效
+        if any(not Path(path).exists() for path in entry.get("artifacts", [])):
+            return self._miss()
+
+        os.utime(entry_path)
+        with self._lock:
+            self.hits += 1
+        CACHE_REQUESTS.labels(cache="parse", result="hit").inc()
+        logger.debug(f"[ParseCache] 命中缓存: {file_path}")
+        return self._deserialize(entry["result"])
+
+    def put(self, file_path: Path, parser: BaseParser, parsed: ParsedContent):
+        """写入缓存"""
+        stat = file_path.stat()
+        entry = {
+            "version": self.CACHE_VERSION,
+            "path": str(file_path.resolve()),
+            "parser": self._parser_name(parser),
+            "config": self._parser_config(parser),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": self._file_hash(file_path),
+            "artifacts": [str(path) for path in parsed.images if Path(path).exists()],
+            "result": self._serialize(parsed),
+        }
+        entry_path = self._entry_path(file_path, parser)
+        try:
+            written = self._write_entry(entry_path, entry)
+        except OSError as e:
+            # 缓存只是加速手段，写入失败（如缓存目录被清理）不影响解析结果
+            logger.warning(f"[ParseCache] 写入缓存失败: {e}")
+            return
+
+        with self._lock:
+            if self._tracked_bytes is None:
+                self._tracked_bytes = self.total_bytes
+            else:
+                self._tracked_bytes += written
+            if self._tracked_bytes > self.max_bytes:
+                self._tracked_bytes = self._evict(keep=entry_path)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self.cache_dir.glob("*.json"))
+
+    def _miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+        CACHE_REQUESTS.labels(cache="parse", result="miss").inc()
+        return None
+
+    def _entry_path(self, file_path: Path, parser: BaseParser) -> Path:
+        # 不同解析器配置（如 PDF 图片输出目录）的结果分别缓存，互不覆盖
+        identity = json.dumps(
+            [str(file_path.resolve()), self._parser_name(parser), self._parser_config(parser)],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        key = hashlib.sha1(identity.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def _write_entry(self, entry_path: Path, entry: dict) -> int:
+        """原子写入条目，返回写入的字节数"""
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_name(
+            f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        data = json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, entry_path)
+        return len(data)
+
+    def _evict(self, keep: Path) -> int:
+        """按最近访问时间淘汰超出容量的条目（保留刚写入的 keep），返回淘汰后的总大小"""
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            logger.debug(f"[ParseCache] 淘汰缓存: {path.name}")
+        return total
+
+    @staticmethod
+    def _parser_name(parser: BaseParser) -> str:
+        return type(parser).__name__
+
+    @staticmethod
+    def _parser_config(parser: BaseParser) -> dict:
+        # 经 JSON 往返规范化，与条目中读回的值可直接比较
+        return json.loads(json.dumps(parser.cache_config(), default=str))
+
+    @staticmethod
+    def _file_hash(file_path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _serialize(parsed: ParsedContent) -> dict:
+        refs = []
+        for ref in parsed.image_refs:
+            data = asdict(ref)
+            for name in _REF_PATH_FIELDS:
+                if data[name] is not None:
+                    data[name] = str(data[name])
+            refs.append(data)
+
+        return {
+            "title": parsed.title,
+            "content": parsed.content,
+            "images": [str(path) for path in parsed.images],
+            "metadata": parsed.metadata,
+            "toc": parsed.toc,
+            "image_refs": refs,
+        }
+
+    @staticmethod
+    def _deserialize(data: dict) -> ParsedContent:
+        known = {f.name for f in fields(ImageRef)}
+        refs = []
+        for raw in data.get("image_refs", []):
+            raw = {key: value for key, value in raw.items() if key in known}
+            for name in _REF_PATH_FIELDS:
+                if raw.get(name) is not None:
+                    raw[name] = Path(raw[name])
+            refs.append(ImageRef(**raw))
+
+        return ParsedContent(
+            title=data["title"],
+            content=data["content"],
+            images=[Path(path) for path in data.get("images", [])],
+            metadata=data.get("metadata", {}),
+            toc=data.get("toc", []),
+            image_refs=refs,
+        )
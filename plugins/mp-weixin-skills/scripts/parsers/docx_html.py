@@ -0,0 +1,315 @@
+"""Word 文档结构转换 - WordprocessingML 元素到 HTML"""
+
+import html
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from parsers.base import ImageRef
+
+logger = logging.getLogger(__name__)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+V_NS = "urn:schemas-microsoft-com:vml"
+
+
+def w(tag: str) -> str:
+    """WordprocessingML 命名空间下的完整标签名"""
+    return f"{{{W_NS}}}{tag}"
+
+
+# 常用标签
+W_P, W_R, W_T, W_TBL, W_TR, W_TC = w("p"), w("r"), w("t"), w("tbl"), w("tr"), w("tc")
+W_PPR, W_RPR, W_VAL = w("pPr"), w("rPr"), w("val")
+W_HYPERLINK, W_SDT, W_SDT_CONTENT = w("hyperlink"), w("sdt"), w("sdtContent")
+R_ID, R_EMBED = f"{{{R_NS}}}id", f"{{{R_NS}}}embed"
+A_BLIP, V_IMAGEDATA = f"{{{A_NS}}}blip", f"{{{V_NS}}}imagedata"
+
+_HEADING_PATTERN = re.compile(r"^(?:heading|标题)\s*(\d)$")
+# 内置列表样式（List Bullet / List Number 2 等），List Paragraph、List Continue 不是列表项
+_LIST_STYLE_PATTERN = re.compile(r"^list (bullet|number)(?: (\d))?$")
+_FALSE_VALUES = {"0", "false", "off", "none"}
+
+# 行内格式: rPr 子元素 -> HTML 标签
+_RUN_FORMATS = (
+    (w("b"), "strong"),
+    (w("i"), "em"),
+    (w("u"), "u"),
+    (w("strike"), "s"),
+)
+
+
+def read_styles(styles_root) -> Dict[str, str]:
+    """读取 styles.xml，返回 {styleId: 小写样式名}"""
+    styles = {}
+    if styles_root is None:
+        return styles
+    for style in styles_root.iter(w("style")):
+        style_id = style.get(w("styleId"))
+        name = style.find(w("name"))
+        if style_id:
+            styles[style_id] = (name.get(W_VAL) if name is not None else style_id).lower()
+    return styles
+
+
+def read_numbering(numbering_root) -> Dict[Tuple[str, int], str]:
+    """读取 numbering.xml，返回 {(numId, ilvl): numFmt}"""
+    formats: Dict[Tuple[str, int], str] = {}
+    if numbering_root is None:
+        return formats
+
+    abstract_formats: Dict[str, Dict[int, str]] = {}
+    for abstract in numbering_root.iter(w("abstractNum")):
+        levels = {}
+        for lvl in abstract.iter(w("lvl")):
+            fmt = lvl.find(w("numFmt"))
+            levels[int(lvl.get(w("ilvl"), "0"))] = fmt.get(W_VAL) if fmt is not None else "decimal"
+        abstract_formats[abstract.get(w("abstractNumId"))] = levels
+
+    for num in numbering_root.iter(w("num")):
+        abstract_id = num.find(w("abstractNumId"))
+        if abstract_id is None:
+            continue
+        for ilvl, fmt in abstract_formats.get(abstract_id.get(W_VAL), {}).items():
+            formats[(num.get(w("numId")), ilvl)] = fmt
+    return formats
+
+
+@dataclass
+class DocxContext:
+    """转换所需的文档级查找表（每个文档只构建一次）"""
+
+    styles: Dict[str, str] = field(default_factory=dict)
+    numbering: Dict[Tuple[str, int], str] = field(default_factory=dict)
+    hyperlinks: Dict[str, str] = field(default_factory=dict)
+    # 根据关系 ID 解析图片引用，返回 None 表示忽略
+    resolve_image: Callable[[str, int], Optional[ImageRef]] = lambda r_id, line: None
+
+
+class DocxHTMLConverter:
+    """按文档顺序单次遍历正文，将段落、表格、列表转换为 HTML
+
+    样式通过 styleId 查表得到，不访问 python-docx 的 para.style 属性；
+    列表编号格式来自 numbering.xml 的预构建查找表。
+    """
+
+    def __init__(self, context: DocxContext):
+        self.context = context
+        self.image_refs: List[ImageRef] = []
+        self.first_text = ""
+        self._block_index = 0
+        # 当前打开的列表栈: [列表标签]
+        self._lists: List[str] = []
+
+    def convert(self, blocks: Iterable) -> str:
+        """转换正文块序列，返回 HTML"""
+        return "\n".join(self.iter_html(blocks))
+
+    def iter_html(self, blocks: Iterable) -> Iterable[str]:
+        """逐块转换正文，边遍历边输出 HTML 片段"""
+        for block in blocks:
+            yield from self.convert_block(block)
+        closing = self.close_lists()
+        if closing:
+            yield closing
+
+    def convert_block(self, block) -> List[str]:
+        """转换单个正文块（段落、表格或内容控件）"""
+        tag = block.tag
+        if tag == W_SDT:
+            content = block.find(W_SDT_CONTENT)
+            parts = []
+            if content is not None:
+                for child in content:
+                    parts.extend(self.convert_block(child))
+            return parts
+
+        self._block_index += 1
+        if tag == W_P:
+            return self._convert_paragraph(block)
+        if tag == W_TBL:
+            parts = [self.close_lists()] if self._lists else []
+            parts.append(self._convert_table(block))
+            return parts
+        return []
+
+    def close_lists(self) -> str:
+        """关闭所有打开的列表"""
+        closing = "".join(f"</li></{tag}>" for tag in reversed(self._lists))
+        self._lists = []
+        return closing
+
+    def _convert_paragraph(self, p) -> List[str]:
+        ppr = p.find(W_PPR)
+        style_name = self._style_name(ppr)
+        inline = self._convert_inline(p)
+        if not inline.strip():
+            return []
+
+        if not self.first_text:
+            self.first_text = self._plain_text(p).strip()
+
+        list_info = self._list_info(ppr, style_name)
+        if list_info is not None:
+            return [self._list_item(inline, *list_info)]
+
+        parts = [self.close_lists()] if self._lists else []
+        heading = _HEADING_PATTERN.match(style_name)
+        if heading:
+            level = min(int(heading.group(1)), 6)
+            parts.append(f"<h{level}>{inline}</h{level}>")
+        elif style_name == "title":
+            parts.append(f"<h1>{inline}</h1>")
+        elif "quote" in style_name:
+            parts.append(f"<blockquote>{inline}</blockquote>")
+        else:
+            parts.append(f"<p>{inline}</p>")
+        return parts
+
+    def _style_name(self, ppr) -> str:
+        if ppr is None:
+            return ""
+        style = ppr.find(w("pStyle"))
+        if style is None:
+            return ""
+        style_id = style.get(W_VAL, "")
+        return self.context.styles.get(style_id, style_id.lower())
+
+    def _list_info(self, ppr, style_name: str) -> Optional[Tuple[str, int]]:
+        """返回 (列表标签, 层级)，非列表段落返回 None"""
+        num_pr = ppr.find(w("numPr")) if ppr is not None else None
+        if num_pr is not None:
+            num_id = num_pr.find(w("numId"))
+            ilvl = num_pr.find(w("ilvl"))
+            num_id = num_id.get(W_VAL) if num_id is not None else None
+            level = int(ilvl.get(W_VAL, "0")) if ilvl is not None else 0
+            if num_id == "0":
+                # numId 为 0 表示显式取消了样式自带的编号
+                return None
+            if num_id:
+                fmt = self.context.numbering.get((num_id, level), "bullet")
+                return ("ul" if fmt in ("bullet", "none") else "ol"), level
+
+        match = _LIST_STYLE_PATTERN.match(style_name)
+        if match is None:
+            return None
+        tag = "ol" if match.group(1) == "number" else "ul"
+        return tag, int(match.group(2)) - 1 if match.group(2) else 0
+
+    def _list_item(self, inline: str, tag: str, level: int) -> str:
+        """输出列表项，按层级嵌套"""
+        parts = []
+        depth = level + 1
+        while len(self._lists) > depth:
+            parts.append(f"</li></{self._lists.pop()}>")
+        if len(self._lists) == depth:
+            if self._lists[-1] != tag:
+                parts.append(f"</li></{self._lists.pop()}>")
+            else:
+                parts.append("</li>")
+        while len(self._lists) < depth:
+            parts.append(f"<{tag}>")
+            self._lists.append(tag)
+        parts.append(f"<li>{inline}")
+        return "".join(parts)
+
+    def _convert_inline(self, parent) -> str:
+        """转换段落内的文本、超链接和图片"""
+        parts = []
+        for child in parent:
+            if child.tag == W_R:
+                parts.append(self._convert_run(child))
+            elif child.tag == W_HYPERLINK:
+                inner = self._convert_inline(child)
+                href = self.context.hyperlinks.get(child.get(R_ID, ""))
+                anchor = child.get(w("anchor"))
+                if href is None and anchor:
+                    href = f"#{anchor}"
+                parts.append(f'<a href="{html.escape(href)}">{inner}</a>' if href else inner)
+            elif child.tag in (w("ins"), w("smartTag"), W_SDT, W_SDT_CONTENT):
+                parts.append(self._convert_inline(child))
+        return "".join(parts)
+
+    def _convert_run(self, r) -> str:
+        parts = []
+        for child in r:
+            tag = child.tag
+            if tag == W_T:
+                parts.append(html.escape(child.text or ""))
+            elif tag == w("tab"):
+                parts.append(" ")
+            elif tag in (w("br"), w("cr")):
+                parts.append("<br>")
+            elif tag in (w("drawing"), w("pict"), w("object")):
+                parts.append(self._convert_images(child))
+        text = "".join(parts)
+        if not text:
+            return ""
+
+        rpr = r.find(W_RPR)
+        if rpr is None:
+            return text
+        for prop, html_tag in _RUN_FORMATS:
+            el = rpr.find(prop)
+            if el is not None and el.get(W_VAL, "true").lower() not in _FALSE_VALUES:
+                text = f"<{html_tag}>{text}</{html_tag}>"
+        valign = rpr.find(w("vertAlign"))
+        if valign is not None and valign.get(W_VAL) in ("superscript", "subscript"):
+            html_tag = "sup" if valign.get(W_VAL) == "superscript" else "sub"
+            text = f"<{html_tag}>{text}</{html_tag}>"
+        return text
+
+    def _convert_images(self, element) -> str:
+        parts = []
+        for node in element.iter(A_BLIP, V_IMAGEDATA):
+            r_id = node.get(R_EMBED) if node.tag == A_BLIP else node.get(R_ID)
+            ref = self.context.resolve_image(r_id, self._block_index) if r_id else None
+            if ref is None:
+                continue
+            ref.position = len(self.image_refs)
+            self.image_refs.append(ref)
+            parts.append(f'<img src="{html.escape(ref.src)}" alt="{html.escape(ref.alt)}">')
+        return "".join(parts)
+
+    def _convert_table(self, tbl) -> str:
+        rows = []
+        header_first = self._has_header_row(tbl)
+        for row_index, tr in enumerate(tbl.iter(W_TR)):
+            if tr.getparent() is not tbl:
+                continue
+            trpr = tr.find(w("trPr"))
+            is_header = (row_index == 0 and header_first) or (
+                trpr is not None and trpr.find(w("tblHeader")) is not None
+            )
+            cell_tag = "th" if is_header else "td"
+            cells = []
+            for tc in tr.findall(W_TC):
+                content = "<br>".join(
+                    inline
+                    for inline in (self._convert_inline(p) for p in tc.findall(W_P))
+                    if inline.strip()
+                )
+                for nested in tc.findall(W_TBL):
+                    content += self._convert_table(nested)
+                cells.append(f"<{cell_tag}>{content}</{cell_tag}>")
+            rows.append(f"<tr>{''.join(cells)}</tr>")
+        return f"<table>{''.join(rows)}</table>"
+
+    @staticmethod
+    def _has_header_row(tbl) -> bool:
+        """表格样式是否启用了首行标题（tblLook firstRow）"""
+        tbl_pr = tbl.find(w("tblPr"))
+        look = tbl_pr.find(w("tblLook")) if tbl_pr is not None else None
+        if look is None:
+            return False
+        first_row = look.get(w("firstRow"))
+        if first_row is not None:
+            return first_row.lower() not in _FALSE_VALUES
+        return bool(int(look.get(W_VAL, "0"), 16) & 0x0020)
+
+    @staticmethod
+    def _plain_text(p) -> str:
+        return "".join(t.text or "" for t in p.iter(W_T))
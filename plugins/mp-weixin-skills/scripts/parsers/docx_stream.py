@@ -0,0 +1,186 @@
+"""Word 文档流式读取 - 直接解析 .docx 包中的 XML，逐块产出正文"""
+
+import logging
+import posixpath
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from lxml import etree
+
+from parsers.base import ImageRef
+from parsers.docx_html import DocxContext, W_P, W_SDT, W_TBL, read_numbering, read_styles, w
+
+logger = logging.getLogger(__name__)
+
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+REL_TYPE_PREFIX = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+CORE_NS = {
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "dcterms": "http://purl.org/dc/terms/",
+}
+
+W_BODY = w("body")
+
+# 不解析外部实体；超长文本节点（如大段内嵌数据）不报错
+_XML_OPTIONS = {"resolve_entities": False, "huge_tree": True}
+
+
+class DocxStreamReader:
+    """基于 iterparse 的 .docx 读取器
+
+    不构建 python-docx 的完整对象树：样式、编号、关系等小部件一次性解析为查找表，
+    word/document.xml 则通过 iterparse 按顺序产出正文顶层块（段落、表格、内容控件），
+    每块处理完即清除，内存占用与文档长度无关。
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self._zip = zipfile.ZipFile(file_path)
+        self.document_part = self._find_document_part()
+        self._rels = self._read_rels(self.document_part)
+
+    def __enter__(self) -> "DocxStreamReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    def context(self) -> DocxContext:
+        """构建样式、编号、超链接和图片查找表"""
+        part_dir = posixpath.dirname(self.document_part)
+        styles_part = self._related_part("styles")
+        numbering_part = self._related_part("numbering")
+
+        hyperlinks = {
+            r_id: target
+            for r_id, (rel_type, target, external) in self._rels.items()
+            if external and rel_type == "hyperlink"
+        }
+
+        return DocxContext(
+            styles=read_styles(self._read_xml(styles_part)),
+            numbering=read_numbering(self._read_xml(numbering_part)),
+            hyperlinks=hyperlinks,
+            resolve_image=self._image_resolver(part_dir),
+        )
+
+    def iter_blocks(self) -> Iterator:
+        """按文档顺序逐个产出正文顶层块，调用方处理完后该块即被清除"""
+        with self._zip.open(self.document_part) as stream:
+            for _, elem in etree.iterparse(
+                stream, events=("end",), tag=(W_P, W_TBL, W_SDT), **_XML_OPTIONS
+            ):
+                parent = elem.getparent()
+                if parent is None or parent.tag != W_BODY:
+                    # 表格、内容控件内部的段落随其所在顶层块一起处理
+                    continue
+
+                yield elem
+
+                # 释放已处理的块及其前面的兄弟节点
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+    def core_properties(self) -> Dict[str, str]:
+        """读取 docProps/core.xml 中的文档属性"""
+        root = self._read_xml("docProps/core.xml")
+        if root is None:
+            return {}
+
+        def text(path: str) -> str:
+            node = root.find(path, CORE_NS)
+            return (node.text or "").strip() if node is not None else ""
+
+        return {
+            "title": text("dc:title"),
+            "author": text("dc:creator"),
+            "created": text("dcterms:created"),
+            "modified": text("dcterms:modified"),
+            "comments": text("dc:description"),
+        }
+
+    def _image_resolver(self, part_dir: str):
+        """返回按关系 ID 解析内嵌图片的函数
+
+        图片不解压也不读取，按 zip 目录中的 CRC32 与大小判断重复，
+        内容相同的图片共用第一次出现的成员名，只上传一次。
+        """
+        seen_digests: Dict[str, str] = {}
+
+        def resolve(r_id: str, line: int) -> Optional[ImageRef]:
+            rel = self._rels.get(r_id)
+            if rel is None or rel[0] != "image" or rel[2]:
+                return None
+
+            part_name = self._resolve_target(part_dir, rel[1])
+            try:
+                info = self._zip.getinfo(part_name)
+            except KeyError:
+                logger.warning(f"[DocxStreamReader] 图片部件不存在: {part_name}")
+                return None
+
+            digest = f"{info.CRC:08x}:{info.file_size}"
+            part_name = seen_digests.setdefault(digest, part_name)
+            return ImageRef(
+                src=part_name,
+                kind="embedded",
+                line=line,
+                container=self.file_path,
+                part_name=part_name,
+                digest=digest,
+                byte_size=info.file_size,
+            )
+
+        return resolve
+
+    def _find_document_part(self) -> str:
+        """从包关系中定位主文档部件（通常为 word/document.xml）"""
+        for rel_type, target, _ in self._read_rels("").values():
+            if rel_type == "officeDocument":
+                return self._resolve_target("", target)
+        return "word/document.xml"
+
+    def _related_part(self, rel_type: str) -> Optional[str]:
+        part_dir = posixpath.dirname(self.document_part)
+        for r_type, target, external in self._rels.values():
+            if r_type == rel_type and not external:
+                return self._resolve_target(part_dir, target)
+        return None
+
+    def _read_rels(self, part_name: str) -> Dict[str, Tuple[str, str, bool]]:
+        """读取部件关系，返回 {rId: (关系类型短名, 目标, 是否外部链接)}"""
+        directory, name = posixpath.split(part_name)
+        root = self._read_xml(posixpath.join(directory, "_rels", f"{name}.rels"))
+        rels = {}
+        if root is None:
+            return rels
+        for rel in root.iter(f"{{{PKG_REL_NS}}}Relationship"):
+            rel_type = rel.get("Type", "")
+            if rel_type.startswith(REL_TYPE_PREFIX):
+                rel_type = rel_type[len(REL_TYPE_PREFIX) :]
+            rels[rel.get("Id")] = (
+                rel_type,
+                rel.get("Target", ""),
+                rel.get("TargetMode") == "External",
+            )
+        return rels
+
+    def _read_xml(self, part_name: Optional[str]):
+        if not part_name:
+            return None
+        try:
+            with self._zip.open(part_name) as stream:
+                return etree.parse(stream, etree.XMLParser(**_XML_OPTIONS)).getroot()
+        except KeyError:
+            return None
+
+    @staticmethod
+    def _resolve_target(part_dir: str, target: str) -> str:
+        if target.startswith("/"):
+            return target.lstrip("/")
+        return posixpath.normpath(posixpath.join(part_dir, target))
@@ -3,12 +3,14 @@
 import logging
 from pathlib import Path
 from typing import List
+from urllib.parse import unquote
 import re
 
 from markdown_it import MarkdownIt
+from markdown_it.token import Token
 from markdown_it.tree import SyntaxTreeNode
 
-from parsers.base import BaseParser, ParsedContent
+from parsers.base import BaseParser, ParsedContent, ImageRef
 
 logger = logging.getLogger(__name__)
 
@@ -38,14 +40,19 @@ class MarkdownParser(BaseParser):
             from exceptions import FileReadError
             raise FileReadError(str(file_path), str(e))
 
-        # 提取标题（第一个 # 标题）
-        title = self._extract_title(content)
+        # 解析一次 token 流，渲染、标题和图片索引都基于它
+        env = {}
+        tokens = self.md.parse(content, env)
+
+        # 提取标题（第一个一级标题）
+        title = self._extract_title(tokens)
 
         # 转换为 HTML
-        html_content = self.md.render(content)
+        html_content = self.md.renderer.render(tokens, self.md.options, env)
 
-        # 提取图片路径
-        images = self._extract_images(file_path, content)
+        # 建立图片索引
+        image_refs = self._index_images(tokens, file_path)
+        images = [ref.resolved_path for ref in image_refs if ref.resolved_path]
 
         # 元数据
         metadata = {
@@ -61,31 +68,58 @@ class MarkdownParser(BaseParser):
             content=html_content,
             images=images,
             metadata=metadata,
+            image_refs=image_refs,
         )
 
-    def _extract_title(self, content: str) -> str:
+    def _extract_title(self, tokens: List[Token]) -> str:
         """提取标题"""
-        match = re.search(r"^#\s+(.+)$", content, re.MULTILINE)
-        if match:
-            return match.group(1).strip()
+        for i, token in enumerate(tokens):
+            if token.type == "heading_open" and token.tag == "h1" and i + 1 < len(tokens):
+                title = tokens[i + 1].content.strip()
+                if title:
+                    return title
 
-        # 如果没有找到标题，使用文件名
+        # 如果没有找到标题，使用默认标题
         return "未命名文章"
 
-    def _extract_images(self, file_path: Path, content: str) -> List[Path]:
-        """提取图片路径"""
-        images = []
-
-        # 匹配 ![alt](path) 格式
-        pattern = r"!\[.*?\]\((.+?)\)"
-        matches = re.findall(pattern, content)
-
-        for match in matches:
-            # 处理相对路径
-            img_path = Path(match)
-            if not img_path.is_absolute():
-                img_path = file_path.parent / img_path
-
-            images.append(img_path)
-
-        return images
+    def _index_images(self, tokens: List[Token], file_path: Path) -> List[ImageRef]:
+        """从 token 流中建立图片索引
+
+        覆盖行内图片和引用式图片（markdown-it 已解析为 image token）。
+        js-default 预设未启用 HTML，内嵌的 <img> 标签按文本转义输出，不会出现在结果中，
+        因此无需索引。
+        """
+        refs: List[ImageRef] = []
+
+        def add(src: str, alt: str, line):
+            src = src.strip()
+            if not src or src.startswith("data:"):
+                return
+            kind = ImageRef.classify(src)
+            if kind != "remote":
+                # markdown-it 会对本地路径做 URL 编码，还原为文件系统路径
+                src = unquote(src)
+            resolved = None
+            if kind == "absolute":
+                resolved = Path(src)
+            elif kind == "relative":
+                resolved = file_path.parent / src
+            refs.append(
+                ImageRef(
+                    src=src,
+                    alt=alt,
+                    kind=kind,
+                    resolved_path=resolved,
+                    position=len(refs),
+                    line=line,
+                )
+            )
+
+        for token in tokens:
+            line = token.map[0] + 1 if token.map else None
+            if token.type == "inline" and token.children:
+                for child in token.children:
+                    if child.type == "image":
+                        add(child.attrGet("src") or "", child.content, line)
+
+        return refs
@@ -1,17 +1,111 @@
 """PDF 文档解析器"""
 
+import hashlib
+import html
+import io
+import json
 import logging
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 import fitz  # PyMuPDF
-from parsers.base import BaseParser, ParsedContent
+from PIL import Image
+from parsers.base import BaseParser, ParsedContent, ImageRef
+from utils.logger import ContextThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# 中日韩字符（含全角标点），相邻行拼接时不加空格
+_CJK_PATTERN = re.compile(r"[\u2e80-\u9fff\uf900-\ufaff\uff00-\uffef\u3000-\u303f]")
+
+
+@dataclass
+class TextBlock:
+    """页面中的一个文本块（来自 get_text("dict")）"""
+
+    y: float
+    # 每行: (HTML, 纯文本)
+    lines: List[Tuple[str, str]] = field(default_factory=list)
+    # 按字符数加权的字号分布
+    sizes: Counter = field(default_factory=Counter)
+
+    @property
+    def size(self) -> float:
+        """块的主字号"""
+        return self.sizes.most_common(1)[0][0] if self.sizes else 0.0
+
+    @property
+    def text(self) -> str:
+        return _join_lines([plain for _, plain in self.lines])
+
+    @property
+    def html(self) -> str:
+        return _join_lines([markup for markup, _ in self.lines], [plain for _, plain in self.lines])
+
+
+def _join_lines(lines: List[str], plain: Optional[List[str]] = None) -> str:
+    """合并折行：中文直接拼接，英文加空格，行尾连字符去除"""
+    plain = plain or lines
+    result = lines[0]
+    for i in range(1, len(lines)):
+        prev, cur = plain[i - 1], plain[i]
+        if not prev or not cur:
+            result += lines[i]
+        elif prev.endswith("-") and prev[-2:-1].isalpha() and result.endswith("-"):
+            result = result[:-1] + lines[i]
+        elif _CJK_PATTERN.match(prev[-1]) or _CJK_PATTERN.match(cur[0]):
+            result += lines[i]
+        else:
+            result += " " + lines[i]
+    return result
+
 
 class PDFParser(BaseParser):
-    """PDF 文档解析器"""
+    """PDF 文档解析器
+
+    每页只调用一次 get_text("dict")，按字符数统计全文字号分布：出现最多的
+    字号视为正文，明显大于正文的字号从大到小依次映射为 h1-h3；同一文本块内的
+    折行合并为一个段落，粗体保留为 <strong>。
+    """
+
+    # 字号至少为正文的该倍数才视为标题
+    HEADING_SIZE_RATIO = 1.15
+    # 标题层级数
+    HEADING_LEVELS = 3
+    # 超过该字符数的文本块不视为标题
+    HEADING_MAX_CHARS = 80
+
+    def __init__(
+        self,
+        image_dir: Path = Path("./temp") / "pdf_images",
+        min_image_size: int = 64,
+        image_max_bytes: int = 1024 * 1024,
+        workers: int = 4,
+    ):
+        """
+        Args:
+            image_dir: 提取图片的输出目录（按文档路径与解析配置的哈希分子目录），通常为 TEMP_DIR/pdf_images
+            min_image_size: 宽或高小于该像素值的图片视为装饰图片跳过，0 表示不跳过
+            image_max_bytes: 重新编码图片的字节预算
+            workers: 解码/重新编码图片的线程数
+        """
+        self.image_dir = image_dir
+        self.min_image_size = min_image_size
+        self.image_max_bytes = image_max_bytes
+        self.workers = max(1, workers)
+
+    def cache_config(self) -> dict:
+        return {
+            "image_dir": str(Path(self.image_dir).resolve()),
+            "min_image_size": self.min_image_size,
+            "image_max_bytes": self.image_max_bytes,
+            "workers": self.workers,
+        }
 
     def parse(self, file_path: Path) -> ParsedContent:
         """解析 PDF 文档"""
@@ -20,23 +114,30 @@ class PDFParser(BaseParser):
         try:
             doc = fitz.open(file_path)
 
-            # 提取标题（使用第一页的第一行，或元数据）
-            title = self._extract_title(doc)
+            page_count = doc.page_count
+
+            # 提取图片（按 xref 去重，并发解码）
+            image_refs, placements = self._extract_images(doc, file_path)
+            images = [ref.resolved_path for ref in image_refs]
+
+            # 每页读取一次文本块，统计全文字号分布后确定标题层级
+            pages = [self._read_blocks(doc[page_num]) for page_num in range(page_count)]
+            heading_levels = self._heading_levels(pages)
+
+            # 提取标题（元数据，或第一个标题块 / 第一个文本块）
+            title = self._extract_title(doc, pages, heading_levels)
 
-            # 提取所有页面内容
+            # 转换所有页面内容，图片按页面中的位置插入
             content_parts = []
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text("text")
-                if text.strip():
-                    # 将页面文本转换为 Markdown 格式
-                    content_parts.append(self._convert_page(text, page_num))
+            for page_num, blocks in enumerate(pages):
+                page_content = self._convert_page(
+                    blocks, heading_levels, placements.get(page_num, [])
+                )
+                if page_content:
+                    content_parts.append(page_content)
 
             content = "\n\n".join(content_parts)
 
-            # 提取图片
-            images = self._extract_images(doc, file_path)
-
             # 提取元数据
             metadata = self._extract_metadata(doc)
 
@@ -47,31 +148,34 @@ class PDFParser(BaseParser):
                 content=content,
                 images=images,
                 metadata=metadata,
+                image_refs=image_refs,
             )
 
             logger.info(
-                f"[PDFParser] 解析完成 - 标题: {title}, 页数: {len(doc)}, 图片数: {len(images)}"
+                f"[PDFParser] 解析完成 - 标题: {title}, 页数: {page_count}, 图片数: {len(images)}"
             )
             return result
 
         except Exception as e:
             logger.error(f"[PDFParser] 解析失败: {e}")
             from exceptions import FileReadError
+
             raise FileReadError(str(file_path), str(e))
 
-    def _extract_title(self, doc) -> str:
+    def _extract_title(
+        self, doc, pages: List[List[TextBlock]], heading_levels: Dict[float, int]
+    ) -> str:
         """提取标题"""
         # 尝试从元数据获取标题
         metadata = doc.metadata
         if metadata and "title" in metadata and metadata["title"]:
             return metadata["title"]
 
-        # 否则使用第一页的第一行
-        first_page = doc[0]
-        text = first_page.get_text("text")
-        lines = text.strip().split("\n")
-        if lines and lines[0].strip():
-            title = lines[0].strip()
+        # 否则使用第一个标题块，没有标题时使用第一个文本块
+        blocks = [block for page in pages for block in page if block.text.strip()]
+        headings = [block for block in blocks if self._heading_level(block, heading_levels)]
+        for block in headings[:1] or blocks[:1]:
+            title = block.text.strip()
             # 限制标题长度
             if len(title) > 50:
                 return title[:50] + "..."
@@ -79,30 +183,209 @@ class PDFParser(BaseParser):
 
         return "未命名文档"
 
-    def _convert_page(self, text: str, page_num: int) -> str:
-        """将页面文本转换为 Markdown 格式"""
-        lines = text.strip().split("\n")
-        converted_lines = []
-
-        for line in lines:
-            line = line.strip()
-            if not line:
+    def _read_blocks(self, page) -> List[TextBlock]:
+        """读取页面文本块，记录每行的 HTML、纯文本及字号分布"""
+        blocks = []
+        for raw in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+            if raw.get("type") != 0:
                 continue
+            block = TextBlock(y=raw["bbox"][1])
+            for line in raw["lines"]:
+                markup, plain = [], []
+                for span in line["spans"]:
+                    text = span["text"]
+                    if not text:
+                        continue
+                    escaped = html.escape(text)
+                    if span["flags"] & fitz.TEXT_FONT_BOLD and text.strip():
+                        escaped = f"<strong>{escaped}</strong>"
+                    markup.append(escaped)
+                    plain.append(text)
+                    weight = len(text.strip())
+                    if weight:
+                        block.sizes[round(span["size"] * 2) / 2] += weight
+                plain_text = "".join(plain).strip()
+                if plain_text:
+                    block.lines.append(("".join(markup).strip(), plain_text))
+            if block.lines:
+                blocks.append(block)
+        return blocks
+
+    def _heading_levels(self, pages: List[List[TextBlock]]) -> Dict[float, int]:
+        """按全文字号分布将较大的字号映射为标题层级 {字号: 级别}"""
+        histogram: Counter = Counter()
+        for blocks in pages:
+            for block in blocks:
+                histogram.update(block.sizes)
+        if not histogram:
+            return {}
+
+        body_size = histogram.most_common(1)[0][0]
+        larger = sorted(
+            (size for size in histogram if size >= body_size * self.HEADING_SIZE_RATIO),
+            reverse=True,
+        )
+        levels = {size: level for level, size in enumerate(larger[: self.HEADING_LEVELS], 1)}
+        logger.debug(f"[PDFParser] 正文字号: {body_size}, 标题字号: {levels}")
+        return levels
 
-            # 尝试识别标题（通常是较大且居中的文本）
-            # PDF 文本提取较难准确识别结构，这里做简单处理
-            if len(line) < 50 and line == line.upper() and not line.endswith("."):
-                # 可能是标题
-                converted_lines.append(f"## {line}")
+    def _heading_level(self, block: TextBlock, heading_levels: Dict[float, int]) -> int:
+        """文本块的标题级别，0 表示正文"""
+        level = heading_levels.get(block.size, 0)
+        if level and sum(len(plain) for _, plain in block.lines) <= self.HEADING_MAX_CHARS:
+            return level
+        return 0
+
+    def _convert_block(self, block: TextBlock, heading_levels: Dict[float, int]) -> str:
+        level = self._heading_level(block, heading_levels)
+        if level:
+            return f"<h{level}>{html.escape(block.text)}</h{level}>"
+        return f"<p>{block.html}</p>"
+
+    def _convert_page(
+        self,
+        blocks: List[TextBlock],
+        heading_levels: Dict[float, int],
+        placements: List[Tuple[float, ImageRef]],
+    ) -> str:
+        """转换页面文本块，并在对应的纵向位置插入图片"""
+        # 文本块与图片按纵坐标排序后交错输出（PyMuPDF 的块已按阅读顺序排列，稳定排序保持其顺序）
+        items = [(block.y, 0, block) for block in blocks]
+        if placements:
+            items += [(y, 1, ref) for y, ref in placements]
+            items.sort(key=lambda item: (item[0], item[1]))
+
+        parts = []
+        for _, is_image, value in items:
+            if is_image:
+                parts.append(f'<p><img src="{html.escape(value.src)}" alt=""></p>')
             else:
-                converted_lines.append(line)
+                parts.append(self._convert_block(value, heading_levels))
+
+        return "\n".join(parts)
+
+    def _extract_images(
+        self, doc, file_path: Path
+    ) -> Tuple[List[ImageRef], Dict[int, List[Tuple[float, ImageRef]]]]:
+        """提取图片 XObject
+
+        同一 xref（如每页重复的 logo）只提取一次；原始数据在主线程读取
+        （PyMuPDF 文档对象不支持多线程），解码和重新编码在线程池中完成。
+
+        Returns:
+            (图片引用列表, {页码: [(纵坐标, 图片引用)]})
+        """
+        output_dir = self._output_dir(file_path)
+        raw_images: Dict[int, dict] = {}
+        occurrences: List[Tuple[int, int, float]] = []
+        skipped = 0
+
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            for info in page.get_images(full=True):
+                xref, width, height = info[0], info[2], info[3]
+                if min(width, height) < self.min_image_size:
+                    skipped += 1
+                    continue
+
+                if xref not in raw_images:
+                    raw_images[xref] = doc.extract_image(xref)
+
+                for rect in page.get_image_rects(xref) or [fitz.Rect(0, 0, 0, 0)]:
+                    occurrences.append((page_num, xref, rect.y0))
+
+        if not raw_images:
+            return [], {}
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(
+            f"[PDFParser] 发现 {len(raw_images)} 张不重复的图片（跳过 {skipped} 个小图），开始解码"
+        )
+
+        with ContextThreadPoolExecutor(max_workers=min(self.workers, len(raw_images))) as pool:
+            futures = {
+                xref: pool.submit(self._write_image, raw, output_dir / f"xref-{xref}")
+                for xref, raw in raw_images.items()
+            }
+            paths = {}
+            for xref, future in futures.items():
+                try:
+                    paths[xref] = future.result()
+                except Exception as e:
+                    logger.warning(f"[PDFParser] 图片解码失败，跳过 xref={xref}: {e}")
+
+        refs_by_xref: Dict[int, ImageRef] = {}
+        placements: Dict[int, List[Tuple[float, ImageRef]]] = {}
+        for page_num, xref, y in occurrences:
+            if xref not in paths:
+                continue
+            ref = refs_by_xref.get(xref)
+            if ref is None:
+                path = paths[xref]
+                ref = ImageRef(
+                    src=str(path),
+                    kind=ImageRef.classify(str(path)),
+                    resolved_path=path,
+                    position=len(refs_by_xref),
+                    line=page_num + 1,
+                )
+                refs_by_xref[xref] = ref
+            placements.setdefault(page_num, []).append((y, ref))
+
+        return list(refs_by_xref.values()), placements
+
+    def _output_dir(self, file_path: Path) -> Path:
+        """图片输出目录
+
+        按源文件的绝对路径、修改时间、大小和解析配置计算哈希，不同目录下的同名文档、
+        同一文档修改前后的版本互不覆盖；目录名保留文档名便于排查。
+        """
+        stat = file_path.stat()
+        identity = json.dumps(
+            [
+                str(file_path.resolve()),
+                stat.st_mtime_ns,
+                stat.st_size,
+                self.min_image_size,
+                self.image_max_bytes,
+            ]
+        )
+        digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()[:12]
+        return Path(self.image_dir) / f"{file_path.stem}-{digest}"
+
+    @staticmethod
+    def _write_file(path: Path, data: bytes) -> Path:
+        """写入临时文件后原子替换，同一文档被并发解析时不会读到半个文件"""
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def _write_image(self, raw: dict, target: Path) -> Path:
+        """将提取的图片写入文件，必要时重新编码"""
+        from utils.image_encoder import ImageEncoder
+
+        data, ext = raw["image"], raw["ext"].lower()
+
+        # 浏览器可直接显示的 RGB/灰度 JPEG 且未超预算时原样写出，无需解码
+        if (
+            ext in ("jpeg", "jpg")
+            and raw.get("colorspace") in (1, 3)
+            and len(data) <= self.image_max_bytes
+        ):
+            return self._write_file(target.with_suffix(".jpg"), data)
 
-        return "\n".join(converted_lines)
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            if img.mode in ("RGBA", "LA") or ext == "png":
+                buffer = io.BytesIO()
+                img.save(buffer, "PNG", optimize=True)
+                if buffer.tell() <= self.image_max_bytes:
+                    return self._write_file(target.with_suffix(".png"), buffer.getvalue())
 
-    def _extract_images(self, doc, file_path: Path) -> List[Path]:
-        """提取图片引用（PDF 解析器暂不支持图片提取）"""
-        # PDF 图片提取较复杂，暂不支持
-        return []
+            encoder = ImageEncoder("JPEG", max_bytes=self.image_max_bytes, max_quality=85)
+            result = encoder.encode(img)
+            return self._write_file(target.with_suffix(encoder.extension), result.data)
 
     def _extract_metadata(self, doc) -> dict:
         """提取元数据"""
@@ -0,0 +1,318 @@
+"""发布服务 - publish / update 的核心流程，供命令行与常驻服务共用"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from config import AppConfig
+from converters import WechatHTMLBuilder
+from covers.template_maker import TemplateCoverGenerator
+from exceptions import WechatApiError
+from journal import JobSteps
+from parsers import ParserFactory
+from utils.download_cache import DownloadCache
+from utils.image_extractor import ImageExtractor
+from utils.image_optimizer import ImageOptimizer
+from utils.image_pipeline import ImagePipeline
+from utils.image_processor import ImageProcessor
+from wechat import WechatApiClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PublishResult:
+    """一次发布或更新的结果"""
+
+    source: Path
+    title: str
+    media_id: Optional[str] = None  # 草稿 media_id（手动模式为空）
+    html_path: Optional[Path] = None  # 手动模式下保存的 HTML
+    cover_path: Optional[Path] = None
+    images_total: int = 0
+    images_uploaded: int = 0
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        for key in ("source", "html_path", "cover_path"):
+            if data[key] is not None:
+                data[key] = str(data[key])
+        data["elapsed_ms"] = round(self.elapsed_ms, 1)
+        return data
+
+
+class Publisher:
+    """文章发布服务
+
+    持有配置、API 客户端以及下载缓存、图片优化缓存等常驻资源，可在多个任务间复用。
+    HTML 构建器（含样式）和封面生成器（含已加载的字体）按线程各建一份，
+    多个工作线程可以同时调用 publish / update。
+    """
+
+    def __init__(self, config: AppConfig, api_client: Optional[WechatApiClient] = None):
+        self.config = config
+        self.api_client = api_client
+        self._local = threading.local()
+        self._download_cache: Optional[DownloadCache] = None
+        self._optimizer: Optional[ImageOptimizer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def has_api(self) -> bool:
+        return self.api_client is not None
+
+    def _builder(self, template: str) -> WechatHTMLBuilder:
+        builders = self._local.__dict__.setdefault("builders", {})
+        if template not in builders:
+            builders[template] = WechatHTMLBuilder(template)
+        return builders[template]
+
+    def _cover_generator(self) -> TemplateCoverGenerator:
+        if not hasattr(self._local, "cover"):
+            self._local.cover = TemplateCoverGenerator(self.config.theme_color)
+        return self._local.cover
+
+    def _media_caches(self):
+        """下载缓存与图片优化器（首次使用时创建，所有任务共享）"""
+        with self._lock:
+            if self._download_cache is None:
+                config = self.config
+                self._download_cache = DownloadCache(
+                    config.cache_dir / "downloads", max_bytes=config.download_cache_max_bytes
+                )
+                self._optimizer = ImageOptimizer(
+                    config.cache_dir / "images",
+                    max_width=config.image_max_width,
+                    max_bytes=config.image_max_bytes,
+                    workers=config.image_workers,
+                    max_cache_bytes=config.image_cache_max_bytes,
+                )
+            return self._download_cache, self._optimizer
+
+    def _require_api(self) -> WechatApiClient:
+        if self.api_client is None:
+            raise ValueError("未配置微信 API 客户端")
+        return self.api_client
+
+    def generate_cover(self, title: str):
+        """生成封面（每次使用唯一文件名，并发任务互不覆盖）"""
+        output_path = self.config.temp_dir / "covers" / f"cover_{uuid.uuid4().hex[:12]}"
+        return self._cover_generator().generate(title, "", output_path=output_path)
+
+    @staticmethod
+    def _step(steps: Optional[JobSteps], key: str, func: Callable[[], Any]) -> Any:
+        """有任务日志时按步骤幂等执行，否则直接执行"""
+        return steps.run(key, func) if steps is not None else func()
+
+    def _cover_step(self, title: str) -> str:
+        """封面步骤的键：包含标题与主题色，续传时标题已修改则重新生成并上传封面"""
+        digest = hashlib.sha256(f"{self.config.theme_color}\n{title}".encode("utf-8")).hexdigest()
+        return f"cover:{digest[:16]}"
+
+    def _record_parse(self, steps: Optional[JobSteps], file_path: Path, parsed):
+        """记录解析步骤；续传时源文件已修改则给出提示（已上传的图片按内容匹配、封面按标题匹配，仍可复用）"""
+        if steps is None:
+            return
+        sha = hashlib.sha256(file_path.read_bytes()).hexdigest()
+        recorded = steps.run(
+            "parse",
+            lambda: {"title": parsed.title, "sha256": sha, "images": len(parsed.image_refs)},
+        )
+        if recorded["sha256"] != sha:
+            logger.warning("[Publisher] 源文件在上次运行后已修改，继续使用新内容")
+
+    def _upload_cover(self, api_client: WechatApiClient, title: str, result: PublishResult) -> Dict:
+        cover_result = self.generate_cover(title)
+        result.cover_path = cover_result.image_path
+        cover_data = api_client.upload_media(str(cover_result.image_path), "thumb")
+        return {
+            "media_id": cover_data["media_id"],
+            "url": cover_data.get("url", ""),
+            "path": str(result.cover_path),
+        }
+
+    def run_job(self, job_type: str, params: Dict, steps: Optional[JobSteps] = None) -> Dict:
+        """执行任务日志或常驻服务中的任务，返回结果字典"""
+        if job_type == "update":
+            result = self.update(
+                params["media_id"],
+                Path(params["file"]),
+                params.get("regenerate_cover", False),
+                steps=steps,
+            )
+        else:
+            result = self.publish(
+                Path(params["file"]),
+                params.get("template"),
+                use_api=not params.get("no_api", False),
+                steps=steps,
+            )
+        return result.to_dict()
+
+    def upload_images(
+        self, parsed, html_content: str, result: PublishResult, steps: Optional[JobSteps] = None
+    ) -> str:
+        """下载、优化并上传文章中的图片，返回替换链接后的 HTML
+
+        指定 steps 时每张图片的上传结果按内容记录，续传时已上传的图片不再重复上传。
+        """
+        api_client = self._require_api()
+        if steps is not None:
+            api_client = steps.wrap(api_client)
+        download_cache, optimizer = self._media_caches()
+
+        # 使用解析器生成的图片索引（无需重新读取源文件）
+        extractor = ImageExtractor(
+            self.config.temp_dir, max_workers=self.config.download_workers, cache=download_cache
+        )
+        try:
+            images = extractor.extract_from_refs(parsed.image_refs)
+            result.images_total = len(images)
+            if not images:
+                logger.info("[Publisher] 文章中没有发现图片")
+                return html_content
+
+            logger.info("[Publisher] 发现 %s 张图片，正在上传到微信素材库", len(images))
+            # 下载/优化与上传重叠执行：每张图片就绪后立即上传
+            image_processor = ImageProcessor(api_client, self.config.temp_dir)
+            pipeline = ImagePipeline(extractor, image_processor, optimizer)
+            html_content = pipeline.run(html_content, images, "image")
+            result.images_uploaded = sum(
+                1 for img in images if "wechat_url" in img or img.get("uploaded")
+            )
+            self._raise_upload_failures(images)
+            return html_content
+        finally:
+            extractor.close()
+
+    @staticmethod
+    def _raise_upload_failures(images: List[Dict]):
+        """有图片上传失败时抛出异常，避免草稿中残留本地或外链图片
+
+        保留首个失败的 errcode 与异常类型，由任务日志判断是否重试；已上传的图片按内容记录，
+        重试时不会重复上传。
+        """
+        failed = [img for img in images if img.get("upload_error") is not None]
+        if not failed:
+            return
+        error = failed[0]["upload_error"]
+        message = f"{len(failed)} 张图片上传失败: {error}"
+        if isinstance(error, WechatApiError):
+            raise type(error)(message, error.errcode)
+        raise WechatApiError(message)
+
+    def publish(
+        self,
+        file_path: Path,
+        template: Optional[str] = None,
+        use_api: bool = True,
+        steps: Optional[JobSteps] = None,
+    ) -> PublishResult:
+        """发布文章：有 API 客户端且 use_api 时上传图片、封面并创建草稿，否则只保存 HTML
+
+        指定 steps（任务日志）时解析、封面、每张图片上传与草稿新增都按步骤记录，
+        重新运行同一任务会跳过已完成的步骤。
+        """
+        start = time.perf_counter()
+        file_path = Path(file_path)
+        parsed = ParserFactory.parse(file_path)
+        logger.info("[Publisher] 文章标题: %s", parsed.title)
+
+        result = PublishResult(source=file_path, title=parsed.title)
+        html_content = self._builder(template or self.config.template_name).build(parsed)
+
+        if not (use_api and self.has_api):
+            # 手动模式
+            logger.info("[Publisher] 运行在手动模式")
+            result.cover_path = self.generate_cover(parsed.title).image_path
+            output_dir = self.config.output_dir
+            output_dir.mkdir(parents=True, exist_ok=True)
+            result.html_path = output_dir / f"{file_path.stem}.html"
+            result.html_path.write_text(html_content, encoding="utf-8")
+        else:
+            logger.info("[Publisher] 运行在 API 模式")
+            self._record_parse(steps, file_path, parsed)
+            html_content = self.upload_images(parsed, html_content, result, steps)
+
+            # 生成并上传封面
+            cover_data = self._step(
+                steps,
+                self._cover_step(parsed.title),
+                lambda: self._upload_cover(self.api_client, parsed.title, result),
+            )
+            result.cover_path = Path(cover_data["path"])
+
+            article = {
+                "title": parsed.title,
+                "content": html_content,
+                "thumb_media_id": cover_data["media_id"],
+                "need_open_comment": 0,
+                "only_fans_can_comment": 0,
+            }
+            draft = self._step(steps, "draft.add", lambda: self.api_client.upload_draft([article]))
+            result.media_id = draft["media_id"]
+
+        result.elapsed_ms = (time.perf_counter() - start) * 1000
+        return result
+
+    def update(
+        self,
+        media_id: str,
+        file_path: Path,
+        regenerate_cover: bool = False,
+        steps: Optional[JobSteps] = None,
+    ) -> PublishResult:
+        """用源文件的新内容更新已有草稿（steps 的用法同 publish）"""
+        start = time.perf_counter()
+        api_client = self._require_api()
+        file_path = Path(file_path)
+        parsed = ParserFactory.parse(file_path)
+        logger.info("[Publisher] 文章标题: %s", parsed.title)
+
+        result = PublishResult(source=file_path, title=parsed.title, media_id=media_id)
+        html_content = self._builder(self.config.template_name).build(parsed)
+        self._record_parse(steps, file_path, parsed)
+
+        if regenerate_cover:
+            logger.info("[Publisher] 重新生成封面")
+            cover_data = self._step(
+                steps,
+                self._cover_step(parsed.title),
+                lambda: self._upload_cover(api_client, parsed.title, result),
+            )
+            result.cover_path = Path(cover_data["path"])
+            thumb_media_id = cover_data["media_id"]
+            logger.info("[Publisher] 新封面 media_id: %s", thumb_media_id)
+        else:
+            # 获取原草稿的 thumb_media_id
+            logger.info("[Publisher] 保持原封面")
+            thumb_media_id = api_client.get_draft(media_id).get("thumb_media_id", "")
+            logger.info("[Publisher] 原封面 media_id: %s", thumb_media_id)
+
+        # 构建文章数据（按照微信 API 格式）
+        # 注意：articles 是对象，不是数组！
+        article_data = {
+            "article_type": "news",
+            "title": parsed.title,
+            "author": parsed.metadata.get("author", ""),
+            "digest": "",  # 单图文消息的摘要
+            "content": html_content,
+            "content_source_url": "",  # 原文链接
+            "need_open_comment": 0,
+            "only_fans_can_comment": 0,
+        }
+        if thumb_media_id:
+            article_data["thumb_media_id"] = thumb_media_id
+
+        self._step(
+            steps, "draft.update", lambda: api_client.update_draft(media_id, 0, article_data)
+        )
+
+        result.elapsed_ms = (time.perf_counter() - start) * 1000
+        return result
@@ -0,0 +1,409 @@
+"""常驻发布服务 - 本地 HTTP/JSON 任务接口
+
+进程常驻，复用同一个 Publisher（API 客户端、access_token、连接池、解析缓存、
+下载与图片缓存、样式与字体），每篇文章只需支付实际的转换与上传耗时。
+
+接口（HTTP 或 Unix socket）:
+
+    POST /jobs          提交任务 {"type": "publish", "file": "...", "template": "...", "no_api": false}
+                        或 {"type": "update", "media_id": "...", "file": "...", "regenerate_cover": false}
+                        可选 "wait": 秒数，在超时前等待任务完成后再返回
+    GET  /jobs          最近的任务列表
+    GET  /jobs/<id>     任务状态与结果
+    GET  /healthz       服务状态
+    GET  /metrics       Prometheus 指标
+
+指定任务日志（JobJournal）时任务持久化到 SQLite：失败的任务按指数退避重试，
+重试时跳过已完成的步骤；服务重启后自动恢复未完成的任务。
+"""
+
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from exceptions import MpWeixinError
+from journal import JobJournal, JobRunner, JournalJob
+from publisher import Publisher
+from utils.logger import ContextThreadPoolExecutor, log_context, new_job_id
+from utils.metrics import JOB_DURATION, JOBS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPES = ("publish", "update")
+
+# 单次等待任务完成的最长秒数
+MAX_WAIT_SECONDS = 300
+
+
+@dataclass
+class Job:
+    """一个发布或更新任务"""
+
+    id: str
+    type: str
+    params: Dict
+    status: str = "queued"  # queued / running / succeeded / failed（等待重试时为 queued）
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "params": self.params,
+            "status": self.status,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """任务队列与工作线程池
+
+    任务按提交顺序进入线程池，最多 workers 个同时执行；只保留最近 max_jobs 个任务的状态。
+    指定 root 时只接受该目录下的源文件。
+
+    指定 runner 时任务写入其任务日志并由 runner 执行：失败后按退避时间重新排队，
+    recover() 重新提交上次退出时未完成的任务。
+    """
+
+    def __init__(
+        self,
+        publisher: Publisher,
+        workers: int = 2,
+        max_jobs: int = 1000,
+        root: Optional[Path] = None,
+        runner: Optional[JobRunner] = None,
+    ):
+        self.publisher = publisher
+        self.workers = max(1, workers)
+        self.max_jobs = max_jobs
+        self.root = root.resolve() if root else None
+        self.runner = runner
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._pool = ContextThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+
+    @property
+    def journal(self) -> Optional[JobJournal]:
+        return self.runner.journal if self.runner else None
+
+    def submit(self, job_type: str, params: Dict) -> Job:
+        """校验参数并提交任务，参数错误时抛出 ValueError"""
+        params = self._validate(job_type, params)
+        job = Job(id=new_job_id(), type=job_type, params=params)
+        if self.journal is not None:
+            self.journal.create(job_type, params, job_id=job.id)
+        self._enqueue(job)
+        logger.info("[Server] 任务已提交: %s %s %s", job.id, job_type, params["file"])
+        return job
+
+    def recover(self) -> int:
+        """重新提交任务日志中未完成的任务（含等待重试的任务），返回任务数"""
+        if self.journal is None:
+            return 0
+        records = self.journal.recover()
+        for record in records:
+            job = Job(
+                id=record.id,
+                type=record.type,
+                params=record.params,
+                attempts=record.attempts,
+                created_at=record.created_at,
+                error=record.error,
+            )
+            self._enqueue(job, record.next_run_at)
+        if records:
+            logger.info("[Server] 恢复 %s 个未完成的任务", len(records))
+        return len(records)
+
+    def _enqueue(self, job: Job, run_at: Optional[float] = None):
+        """加入线程池；run_at 在未来时到点后再加入"""
+        with self._lock:
+            if self._closed:
+                # 停止后不再执行，任务留在任务日志中
+                return
+            self._jobs[job.id] = job
+            self._prune()
+            delay = (run_at - time.time()) if run_at else 0
+            if delay > 0:
+                timer = threading.Timer(delay, self._submit_later, (job,))
+                timer.daemon = True
+                self._timers[job.id] = timer
+                timer.start()
+                return
+        self._pool.submit(self._run, job)
+
+    def _submit_later(self, job: Job):
+        with self._lock:
+            self._timers.pop(job.id, None)
+            if self._closed:
+                return
+        self._pool.submit(self._run, job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, limit: int = 100) -> List[Job]:
+        """最近的任务（新的在前）"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))[:limit]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            status: sum(1 for job in jobs if job.status == status)
+            for status in ("queued", "running")
+        }
+
+    def shutdown(self, wait: bool = True):
+        """停止接收任务，等待进行中的任务完成（等待重试的任务留在任务日志中，下次启动时恢复）"""
+        with self._lock:
+            self._closed = True
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _validate(self, job_type: str, params: Dict) -> Dict:
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"未知的任务类型: {job_type}（可选 {', '.join(JOB_TYPES)}）")
+        if not params.get("file"):
+            raise ValueError("缺少参数: file")
+
+        file_path = Path(params["file"]).expanduser().resolve()
+        if self.root and not file_path.is_relative_to(self.root):
+            raise ValueError(f"源文件不在允许的目录中: {file_path}")
+        if not file_path.is_file():
+            raise ValueError(f"源文件不存在: {file_path}")
+
+        if job_type == "update":
+            if not params.get("media_id"):
+                raise ValueError("缺少参数: media_id")
+            if not self.publisher.has_api:
+                raise ValueError("未配置微信 API 凭证，无法更新草稿")
+            return {
+                "file": str(file_path),
+                "media_id": str(params["media_id"]),
+                "regenerate_cover": bool(params.get("regenerate_cover", False)),
+            }
+        return {
+            "file": str(file_path),
+            "template": params.get("template"),
+            "no_api": bool(params.get("no_api", False)),
+        }
+
+    def _prune(self):
+        """丢弃最早的已完成任务"""
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].done.is_set():
+                del self._jobs[job_id]
+
+    def _run(self, job: Job):
+        if self.runner is not None:
+            self._run_journaled(job)
+            return
+
+        params = job.params
+        with log_context(job_id=job.id, source_file=params["file"]):
+            job.status = "running"
+            job.started_at = time.time()
+            job.attempts += 1
+            start = time.perf_counter()
+            try:
+                job.result = self.publisher.run_job(job.type, params)
+                job.status = "succeeded"
+                logger.info("[Server] 任务完成: %s", job.id)
+            except MpWeixinError as e:
+                job.error = e.user_message()
+                job.status = "failed"
+                logger.error("[Server] 任务失败: %s, 错误: %s", job.id, job.error)
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+                logger.exception("[Server] 任务异常: %s", job.id)
+            finally:
+                self._finish(job, start)
+
+    def _run_journaled(self, job: Job):
+        """由 runner 执行并记录到任务日志，需要重试时按退避时间重新排队"""
+        job.status = "running"
+        job.started_at = time.time()
+        start = time.perf_counter()
+        record: Optional[JournalJob] = self.runner.execute(job.id)
+        if record is None:
+            job.error = "任务正在其他进程中执行"
+            job.status = "failed"
+            self._finish(job, start)
+            return
+        job.attempts = record.attempts
+        job.error = record.error
+        if record.status == "pending":
+            job.status = "queued"
+            JOB_DURATION.labels(type=job.type).observe(time.perf_counter() - start)
+            self._enqueue(job, record.next_run_at)
+            return
+        job.result = record.result
+        job.status = record.status
+        self._finish(job, start)
+
+    def _finish(self, job: Job, start: float):
+        job.finished_at = time.time()
+        JOBS.labels(type=job.type, status=job.status).inc()
+        JOB_DURATION.labels(type=job.type).observe(time.perf_counter() - start)
+        job.done.set()
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """任务接口请求处理"""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def manager(self) -> JobManager:
+        return self.server.manager
+
+    def log_message(self, format, *args):
+        logger.debug("[Server] %s", format % args)
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/healthz":
+            self._send_json(
+                200,
+                {
+                    "status": "ok",
+                    "api": self.manager.publisher.has_api,
+                    "workers": self.manager.workers,
+                    **self.manager.counts(),
+                },
+            )
+        elif path == "/metrics":
+            self._send(
+                200, REGISTRY.render().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+            )
+        elif path == "/jobs":
+            self._send_json(200, {"jobs": [job.to_dict() for job in self.manager.list()]})
+        elif path.startswith("/jobs/"):
+            job = self.manager.get(path[len("/jobs/") :])
+            if job is None:
+                self._send_json(404, {"error": "任务不存在"})
+            else:
+                self._send_json(200, job.to_dict())
+        else:
+            self._send_json(404, {"error": "未知的接口"})
+
+    def do_POST(self):
+        if self.path.split("?")[0].rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "未知的接口"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("请求体必须是 JSON 对象")
+            wait = self._parse_wait(body.get("wait"))
+            job = self.manager.submit(body.get("type", "publish"), body)
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        if wait > 0 and job.done.wait(min(wait, MAX_WAIT_SECONDS)):
+            self._send_json(200, job.to_dict())
+        else:
+            self._send_json(202, job.to_dict())
+
+    @staticmethod
+    def _parse_wait(value) -> float:
+        """校验 wait 参数（秒），在提交任务之前执行"""
+        if value is None or value == "":
+            return 0.0
+        try:
+            wait = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"wait 必须是数字: {value!r}")
+        if wait != wait or wait < 0:
+            raise ValueError(f"wait 必须是非负数: {value!r}")
+        return wait
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class JobHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, manager: JobManager):
+        super().__init__(address, JobRequestHandler)
+        self.manager = manager
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class JobUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket 上的任务接口（socket 文件权限为 0600，仅当前用户可访问）"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, manager: JobManager):
+        if socket_path.exists():
+            socket_path.unlink()
+        super().__init__(str(socket_path), JobRequestHandler)
+        os.chmod(socket_path, 0o600)
+        self.socket_path = socket_path
+        self.manager = manager
+
+    @property
+    def url(self) -> str:
+        return f"unix://{self.socket_path}"
+
+    def server_close(self):
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+def create_server(
+    manager: JobManager,
+    host: str = "127.0.0.1",
+    port: int = 8800,
+    socket_path: Optional[Path] = None,
+):
+    """创建任务接口服务器：指定 socket_path 时监听 Unix socket，否则监听 TCP"""
+    if socket_path is not None:
+        return JobUnixServer(socket_path, manager)
+    return JobHTTPServer((host, port), manager)
@@ -0,0 +1,197 @@
+"""远程图片下载缓存 - 基于 ETag/Last-Modified 的条件请求"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from utils.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目"""
+
+    url: str
+    filename: str
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    last_access: float = 0.0
+
+
+class DownloadCache:
+    """按 URL 持久化的下载缓存
+
+    缓存文件名由 URL 哈希决定，重复发布不会在临时目录中产生 _1、_2 副本。
+    每次使用前通过 If-None-Match / If-Modified-Since 向源站重新验证，
+    图片未变化时源站返回 304，不传输任何内容。
+    总大小超过 max_bytes 时按最近最少使用顺序淘汰。
+
+    hit / store 返回的文件会被固定（pin），直到调用方 release 之前不会被淘汰，
+    多个任务共享同一个缓存时，其他任务的写入不会删除仍在优化或上传的文件。
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CacheEntry] = self._load_index()
+        self._pins: Counter = Counter()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load_index(self) -> Dict[str, CacheEntry]:
+        index_path = self.cache_dir / self.INDEX_FILE
+        if not index_path.exists():
+            return {}
+
+        try:
+            raw = json.loads(index_path.read_text(encoding="utf-8"))
+            return {url: CacheEntry(**entry) for url, entry in raw.items()}
+        except (ValueError, TypeError) as e:
+            logger.warning("[DownloadCache] 缓存索引损坏，已重置: %s", e)
+            return {}
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """查找缓存条目（缓存文件已被删除时返回 None）"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry and not (self.cache_dir / entry.filename).exists():
+                del self._entries[url]
+                self._dirty = True
+                entry = None
+            return entry
+
+    def path_of(self, entry: CacheEntry) -> Path:
+        return self.cache_dir / entry.filename
+
+    def conditional_headers(self, entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """构建条件请求头"""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def temp_path(self, url: str) -> Path:
+        """下载过程中使用的临时文件路径"""
+        return self.cache_dir / f"{self._filename(url)}.{threading.get_ident()}.part"
+
+    def hit(self, url: str) -> Optional[Path]:
+        """源站返回 304，复用并固定缓存文件
+
+        条目在重新验证期间被淘汰或删除时返回 None，调用方需要重新完整下载。
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or not (self.cache_dir / entry.filename).exists():
+                return None
+            self._pins[url] += 1
+            entry.last_access = time.time()
+            self._dirty = True
+            self.hits += 1
+            path = self.cache_dir / entry.filename
+        CACHE_REQUESTS.labels(cache="download", result="hit").inc()
+        return path
+
+    def store(
+        self,
+        url: str,
+        temp_path: Path,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Path:
+        """将下载完成的临时文件放入缓存并固定"""
+        filename = self._filename(url)
+        target = self.cache_dir / filename
+        os.replace(temp_path, target)
+
+        with self._lock:
+            self._entries[url] = CacheEntry(
+                url=url,
+                filename=filename,
+                size=target.stat().st_size,
+                etag=etag,
+                last_modified=last_modified,
+                last_access=time.time(),
+            )
+            self._dirty = True
+            self.misses += 1
+            self._pins[url] += 1
+            self._evict()
+        CACHE_REQUESTS.labels(cache="download", result="miss").inc()
+
+        return target
+
+    def release(self, url: str):
+        """解除 hit / store 对文件的固定，之后该文件可以被淘汰"""
+        with self._lock:
+            if self._pins[url] <= 1:
+                self._pins.pop(url, None)
+            else:
+                self._pins[url] -= 1
+            self._evict()
+
+    def save(self):
+        """持久化缓存索引"""
+        with self._lock:
+            if not self._dirty:
+                return
+            index_path = self.cache_dir / self.INDEX_FILE
+            tmp_path = index_path.with_suffix(".tmp")
+            tmp_path.write_text(
+                json.dumps(
+                    {url: asdict(e) for url, e in self._entries.items()}, ensure_ascii=False
+                ),
+                encoding="utf-8",
+            )
+            os.replace(tmp_path, index_path)
+            self._dirty = False
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    def _evict(self):
+        """按 LRU 淘汰超出容量且未被固定的条目（调用方持有锁）"""
+        total = self.total_bytes
+        if total <= self.max_bytes:
+            return
+
+        for entry in sorted(self._entries.values(), key=lambda e: e.last_access):
+            if total <= self.max_bytes:
+                break
+            if entry.url in self._pins:
+                continue
+            try:
+                (self.cache_dir / entry.filename).unlink()
+            except FileNotFoundError:
+                pass
+            del self._entries[entry.url]
+            total -= entry.size
+            logger.debug("[DownloadCache] 淘汰缓存: %s", entry.url)
+
+    @staticmethod
+    def _filename(url: str) -> str:
+        """由 URL 生成稳定的缓存文件名"""
+        suffix = Path(urlparse(url).path).suffix.lower()
+        if not suffix or len(suffix) > 5:
+            suffix = ".jpg"
+        return hashlib.sha1(url.encode("utf-8")).hexdigest() + suffix
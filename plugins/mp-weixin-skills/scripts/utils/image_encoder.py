@@ -0,0 +1,192 @@
+"""图片编码器 - 按字节预算编码 JPEG/WebP"""
+
+import io
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from exceptions import ConversionError
+
+logger = logging.getLogger(__name__)
+
+# 微信永久素材大小限制（add_material）
+WECHAT_MEDIA_MAX_BYTES: Dict[str, int] = {
+    "thumb": 64 * 1024,  # 缩略图: 64KB，仅支持 JPG
+    "image": 10 * 1024 * 1024,  # 图片: 10MB
+}
+
+
+@dataclass
+class EncodeResult:
+    """编码结果"""
+
+    data: bytes
+    format: str
+    quality: int
+    dimensions: Tuple[int, int]
+    elapsed_ms: float
+    attempts: int
+
+    @property
+    def byte_size(self) -> int:
+        return len(self.data)
+
+    def save(self, file_path: Path) -> Path:
+        """写入文件"""
+        file_path.write_bytes(self.data)
+        return file_path
+
+    def summary(self) -> Dict:
+        """用于日志和元数据的摘要"""
+        return {
+            "format": self.format,
+            "quality": self.quality,
+            "bytes": self.byte_size,
+            "width": self.dimensions[0],
+            "height": self.dimensions[1],
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "attempts": self.attempts,
+        }
+
+
+class ImageEncoder:
+    """按目标字节数编码图片
+
+    在 [min_quality, max_quality] 区间内二分查找满足字节预算的最高质量；
+    若最低质量仍超出预算，则按比例缩小尺寸后重试。
+    """
+
+    SUPPORTED_FORMATS = ("JPEG", "WEBP")
+
+    def __init__(
+        self,
+        image_format: str = "JPEG",
+        max_bytes: Optional[int] = None,
+        min_quality: int = 40,
+        max_quality: int = 95,
+        progressive: bool = True,
+        optimize: bool = True,
+        max_downscales: int = 4,
+        downscale_step: float = 0.85,
+    ):
+        image_format = image_format.upper()
+        if image_format == "JPG":
+            image_format = "JPEG"
+        if image_format not in self.SUPPORTED_FORMATS:
+            raise ConversionError(f"不支持的编码格式: {image_format}", {"format": image_format})
+
+        self.image_format = image_format
+        self.max_bytes = max_bytes
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.progressive = progressive
+        self.optimize = optimize
+        self.max_downscales = max_downscales
+        self.downscale_step = downscale_step
+
+    @property
+    def extension(self) -> str:
+        return ".jpg" if self.image_format == "JPEG" else ".webp"
+
+    def encode(self, img: Image.Image) -> EncodeResult:
+        """编码图片，返回满足字节预算的结果"""
+        start = time.perf_counter()
+        img = self._prepare(img)
+        attempts = 0
+
+        for _ in range(self.max_downscales + 1):
+            quality, data, tries = self._search_quality(img)
+            attempts += tries
+            if data is not None:
+                result = EncodeResult(
+                    data=data,
+                    format=self.image_format,
+                    quality=quality,
+                    dimensions=img.size,
+                    elapsed_ms=(time.perf_counter() - start) * 1000,
+                    attempts=attempts,
+                )
+                logger.debug(
+                    "[ImageEncoder] 编码完成 - %s q=%d %dx%d %d 字节, 耗时 %.1fms",
+                    result.format,
+                    result.quality,
+                    img.width,
+                    img.height,
+                    result.byte_size,
+                    result.elapsed_ms,
+                )
+                return result
+
+            new_size = (
+                max(1, int(img.width * self.downscale_step)),
+                max(1, int(img.height * self.downscale_step)),
+            )
+            logger.info(
+                "[ImageEncoder] 最低质量仍超出预算 %d 字节，缩小尺寸至 %dx%d",
+                self.max_bytes,
+                *new_size,
+            )
+            img = img.resize(new_size, Image.LANCZOS)
+
+        raise ConversionError(
+            f"无法将图片压缩到 {self.max_bytes} 字节以内",
+            {"max_bytes": self.max_bytes, "format": self.image_format},
+        )
+
+    def encode_to_file(self, img: Image.Image, file_path: Path) -> EncodeResult:
+        """编码并写入文件"""
+        result = self.encode(img)
+        result.save(file_path)
+        return result
+
+    def _search_quality(self, img: Image.Image) -> Tuple[int, Optional[bytes], int]:
+        """二分查找满足预算的最高质量，返回 (质量, 数据, 尝试次数)"""
+        data = self._encode_once(img, self.max_quality)
+        if self.max_bytes is None or len(data) <= self.max_bytes:
+            return self.max_quality, data, 1
+
+        attempts = 1
+        best_quality, best_data = self.min_quality, None
+        lo, hi = self.min_quality, self.max_quality - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            data = self._encode_once(img, mid)
+            attempts += 1
+            if len(data) <= self.max_bytes:
+                best_quality, best_data = mid, data
+                lo = mid + 1
+            else:
+                hi = mid - 1
+
+        return best_quality, best_data, attempts
+
+    def _encode_once(self, img: Image.Image, quality: int) -> bytes:
+        buffer = io.BytesIO()
+        if self.image_format == "JPEG":
+            img.save(
+                buffer,
+                "JPEG",
+                quality=quality,
+                optimize=self.optimize,
+                progressive=self.progressive,
+            )
+        else:
+            img.save(buffer, "WEBP", quality=quality, method=6 if self.optimize else 4)
+        return buffer.getvalue()
+
+    def _prepare(self, img: Image.Image) -> Image.Image:
+        """转换为目标格式支持的色彩模式"""
+        if self.image_format == "JPEG" and img.mode not in ("RGB", "L"):
+            if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                rgba = img.convert("RGBA")
+                background = Image.new("RGB", rgba.size, (255, 255, 255))
+                background.paste(rgba, mask=rgba.split()[-1])
+                return background
+            return img.convert("RGB")
+        if self.image_format == "WEBP" and img.mode not in ("RGB", "RGBA"):
+            return img.convert("RGBA" if "A" in img.mode else "RGB")
+        return img
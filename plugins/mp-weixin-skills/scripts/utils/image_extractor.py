@@ -1,21 +1,145 @@
 """图片提取器 - 从文档中提取图片引用"""
 
+import io
 import re
 import logging
+import threading
+import zipfile
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import BinaryIO, List, Dict, Tuple
 from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from parsers.base import ImageRef
+from utils.download_cache import DownloadCache
+from utils.logger import ContextThreadPoolExecutor
+from utils.timing import timed
 
 logger = logging.getLogger(__name__)
 
 
+class EmbeddedImageStream(io.BufferedIOBase):
+    """文档包内嵌图片的只读流，持有所属的 ZipFile，关闭时一并关闭"""
+
+    def __init__(self, container, part_name: str):
+        super().__init__()
+        self._package = zipfile.ZipFile(container)
+        try:
+            # 解压后的大小，供上传前预检，无需读完整个流
+            self.size = self._package.getinfo(part_name).file_size
+            self._member = self._package.open(part_name)
+        except Exception:
+            self._package.close()
+            raise
+        self.name = part_name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._member.seekable()
+
+    def read(self, size: int = -1) -> bytes:
+        return self._member.read(size)
+
+    def read1(self, size: int = -1) -> bytes:
+        return self._member.read1(size)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._member.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._member.tell()
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self._member.close()
+            finally:
+                self._package.close()
+        super().close()
+
+
 class ImageExtractor:
     """从 Markdown 或 HTML 中提取图片引用"""
 
-    def __init__(self, temp_dir: Path):
+    def __init__(
+        self,
+        temp_dir: Path,
+        max_workers: int = 8,
+        per_host_limit: int = 4,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: int = 30,
+        cache: DownloadCache = None,
+    ):
+        """
+        初始化图片提取器
+
+        Args:
+            temp_dir: 临时目录，远程图片下载到这里
+            max_workers: 并发下载线程数
+            per_host_limit: 同一主机的最大并发下载数
+            retries: 失败重试次数
+            backoff_factor: 重试退避系数（秒）
+            timeout: 单次请求超时（秒）
+            cache: 下载缓存，为 None 时每次都完整下载
+        """
         self.temp_dir = temp_dir
         self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self.cache = cache
+        self._session = self._create_session(retries, backoff_factor)
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_lock = threading.Lock()
+        self._reserved_names = set()
+        self._name_lock = threading.Lock()
+        # 本次使用中固定的缓存文件，close 时解除
+        self._pinned: List[str] = []
+
+    def _create_session(self, retries: int, backoff_factor: float) -> requests.Session:
+        """创建复用连接池的 HTTP 会话"""
+        session = requests.Session()
+
+        retry_strategy = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        return session
+
+    def close(self):
+        """关闭 HTTP 会话，解除固定的缓存文件并保存缓存索引"""
+        self._session.close()
+        if self.cache:
+            with self._name_lock:
+                pinned, self._pinned = self._pinned, []
+            for url in pinned:
+                self.cache.release(url)
+            self.cache.save()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """获取主机级并发信号量"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+            return slot
 
     def extract_from_markdown(self, content: str, base_path: Path) -> List[Dict]:
         """
@@ -53,9 +177,36 @@ class ImageExtractor:
                 'base_path': base_path,
                 'index': i
             })
-            logger.debug(f"[ImageExtractor] 找到图片: {image_path} (类型: {image_type})")
+            logger.debug("[ImageExtractor] 找到图片: %s (类型: %s)", image_path, image_type)
+
+        logger.info("[ImageExtractor] 从 Markdown 中提取到 %s 张图片", len(images))
+        return images
+
+    def extract_from_refs(self, image_refs: List[ImageRef]) -> List[Dict]:
+        """
+        从解析器生成的图片索引构建图片信息，无需重新读取或扫描源文件
+
+        Args:
+            image_refs: ParsedContent.image_refs
 
-        logger.info(f"[ImageExtractor] 从 Markdown 中提取到 {len(images)} 张图片")
+        Returns:
+            图片信息列表，格式与 extract_from_markdown 相同
+        """
+        images = [
+            {
+                "path": ref.src,
+                "alt": ref.alt,
+                "type": ref.kind,
+                "resolved_path": ref.resolved_path,
+                "index": ref.position,
+                "line": ref.line,
+                "container": ref.container,
+                "part_name": ref.part_name,
+                "size": ref.byte_size,
+            }
+            for ref in image_refs
+        ]
+        logger.info("[ImageExtractor] 从图片索引中获取到 %s 张图片", len(images))
         return images
 
     def extract_from_html(self, content: str) -> List[Dict]:
@@ -89,9 +240,9 @@ class ImageExtractor:
                 'type': image_type,
                 'index': i
             })
-            logger.debug(f"[ImageExtractor] 从 HTML 找到图片: {image_path}")
+            logger.debug("[ImageExtractor] 从 HTML 找到图片: %s", image_path)
 
-        logger.info(f"[ImageExtractor] 从 HTML 中提取到 {len(images)} 张图片")
+        logger.info("[ImageExtractor] 从 HTML 中提取到 %s 张图片", len(images))
         return images
 
     def resolve_local_path(self, image_info: Dict) -> Path:
@@ -106,7 +257,10 @@ class ImageExtractor:
         """
         image_path = image_info['path']
 
-        if image_info['type'] == 'absolute':
+        if image_info.get("resolved_path"):
+            # 解析器已解析好的路径
+            return Path(image_info["resolved_path"])
+        elif image_info["type"] == "absolute":
             # 绝对路径
             return Path(image_path)
         elif image_info['type'] == 'relative':
@@ -117,36 +271,168 @@ class ImageExtractor:
             # 远程图片，不处理
             return None
 
-    def download_remote_image(self, url: str, filename: str) -> Path:
+    @timed("image.download")
+    def download_remote_image(self, url: str, filename: str = None) -> Path:
         """
         下载远程图片到临时目录
 
+        启用下载缓存时忽略 filename，先用缓存的 ETag/Last-Modified 发起条件请求，
+        源站返回 304 时直接复用缓存文件。
+
         Args:
             url: 图片 URL
-            filename: 保存的文件名
+            filename: 保存的文件名（未启用缓存时使用）
 
         Returns:
             本地文件路径
         """
-        local_path = self.temp_dir / filename
+        entry = self.cache.lookup(url) if self.cache else None
+        if self.cache:
+            local_path = self.cache.temp_path(url)
+        else:
+            local_path = self.temp_dir / (filename or self._generate_filename(url))
 
         try:
-            logger.info(f"[ImageExtractor] 下载远程图片: {url}")
-            response = requests.get(url, timeout=30, stream=True)
-            response.raise_for_status()
-
-            with open(local_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-
-            logger.info(f"[ImageExtractor] 图片已保存: {local_path}")
+            with self._host_slot(url):
+                logger.info("[ImageExtractor] 下载远程图片: %s", url)
+                headers = self.cache.conditional_headers(entry) if self.cache else {}
+                with self._session.get(
+                    url, headers=headers, timeout=self.timeout, stream=True
+                ) as response:
+                    if entry is not None and response.status_code == 304:
+                        cached_path = self.cache.hit(url)
+                        if cached_path is not None:
+                            self._pin(url)
+                            logger.info("[ImageExtractor] 图片未变化，使用缓存: %s", cached_path)
+                            return cached_path
+                    else:
+                        response.raise_for_status()
+
+                        with open(local_path, "wb") as f:
+                            for chunk in response.iter_content(chunk_size=65536):
+                                if chunk:
+                                    f.write(chunk)
+
+            if entry is not None and response.status_code == 304:
+                # 缓存条目在重新验证期间被其他任务淘汰，重新完整下载（此时查不到条目，不再发条件请求）
+                logger.info("[ImageExtractor] 缓存已被淘汰，重新下载: %s", url)
+                return self.download_remote_image(url, filename)
+
+            if self.cache:
+                local_path = self.cache.store(
+                    url,
+                    local_path,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+                self._pin(url)
+
+            logger.info("[ImageExtractor] 图片已保存: %s", local_path)
             return local_path
 
         except Exception as e:
-            logger.error(f"[ImageExtractor] 下载图片失败: {url}, 错误: {e}")
+            logger.error("[ImageExtractor] 下载图片失败: %s, 错误: %s", url, e)
+            if self.cache and local_path.exists():
+                local_path.unlink()
             raise
 
+    def _pin(self, url: str):
+        """记录固定的缓存文件，在 close 时解除"""
+        with self._name_lock:
+            self._pinned.append(url)
+
+    def download_remote_images(self, urls: List[str]) -> Dict[str, Path]:
+        """
+        并发下载远程图片，相同 URL 只下载一次
+
+        Args:
+            urls: 图片 URL 列表（可包含重复项）
+
+        Returns:
+            {URL: 本地文件路径} 映射，下载失败的 URL 不在其中
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+
+        # 在主线程中分配文件名，避免并发下载时文件名冲突（缓存文件名由 URL 决定）
+        if self.cache:
+            filenames = dict.fromkeys(unique_urls)
+        else:
+            filenames = {url: self._generate_filename(url) for url in unique_urls}
+
+        logger.info(
+            "[ImageExtractor] 并发下载 %s 张远程图片 (workers=%s, 每主机上限=%s)",
+            len(unique_urls),
+            self.max_workers,
+            self.per_host_limit,
+        )
+
+        downloaded = {}
+        workers = min(self.max_workers, len(unique_urls))
+        with ContextThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                url: pool.submit(self.download_remote_image, url, filenames[url])
+                for url in unique_urls
+            }
+            for url, future in futures.items():
+                try:
+                    downloaded[url] = future.result()
+                except Exception:
+                    # 错误已在 download_remote_image 中记录，跳过该图片
+                    continue
+
+        if self.cache:
+            self.cache.save()
+
+        logger.info(
+            "[ImageExtractor] 远程图片下载完成: %s/%s 张成功", len(downloaded), len(unique_urls)
+        )
+        return downloaded
+
+    def prepare_image(self, image_info: Dict) -> Path:
+        """
+        准备单张图片：远程图片下载到本地，本地图片解析路径，内嵌图片确认文档包存在
+
+        可在工作线程中调用，结果写入 image_info['local_path']（内嵌图片除外）。
+
+        Args:
+            image_info: 图片信息字典
+
+        Returns:
+            本地文件路径，无法获取时返回 None
+        """
+        if image_info["type"] == "embedded":
+            # 内嵌图片上传时直接从文档包中流式读取，不落盘
+            container = image_info.get("container")
+            return Path(container) if container and Path(container).exists() else None
+        elif image_info["type"] == "remote":
+            try:
+                local_path = self.download_remote_image(image_info["path"])
+            except Exception:
+                # 错误已在 download_remote_image 中记录
+                return None
+        else:
+            local_path = self.resolve_local_path(image_info)
+            if not (local_path and local_path.exists()):
+                return None
+
+        image_info["local_path"] = local_path
+        return local_path
+
+    @staticmethod
+    def open_embedded(image_info: Dict) -> BinaryIO:
+        """
+        以流的方式打开文档包中的内嵌图片，无需解压整个文档
+
+        Args:
+            image_info: 内嵌图片信息（包含 container 和 part_name）
+
+        Returns:
+            可读的二进制流，使用完毕后需关闭（同时关闭文档包）
+        """
+        return EmbeddedImageStream(image_info["container"], image_info["part_name"])
+
     def extract_and_prepare_images(self, content: str, content_type: str = 'markdown', base_path: Path = None) -> Tuple[List[Dict], List[Path]]:
         """
         提取并准备所有图片（下载远程图片到本地）
@@ -169,13 +455,16 @@ class ImageExtractor:
 
         local_images = []
 
+        # 并发下载所有远程图片
+        remote_urls = [info["path"] for info in images if info["type"] == "remote"]
+        downloaded = self.download_remote_images(remote_urls)
+
         for image_info in images:
             if image_info['type'] == 'remote':
-                # 下载远程图片
-                filename = self._generate_filename(image_info['path'])
-                local_path = self.download_remote_image(image_info['path'], filename)
-                image_info['local_path'] = local_path
-                local_images.append(local_path)
+                local_path = downloaded.get(image_info["path"])
+                if local_path:
+                    image_info["local_path"] = local_path
+                    local_images.append(local_path)
             else:
                 # 本地图片，直接使用
                 local_path = self.resolve_local_path(image_info)
@@ -202,8 +491,10 @@ class ImageExtractor:
         base_name = Path(filename).stem
         ext = Path(filename).suffix
 
-        while (self.temp_dir / filename).exists():
-            counter += 1
-            filename = f"{base_name}_{counter}{ext}"
+        with self._name_lock:
+            while (self.temp_dir / filename).exists() or filename in self._reserved_names:
+                counter += 1
+                filename = f"{base_name}_{counter}{ext}"
 
+            self._reserved_names.add(filename)
         return filename
@@ -0,0 +1,318 @@
+"""图片优化器 - 上传前缩放、重新编码、去除元数据并转换格式"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from utils.image_encoder import ImageEncoder, WECHAT_MEDIA_MAX_BYTES
+from utils.logger import ContextThreadPoolExecutor
+from utils.metrics import CACHE_REQUESTS
+from utils.timing import timed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OptimizeResult:
+    """优化结果"""
+
+    source: Path
+    path: Path
+    original_bytes: int
+    optimized_bytes: int
+    dimensions: Tuple[int, int]
+    cached: bool
+    elapsed_ms: float
+
+    @property
+    def changed(self) -> bool:
+        return self.path != self.source
+
+    def summary(self) -> Dict:
+        return {
+            "original_bytes": self.original_bytes,
+            "optimized_bytes": self.optimized_bytes,
+            "width": self.dimensions[0],
+            "height": self.dimensions[1],
+            "cached": self.cached,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+        }
+
+
+class ImageOptimizer:
+    """上传前的图片优化
+
+    - 宽度超过 max_width 时等比缩小（文章正文按 677px 渲染，默认保留约 1.6 倍清晰度）
+    - 按 max_bytes 预算重新编码
+    - 按 EXIF 方向旋转后去除全部元数据
+    - 将微信不支持的格式（WebP、TIFF 等）转换为 JPEG/PNG
+    - 输出按源文件内容哈希缓存，重复发布无需再次处理；缓存总大小超过 max_cache_bytes 时
+      按最近访问时间淘汰（最近 EVICT_MIN_AGE 秒内用过的文件可能仍在等待上传，不淘汰）
+    """
+
+    # 微信图片素材支持的格式
+    WECHAT_FORMATS = {"JPEG", "PNG", "GIF", "BMP"}
+
+    # 缓存键版本，优化逻辑变化时递增
+    CACHE_VERSION = 1
+
+    # 缓存文件的扩展名（重新编码输出 JPEG/PNG，内嵌图片原样写出时保留原格式）
+    FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "BMP": ".bmp"}
+
+    # 最近访问过的缓存文件不淘汰的秒数
+    EVICT_MIN_AGE = 3600
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_width: int = 1080,
+        max_bytes: int = 1024 * 1024,
+        max_quality: int = 85,
+        workers: int = 4,
+        max_cache_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_cache_bytes = max_cache_bytes
+        self._lock = threading.Lock()
+        # 缓存总大小只在启动时扫描一次，之后随写入累加，超出上限时才扫描淘汰
+        self._cache_bytes = sum(size for _, size, _ in self._cache_files())
+        self.max_width = max_width
+        self.max_bytes = min(max_bytes, WECHAT_MEDIA_MAX_BYTES["image"])
+        self.max_quality = max_quality
+        self.workers = max(1, workers)
+
+    def optimize(self, source: Path) -> OptimizeResult:
+        """优化单张图片，返回优化后的文件路径（无需处理时返回原路径）"""
+        return self.optimize_data(source.read_bytes(), source)
+
+    def optimize_data(self, data: bytes, source: Path, materialize: bool = False) -> OptimizeResult:
+        """优化内存中的图片数据，source 仅用于日志和结果标识
+
+        materialize 为 True 时（source 不是磁盘上的文件，如文档包内嵌图片），
+        无需处理的图片也写入缓存目录，返回可上传的文件路径。
+        """
+        start = time.perf_counter()
+        cache_key = self._cache_key(data)
+
+        cached_path = self._lookup_cache(cache_key)
+        CACHE_REQUESTS.labels(
+            cache="image_optimize", result="miss" if cached_path is None else "hit"
+        ).inc()
+        if cached_path is not None:
+            with Image.open(cached_path) as img:
+                dimensions = img.size
+            logger.debug("[ImageOptimizer] 命中缓存: %s -> %s", source.name, cached_path.name)
+            return OptimizeResult(
+                source=source,
+                path=cached_path,
+                original_bytes=len(data),
+                optimized_bytes=cached_path.stat().st_size,
+                dimensions=dimensions,
+                cached=True,
+                elapsed_ms=(time.perf_counter() - start) * 1000,
+            )
+
+        with Image.open(io.BytesIO(data)) as img:
+            if not self._needs_processing(img, len(data)):
+                logger.debug("[ImageOptimizer] 无需处理: %s", source.name)
+                path = source
+                if materialize:
+                    extension = self.FORMAT_EXTENSIONS.get(img.format, source.suffix.lower())
+                    path = self._store(cache_key, data, extension)
+                return OptimizeResult(
+                    source=source,
+                    path=path,
+                    original_bytes=len(data),
+                    optimized_bytes=len(data),
+                    dimensions=img.size,
+                    cached=False,
+                    elapsed_ms=(time.perf_counter() - start) * 1000,
+                )
+
+            img = ImageOps.exif_transpose(img)
+            if img.width > self.max_width:
+                height = max(1, round(img.height * self.max_width / img.width))
+                img = img.resize((self.max_width, height), Image.LANCZOS)
+
+            encoded, extension = self._encode(img)
+
+        target = self._store(cache_key, encoded, extension)
+
+        result = OptimizeResult(
+            source=source,
+            path=target,
+            original_bytes=len(data),
+            optimized_bytes=len(encoded),
+            dimensions=img.size,
+            cached=False,
+            elapsed_ms=(time.perf_counter() - start) * 1000,
+        )
+        logger.info(
+            "[ImageOptimizer] 优化完成: %s %s -> %s 字节, 耗时 %.1fms",
+            source.name,
+            result.original_bytes,
+            result.optimized_bytes,
+            result.elapsed_ms,
+        )
+        return result
+
+    def optimize_images(self, images: List[Dict]) -> List[Dict]:
+        """并发优化图片列表，原地更新每项的 local_path
+
+        原始路径保存在 original_local_path 中；优化失败时保留原文件。
+        """
+        pending = [img for img in images if img.get("local_path") or img.get("type") == "embedded"]
+        if not pending:
+            return images
+
+        logger.info("[ImageOptimizer] 开始优化 %s 张图片 (workers=%s)", len(pending), self.workers)
+
+        with ContextThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(self.optimize_image, pending))
+
+        return images
+
+    @timed("image.optimize")
+    def optimize_image(self, image_info: Dict) -> Dict:
+        """优化单张图片，原地更新 local_path；优化失败时保留原文件
+
+        文档包中的内嵌图片若格式受支持且未超出预算，则保持流式上传不做处理；
+        否则读出数据优化后写入缓存目录。
+        """
+        embedded = not image_info.get("local_path") and image_info.get("type") == "embedded"
+        if embedded:
+            if not self._embedded_needs_processing(image_info):
+                return image_info
+            source = Path(image_info["part_name"])
+        elif image_info.get("local_path"):
+            source = Path(image_info["local_path"])
+        else:
+            return image_info
+
+        try:
+            data = self._read_embedded(image_info) if embedded else source.read_bytes()
+            result = self.optimize_data(data, source, materialize=embedded)
+        except Exception as e:
+            logger.warning("[ImageOptimizer] 优化失败，使用原图: %s, 错误: %s", source, e)
+            return image_info
+
+        image_info["original_local_path"] = image_info.get("local_path")
+        image_info["local_path"] = result.path
+        image_info["optimized"] = result.summary()
+        return image_info
+
+    # 可直接上传的内嵌图片扩展名
+    EMBEDDED_PASSTHROUGH_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".bmp"}
+
+    def _embedded_needs_processing(self, image_info: Dict) -> bool:
+        """判断内嵌图片是否需要处理（仅依据扩展名和大小，不读取内容）"""
+        suffix = Path(image_info["part_name"]).suffix.lower()
+        size = image_info.get("size") or 0
+        return suffix not in self.EMBEDDED_PASSTHROUGH_SUFFIXES or size > self.max_bytes
+
+    @staticmethod
+    def _read_embedded(image_info: Dict) -> bytes:
+        from utils.image_extractor import ImageExtractor
+
+        with ImageExtractor.open_embedded(image_info) as stream:
+            return stream.read()
+
+    def _cache_key(self, data: bytes) -> str:
+        digest = hashlib.sha256(data)
+        digest.update(
+            f"|v{self.CACHE_VERSION}|w{self.max_width}|b{self.max_bytes}|q{self.max_quality}".encode()
+        )
+        return digest.hexdigest()[:40]
+
+    def _lookup_cache(self, cache_key: str) -> Optional[Path]:
+        """按可能的扩展名直接查找缓存文件（每次最多几次 stat，与缓存大小无关）"""
+        for extension in self.FORMAT_EXTENSIONS.values():
+            candidate = self.cache_dir / f"{cache_key}{extension}"
+            try:
+                # 刷新访问时间，淘汰时按最近使用排序
+                os.utime(candidate)
+            except FileNotFoundError:
+                continue
+            return candidate
+        return None
+
+    def _store(self, cache_key: str, data: bytes, extension: str) -> Path:
+        """写入缓存文件（原子替换），总大小超出上限时淘汰最久未使用的文件"""
+        target = self.cache_dir / f"{cache_key}{extension}"
+        tmp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, target)
+
+        with self._lock:
+            self._cache_bytes += len(data)
+            if self._cache_bytes > self.max_cache_bytes:
+                self._cache_bytes = self._evict(keep=target)
+        return target
+
+    def _cache_files(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self, keep: Path) -> int:
+        """按最近访问时间淘汰超出容量的缓存文件（保留刚写入的 keep），返回淘汰后的总大小"""
+        entries = self._cache_files()
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.EVICT_MIN_AGE
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_cache_bytes or mtime > cutoff:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            logger.debug("[ImageOptimizer] 淘汰缓存: %s", path.name)
+        return total
+
+    def _needs_processing(self, img: Image.Image, byte_size: int) -> bool:
+        """判断图片是否需要处理"""
+        if img.format == "GIF" and getattr(img, "n_frames", 1) > 1:
+            # 动图重新编码会丢帧，保持原样
+            if byte_size > WECHAT_MEDIA_MAX_BYTES["image"]:
+                logger.warning(
+                    "[ImageOptimizer] 动图超出微信大小限制，无法优化: %s 字节", byte_size
+                )
+            return False
+
+        if img.format not in self.WECHAT_FORMATS:
+            return True
+        if img.width > self.max_width or byte_size > self.max_bytes:
+            return True
+        return bool(img.info.get("exif") or img.getexif())
+
+    def _encode(self, img: Image.Image) -> Tuple[bytes, str]:
+        """编码图片，透明图片优先使用 PNG"""
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha:
+            buffer = io.BytesIO()
+            img.save(buffer, "PNG", optimize=True)
+            if buffer.tell() <= self.max_bytes:
+                return buffer.getvalue(), ".png"
+            logger.debug("[ImageOptimizer] PNG 超出预算，转为 JPEG")
+
+        encoder = ImageEncoder("JPEG", max_bytes=self.max_bytes, max_quality=self.max_quality)
+        return encoder.encode(img).data, encoder.extension
@@ -0,0 +1,148 @@
+"""图片流水线 - 下载、优化与上传重叠执行"""
+
+import logging
+import queue
+import threading
+from contextlib import ExitStack
+from typing import Dict, List
+
+from utils.image_extractor import ImageExtractor
+from utils.image_optimizer import ImageOptimizer
+from utils.image_processor import ImageProcessor
+from utils.logger import ContextThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePipeline:
+    """生产者/消费者图片流水线
+
+    下载线程池（extractor.max_workers）负责下载或解析本地路径，完成后交给优化线程池
+    （optimizer.workers，即 IMAGE_WORKERS）缩放和重新编码，每张图片就绪后立即放入有界队列；
+    消费者在当前线程中依次上传。队列满时优化阶段阻塞，待优化的图片达到队列容量时下载阶段阻塞，
+    形成背压，避免下载远快于上传时在磁盘和内存中堆积。总耗时接近各阶段中最慢的一个，
+    而不是三者之和。
+    """
+
+    def __init__(
+        self,
+        extractor: ImageExtractor,
+        processor: ImageProcessor,
+        optimizer: ImageOptimizer = None,
+        queue_size: int = 8,
+    ):
+        self.extractor = extractor
+        self.processor = processor
+        self.optimizer = optimizer
+        self.queue_size = max(1, queue_size)
+
+    def run(self, html_content: str, images: List[Dict], media_type: str = "image") -> str:
+        """
+        下载、优化、上传所有图片并替换 HTML 中的链接
+
+        Args:
+            html_content: HTML 内容
+            images: 图片信息列表（从 ImageExtractor 提取，尚未下载）
+            media_type: 素材类型
+
+        Returns:
+            替换后的 HTML 内容
+        """
+        if not images:
+            logger.info("[ImagePipeline] 没有需要处理的图片")
+            return html_content
+
+        # 相同引用的图片只处理一次
+        groups: Dict[str, List[Dict]] = {}
+        for image_info in images:
+            groups.setdefault(image_info["path"], []).append(image_info)
+
+        logger.info(
+            "[ImagePipeline] 开始处理 %s 张图片（去重后 %s 张），队列容量 %s",
+            len(images),
+            len(groups),
+            self.queue_size,
+        )
+
+        ready: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        # 已下载、等待优化的图片数上限
+        optimize_slots = threading.BoundedSemaphore(self.queue_size)
+        workers = min(self.extractor.max_workers, len(groups))
+
+        url_mapping: Dict[str, str] = {}
+        with ExitStack() as stack:
+            # 优化线程池先创建后关闭，保证下载线程提交任务时它仍在运行
+            optimize_pool = None
+            if self.optimizer is not None:
+                optimize_pool = stack.enter_context(
+                    ContextThreadPoolExecutor(
+                        max_workers=min(self.optimizer.workers, len(groups)),
+                        thread_name_prefix="optimize",
+                    )
+                )
+            pool = stack.enter_context(
+                ContextThreadPoolExecutor(max_workers=workers, thread_name_prefix="download")
+            )
+            for group in groups.values():
+                pool.submit(self._produce, group, ready, optimize_pool, optimize_slots)
+
+            for _ in range(len(groups)):
+                group = ready.get()
+                primary = group[0]
+                wechat_url = (
+                    self.processor.upload_image(primary, media_type)
+                    if primary.get("prepared")
+                    else None
+                )
+
+                for image_info in group[1:]:
+                    for key in ("local_path", "uploaded", "wechat_url", "media_id"):
+                        if key in primary:
+                            image_info[key] = primary[key]
+
+                if wechat_url:
+                    url_mapping[primary["path"]] = wechat_url
+
+        if self.extractor.cache:
+            self.extractor.cache.save()
+
+        processed_html = self.processor.replace_image_urls(html_content, url_mapping)
+
+        logger.info("[ImagePipeline] 图片处理完成: %s/%s 张成功", len(url_mapping), len(groups))
+        return processed_html
+
+    def _produce(self, group: List[Dict], ready: queue.Queue, optimize_pool, optimize_slots):
+        """下载阶段：准备图片后交给优化阶段，或直接放入队列（队列满时阻塞）"""
+        image_info = group[0]
+        handed_off = False
+        try:
+            if self.extractor.prepare_image(image_info) is None:
+                logger.warning("[ImagePipeline] 无法获取图片，跳过: %s", image_info["path"])
+            elif optimize_pool is None:
+                image_info["prepared"] = True
+            else:
+                optimize_slots.acquire()
+                try:
+                    optimize_pool.submit(self._optimize, group, ready, optimize_slots)
+                except Exception:
+                    optimize_slots.release()
+                    raise
+                handed_off = True
+        except Exception as e:
+            logger.error("[ImagePipeline] 准备图片失败: %s, 错误: %s", image_info["path"], e)
+        finally:
+            # 未交给优化阶段的图片无论成功与否都要放入队列，保证消费者计数正确
+            if not handed_off:
+                ready.put(group)
+
+    def _optimize(self, group: List[Dict], ready: queue.Queue, optimize_slots):
+        """优化阶段：缩放、重新编码后放入队列（队列满时阻塞）"""
+        image_info = group[0]
+        try:
+            self.optimizer.optimize_image(image_info)
+            image_info["prepared"] = True
+        except Exception as e:
+            logger.error("[ImagePipeline] 优化图片失败: %s, 错误: %s", image_info["path"], e)
+        finally:
+            ready.put(group)
+            optimize_slots.release()
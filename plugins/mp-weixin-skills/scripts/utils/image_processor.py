@@ -1,12 +1,63 @@
 """图片处理器 - 上传图片到微信素材库并替换链接"""
 
+import html
 import logging
 from pathlib import Path
 from typing import List, Dict, Optional
+from urllib.parse import unquote
 import re
 
+from utils.timing import timed
+
 logger = logging.getLogger(__name__)
 
+# 匹配 <img> 标签中的 src 属性值（group 3），一次扫描处理全部图片
+IMG_SRC_PATTERN = re.compile(r'(<img\b[^>]*?\ssrc\s*=\s*)(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+
+
+def normalize_image_src(src: str) -> str:
+    """
+    归一化图片地址，用于匹配同一路径的不同写法
+
+    markdown-it 输出的 src 会进行 URL 编码（如中文、空格）并转义 HTML 实体（如 &amp;），
+    归一化后与 Markdown 源码中的原始路径一致。
+    """
+    return unquote(html.unescape(src.strip()))
+
+
+def replace_image_srcs(html_content: str, url_mapping: Dict[str, str]) -> str:
+    """
+    一次扫描替换 HTML 中所有 <img> 的 src
+
+    每个 src 归一化后在映射表中查找，可匹配 URL 编码和 HTML 转义后的路径。
+
+    Args:
+        html_content: HTML 内容
+        url_mapping: {原始路径: 新 URL} 映射
+
+    Returns:
+        替换后的 HTML 内容
+    """
+    if not url_mapping:
+        return html_content
+
+    lookup = {
+        normalize_image_src(old): html.escape(new, quote=True) for old, new in url_mapping.items()
+    }
+    replaced = 0
+
+    def _substitute(match: re.Match) -> str:
+        nonlocal replaced
+        new_src = lookup.get(normalize_image_src(match.group(3)))
+        if new_src is None:
+            return match.group(0)
+        replaced += 1
+        return f"{match.group(1)}{match.group(2)}{new_src}{match.group(2)}"
+
+    html_content = IMG_SRC_PATTERN.sub(_substitute, html_content)
+    logger.debug("[ImageProcessor] 替换图片链接 %s 处", replaced)
+    return html_content
+
 
 class ImageProcessor:
     """处理文章中的图片：上传到微信素材库并替换链接"""
@@ -39,51 +90,98 @@ class ImageProcessor:
             logger.info("[ImageProcessor] 没有需要处理的图片")
             return html_content
 
-        logger.info(f"[ImageProcessor] 开始处理 {len(images)} 张图片")
+        logger.info("[ImageProcessor] 开始处理 %s 张图片", len(images))
 
-        success_count = 0
-        processed_html = html_content
+        url_mapping = {}
 
-        # 从后往前替换，避免位置偏移
-        for i, image_info in enumerate(reversed(images)):
-            try:
-                original_path = image_info['path']
-                local_path = image_info.get('local_path')
+        for i, image_info in enumerate(images):
+            logger.info(
+                "[ImageProcessor] [%s/%s] 处理图片: %s",
+                i + 1,
+                len(images),
+                image_info.get("path", "unknown"),
+            )
+            if image_info["path"] in url_mapping:
+                # 同一图片只上传一次
+                image_info["uploaded"] = True
+                image_info["wechat_url"] = url_mapping[image_info["path"]]
+                continue
+
+            wechat_url = self.upload_image(image_info, media_type)
+            if wechat_url:
+                url_mapping[image_info["path"]] = wechat_url
+
+        # 一次扫描替换 HTML 中的全部图片链接
+        processed_html = self.replace_image_urls(html_content, url_mapping)
+
+        success_count = sum(1 for image_info in images if image_info["path"] in url_mapping)
+        logger.info("[ImageProcessor] 图片处理完成: %s/%s 张成功", success_count, len(images))
+        return processed_html
+
+    @timed("image.upload")
+    def upload_image(self, image_info: Dict, media_type: str = "image") -> Optional[str]:
+        """
+        上传单张图片到微信素材库
 
-                # 跳过无法访问的本地图片
-                if not local_path or not Path(local_path).exists():
-                    logger.warning(f"[ImageProcessor] 图片不存在，跳过: {original_path}")
-                    continue
+        Args:
+            image_info: 图片信息（需包含 local_path），上传结果会写回该字典
+            media_type: 素材类型
 
+        Returns:
+            微信 CDN URL，失败时返回 None
+        """
+        try:
+            original_path = image_info["path"]
+            local_path = image_info.get("local_path")
+
+            if not local_path and image_info.get("type") == "embedded":
+                # 内嵌图片直接从文档包中流式上传
+                from utils.image_extractor import ImageExtractor
+
+                logger.info("[ImageProcessor] 上传内嵌图片: %s", image_info["part_name"])
+                with ImageExtractor.open_embedded(image_info) as stream:
+                    result = self.api_client.upload_media(
+                        image_info["part_name"], media_type, fileobj=stream
+                    )
+
+            # 跳过无法访问的本地图片
+            elif not local_path or not Path(local_path).exists():
+                logger.warning("[ImageProcessor] 图片不存在，跳过: %s", original_path)
+                return None
+
+            else:
                 # 上传图片到微信素材库
-                logger.info(f"[ImageProcessor] [{i+1}/{len(images)}] 上传图片: {Path(local_path).name}")
+                logger.info("[ImageProcessor] 上传图片: %s", Path(local_path).name)
                 result = self.api_client.upload_media(str(local_path), media_type)
 
-                # 获取微信 CDN URL
-                wechat_url = result.get('url', '')
-                media_id = result.get('media_id', '')
+            # 获取微信 CDN URL
+            wechat_url = result.get("url", "")
+            media_id = result.get("media_id", "")
 
-                if not wechat_url:
-                    logger.warning(f"[ImageProcessor] 未获取到 URL，使用 media_id: {media_id}")
-                    continue
+            if not wechat_url:
+                logger.warning("[ImageProcessor] 未获取到 URL，使用 media_id: %s", media_id)
+                return None
 
-                logger.info(f"[ImageProcessor] 图片上传成功: {wechat_url}")
+            logger.info("[ImageProcessor] 图片上传成功: %s", wechat_url)
 
-                # 替换 HTML 中的图片链接
-                processed_html = self._replace_image_url(processed_html, original_path, wechat_url)
-                success_count += 1
+            # 标记为已上传
+            image_info["uploaded"] = True
+            image_info["wechat_url"] = wechat_url
+            image_info["media_id"] = media_id
+            return wechat_url
 
-                # 标记为已上传
-                image_info['uploaded'] = True
-                image_info['wechat_url'] = wechat_url
-                image_info['media_id'] = media_id
+        except Exception as e:
+            logger.error(
+                "[ImageProcessor] 处理图片失败: %s, 错误: %s", image_info.get("path", "unknown"), e
+            )
+            image_info["uploaded"] = False
+            # 记录失败原因，调用方据此决定是否中止发布并重试
+            image_info["upload_error"] = e
+            return None
 
-            except Exception as e:
-                logger.error(f"[ImageProcessor] 处理图片失败: {image_info.get('path', 'unknown')}, 错误: {e}")
-                image_info['uploaded'] = False
-
-        logger.info(f"[ImageProcessor] 图片处理完成: {success_count}/{len(images)} 张成功")
-        return processed_html
+    def replace_image_urls(self, html_content: str, url_mapping: Dict[str, str]) -> str:
+        """一次扫描替换 HTML 中所有 <img> 的 src（见 replace_image_srcs）"""
+        return replace_image_srcs(html_content, url_mapping)
 
     def _replace_image_url(self, html_content: str, old_url: str, new_url: str) -> str:
         """
@@ -97,11 +195,7 @@ class ImageProcessor:
         Returns:
             替换后的 HTML 内容
         """
-        # 替换 <img> 标签中的 src
-        pattern = r'(<img[^>]+src=["\'])' + re.escape(old_url) + r'(["\'][^>]*>)'
-        html_content = re.sub(pattern, r'\1' + new_url + r'\2', html_content)
-
-        return html_content
+        return self.replace_image_urls(html_content, {old_url: new_url})
 
     def batch_upload_images(self, image_paths: List[Path], media_type: str = "image") -> Dict[str, str]:
         """
@@ -118,18 +212,18 @@ class ImageProcessor:
 
         for image_path in image_paths:
             try:
-                logger.info(f"[ImageProcessor] 上传: {image_path.name}")
+                logger.info("[ImageProcessor] 上传: %s", image_path.name)
                 result = self.api_client.upload_media(str(image_path), media_type)
 
                 wechat_url = result.get('url', '')
                 if wechat_url:
                     url_mapping[str(image_path)] = wechat_url
-                    logger.info(f"[ImageProcessor] 成功: {wechat_url}")
+                    logger.info("[ImageProcessor] 成功: %s", wechat_url)
                 else:
-                    logger.warning(f"[ImageProcessor] 未获取到 URL: {image_path.name}")
+                    logger.warning("[ImageProcessor] 未获取到 URL: %s", image_path.name)
 
             except Exception as e:
-                logger.error(f"[ImageProcessor] 上传失败: {image_path.name}, 错误: {e}")
+                logger.error("[ImageProcessor] 上传失败: %s, 错误: %s", image_path.name, e)
 
         return url_mapping
 
@@ -1,9 +1,106 @@
 """日志系统"""
 
+import atexit
+import contextvars
+import json
 import logging
+import queue
 import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional
+
+# 日志中载荷预览的默认最大字符数
+PREVIEW_CHARS = 500
+
+# 文件日志轮转的默认大小与保留份数
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# 附加到每条日志记录上的上下文字段
+CONTEXT_FIELDS = ("job_id", "source_file", "stage")
+
+# 队列模式下的后台监听器（同一时刻只有一个）
+_listener: Optional[QueueListener] = None
+_atexit_registered = False
+
+# 当前任务的日志上下文（不可变字典，每次绑定都创建新字典）
+_log_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+    "log_context", default={}
+)
+_base_record_factory = None
+
+
+def new_job_id() -> str:
+    """生成任务 ID"""
+    return uuid.uuid4().hex[:12]
+
+
+def bind_log_context(**fields: Any) -> contextvars.Token:
+    """在当前上下文中绑定日志字段，返回可用于 reset 的 token
+
+    绑定 job_id 时同时记录任务开始时间，之后的日志带上 elapsed_ms。
+    """
+    context = {**_log_context.get(), **fields}
+    if "job_id" in fields:
+        context["_start"] = time.perf_counter()
+    return _log_context.set(context)
+
+
+def reset_log_context(token: contextvars.Token) -> None:
+    """恢复 bind_log_context 之前的日志字段"""
+    _log_context.reset(token)
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """在代码块内绑定日志字段，退出时恢复::
+
+    with log_context(job_id=new_job_id(), source_file=str(path)):
+        ...
+    """
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """在提交任务时的上下文中执行任务的线程池
+
+    contextvars 不会自动传递到线程池的工作线程，这里为每个任务复制提交方的上下文，
+    使工作线程中的日志同样带有 job_id 等字段。
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+def _context_record_factory(*args, **kwargs) -> logging.LogRecord:
+    """在创建记录的线程中附加上下文字段（队列模式下后台线程看不到调用方的上下文）"""
+    record = _base_record_factory(*args, **kwargs)
+    context = _log_context.get()
+    for name in CONTEXT_FIELDS:
+        setattr(record, name, context.get(name))
+    start = context.get("_start")
+    record.elapsed_ms = (
+        round((time.perf_counter() - start) * 1000, 1) if start is not None else None
+    )
+    return record
+
+
+def _install_record_factory() -> None:
+    global _base_record_factory
+    if _base_record_factory is None:
+        _base_record_factory = logging.getLogRecordFactory()
+        logging.setLogRecordFactory(_context_record_factory)
 
 
 class ColoredFormatter(logging.Formatter):
@@ -32,56 +129,197 @@ class ColoredFormatter(logging.Formatter):
 
     def format(self, record):
         if self.use_color:
+            # 复制记录再着色，避免颜色代码泄漏到共享同一记录的文件处理器
+            record = logging.makeLogRecord(record.__dict__)
             levelcolor = self.COLORS.get(record.levelname, self.COLORS["RESET"])
             record.levelname = f"{levelcolor}{record.levelname}{self.COLORS['RESET']}"
 
         return super().format(record)
 
 
+class JsonFormatter(logging.Formatter):
+    """JSON Lines 格式化器。
+
+    每条记录输出一行 JSON,包含时间、级别、来源、消息,以及通过 contextvars
+    绑定的 job_id、source_file、stage 和任务开始以来的 elapsed_ms,
+    便于按任务过滤并发执行时交错的日志。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for name in CONTEXT_FIELDS + ("elapsed_ms",):
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class Preview:
+    """载荷的截断预览。
+
+    作为 %-style 日志参数传入，只有在日志真正输出时才序列化::
+
+        logger.debug("[WechatAPI] 草稿数据: %s", Preview(payload))
+
+    字典和列表中的长字符串（如整篇文章 HTML）先逐个截断再序列化，
+    避免为一行预览完整编码数 MB 的内容。
+
+    Attributes:
+        value: 原始载荷
+        limit: 预览的最大字符数
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int = PREVIEW_CHARS):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        value = self.value
+        if isinstance(value, bytes):
+            value = value[: self.limit * 4].decode("utf-8", errors="replace")
+        if isinstance(value, str):
+            text = value
+        else:
+            text = json.dumps(_shorten(value, self.limit), ensure_ascii=False, default=str)
+        return _truncate(text, self.limit)
+
+    __repr__ = __str__
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(共 {len(text)} 字符)"
+
+
+def _shorten(value: Any, limit: int) -> Any:
+    """递归截断容器中的长字符串"""
+    if isinstance(value, str):
+        return _truncate(value, limit)
+    if isinstance(value, dict):
+        return {key: _shorten(item, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_shorten(item, limit) for item in value]
+    return value
+
+
 def setup_logging(
     log_level: str = "INFO",
     log_file: Optional[Path] = None,
     console_output: bool = True,
+    use_queue: bool = False,
+    log_format: str = "text",
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUP_COUNT,
 ) -> None:
     """设置应用程序的日志系统。
 
     配置根日志记录器,支持控制台彩色输出和文件日志记录。
     会清除所有已存在的处理器,并设置第三方库的日志级别。
 
+    队列模式下根日志记录器只挂一个 QueueHandler,调用线程只负责把记录放入队列,
+    格式化和磁盘/终端写入由后台 QueueListener 线程完成。
+
+    文件日志按大小轮转,max_bytes 为 0 时不轮转。
+
     Args:
         log_level: 日志级别,如 "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"
         log_file: 日志文件路径,如果为 None 则不记录到文件
         console_output: 是否输出到控制台,默认为 True
+        use_queue: 是否使用队列模式,默认为 False
+        log_format: "text" 为可读文本,"json" 为 JSON Lines（带任务上下文字段）
+        max_bytes: 单个日志文件的最大字节数
+        backup_count: 轮转保留的历史文件数
 
     Returns:
         None
     """
+    global _atexit_registered
+
+    if log_format not in ("text", "json"):
+        raise ValueError(f"未知的日志格式: {log_format}")
+
+    shutdown_logging()
+    _install_record_factory()
+
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level.upper()))
     root_logger.handlers.clear()
+    handlers: List[logging.Handler] = []
 
     # 控制台处理器
     if console_output:
         console_handler = logging.StreamHandler(sys.stdout)
         console_format = "%(asctime)s | %(levelname)-8s | %(name)-12s | %(message)s"
-        console_formatter = ColoredFormatter(console_format, use_color=sys.stdout.isatty())
+        if log_format == "json":
+            console_formatter = JsonFormatter()
+        else:
+            console_formatter = ColoredFormatter(console_format, use_color=sys.stdout.isatty())
         console_handler.setFormatter(console_formatter)
         console_handler.setLevel(getattr(logging, log_level.upper()))
-        root_logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
     # 文件处理器
     if log_file:
         log_file.parent.mkdir(parents=True, exist_ok=True)
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler = RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
         file_format = "%(asctime)s | %(levelname)-8s | %(name)-12s | %(message)s"
-        file_formatter = logging.Formatter(file_format)
+        file_formatter = JsonFormatter() if log_format == "json" else logging.Formatter(file_format)
         file_handler.setFormatter(file_formatter)
         file_handler.setLevel(logging.DEBUG)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if use_queue and handlers:
+        global _listener
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        root_logger.addHandler(QueueHandler(log_queue))
+        if not _atexit_registered:
+            atexit.register(shutdown_logging)
+            _atexit_registered = True
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
 
     # 设置第三方库的日志级别
     logging.getLogger("requests").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("PIL").setLevel(logging.WARNING)
 
-    logging.info(f"[Logger] 日志系统初始化完成 - 级别: {log_level}")
+    logging.info(
+        "[Logger] 日志系统初始化完成 - 级别: %s%s", log_level, "（队列模式）" if _listener else ""
+    )
+
+
+def shutdown_logging() -> None:
+    """停止队列模式的后台线程。
+
+    先写出队列中剩余的记录,再把处理器直接挂回根日志记录器,
+    之后的日志同步写出,不会丢失。非队列模式下不做任何事。
+    """
+    global _listener
+    if _listener is None:
+        return
+
+    listener, _listener = _listener, None
+    listener.stop()
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, QueueHandler):
+            root_logger.removeHandler(handler)
+    for handler in listener.handlers:
+        root_logger.addHandler(handler)
@@ -0,0 +1,196 @@
+"""性能剖析 - cProfile 统计、火焰图折叠栈与按阶段的内存峰值"""
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from utils.timing import Timings
+
+logger = logging.getLogger(__name__)
+
+# pstats 中的函数键: (文件名, 行号, 函数名)
+FuncKey = Tuple[str, int, str]
+
+# 折叠栈的最大深度与最小输出单位（微秒），避免递归和极小分支导致输出膨胀
+MAX_STACK_DEPTH = 64
+MIN_STACK_US = 1
+
+
+def _frame_name(func: FuncKey) -> str:
+    """折叠栈中的帧名: 模块文件名:函数名"""
+    filename, line, name = func
+    if filename == "~":
+        # 内置函数，如 <built-in method builtins.len>
+        return name.strip("<>")
+    return f"{Path(filename).stem}:{name}:{line}"
+
+
+def collapse_stats(stats: pstats.Stats) -> Dict[str, int]:
+    """将 pstats 转换为折叠栈 {"a;b;c": 微秒}
+
+    cProfile 只记录调用者-被调用者之间的耗时，这里从根函数出发，
+    按每条调用边占被调用者总耗时的比例向下分摊，重建近似的调用栈。
+    """
+    raw = stats.stats  # func -> (cc, nc, tt, ct, callers)
+    callees: Dict[FuncKey, Dict[FuncKey, float]] = defaultdict(dict)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            # edge: (cc, nc, tt, ct)
+            callees[caller][func] = edge[3]
+
+    roots = [func for func, entry in raw.items() if not any(caller in raw for caller in entry[4])]
+    stacks: Dict[str, int] = defaultdict(int)
+
+    def visit(func: FuncKey, path: List[str], on_path: set, scale: float):
+        tt, ct = raw[func][2], raw[func][3]
+        path.append(_frame_name(func))
+        on_path.add(func)
+
+        self_us = int(tt * scale * 1_000_000)
+        if self_us >= MIN_STACK_US:
+            stacks[";".join(path)] += self_us
+
+        if len(path) < MAX_STACK_DEPTH:
+            for callee, edge_ct in callees.get(func, {}).items():
+                callee_ct = raw[callee][3]
+                if callee in on_path or callee_ct <= 0:
+                    continue
+                child_scale = scale * edge_ct / callee_ct
+                if callee_ct * child_scale * 1_000_000 >= MIN_STACK_US:
+                    visit(callee, path, on_path, child_scale)
+
+        on_path.discard(func)
+        path.pop()
+
+    for root in roots:
+        visit(root, [], set(), 1.0)
+    return dict(stacks)
+
+
+@dataclass
+class StageMemory:
+    """按阶段汇总的内存峰值"""
+
+    name: str
+    count: int = 0
+    peak_kb: float = 0.0
+
+
+@dataclass
+class ProfileReport:
+    """一次剖析的输出文件"""
+
+    pstats_path: Path
+    collapsed_path: Path
+    top: str
+    memory: List[StageMemory] = field(default_factory=list)
+    memory_peak_kb: Optional[float] = None
+
+
+class Profiler:
+    """包裹一次命令执行的剖析器
+
+    stop() 后写出 `<base>.pstats`（可用 snakeviz / `python -m pstats` 查看）与
+    `<base>.collapsed`（可直接交给 flamegraph.pl、speedscope 或 inferno 生成火焰图）。
+
+    下载、图片优化、上传和 PDF 图片解码都在工作线程中执行。cProfile 只剖析调用 enable()
+    的线程，因此剖析期间新建的线程各自挂上一个 Profile（threading.setprofile），
+    写出时与主线程的结果合并。Python 3.12 起 cProfile 基于 sys.monitoring，
+    对所有线程生效且同时只能启用一个，此时不再为线程单独挂 Profile。
+
+    开启 memory 时使用 tracemalloc 跟踪内存：每个计时 span 记录自身执行期间的
+    内存峰值（相对于开始时的占用），报告按阶段取最大值。tracemalloc 会显著拖慢执行，
+    此时的耗时数据仅供参考。
+    """
+
+    def __init__(self, top: int = 30, memory: bool = False):
+        self.top = top
+        self.memory = memory
+        self._profile = cProfile.Profile()
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._running = False
+
+    def _profile_thread(self, frame, event, arg):
+        """新线程中的第一次 profile 回调：换成该线程自己的 cProfile"""
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            if not self._running:
+                return
+            self._thread_profiles.append(profile)
+        profile.enable()
+
+    def start(self):
+        if self.memory:
+            tracemalloc.start()
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._profile_thread)
+        self._profile.enable()
+        self._running = True
+        logger.debug(f"[Profile] 开始剖析 (memory={self.memory})")
+
+    def stop(self):
+        if not self._running:
+            return
+        self._profile.disable()
+        threading.setprofile(None)
+        with self._lock:
+            self._running = False
+
+    def stats(self) -> pstats.Stats:
+        """合并主线程与工作线程的统计"""
+        stats = pstats.Stats(self._profile)
+        with self._lock:
+            profiles = list(self._thread_profiles)
+        for profile in profiles:
+            stats.add(profile)
+        return stats
+
+    def write(self, base: Path, timings: Optional[Timings] = None) -> ProfileReport:
+        """停止剖析并写出结果，返回报告"""
+        self.stop()
+        base.parent.mkdir(parents=True, exist_ok=True)
+
+        stats = self.stats()
+        pstats_path = base.with_name(f"{base.name}.pstats")
+        stats.dump_stats(str(pstats_path))
+
+        collapsed_path = base.with_name(f"{base.name}.collapsed")
+        lines = [f"{stack} {us}" for stack, us in sorted(collapse_stats(stats).items())]
+        collapsed_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+        report = ProfileReport(pstats_path, collapsed_path, buffer.getvalue())
+        if self.memory and tracemalloc.is_tracing():
+            report.memory_peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+            if timings is not None:
+                report.memory = stage_memory(timings)
+
+        logger.info(f"[Profile] 剖析结果已写入: {pstats_path}, {collapsed_path}")
+        return report
+
+
+def stage_memory(timings: Timings) -> List[StageMemory]:
+    """从 span 属性中汇总各阶段的内存峰值"""
+    stages: Dict[str, StageMemory] = {}
+    for span in timings.spans:
+        peak = span.attrs.get("mem_peak_kb")
+        if peak is None:
+            continue
+        stage = stages.setdefault(span.name, StageMemory(span.name))
+        stage.count += 1
+        stage.peak_kb = max(stage.peak_kb, peak)
+    return list(stages.values())
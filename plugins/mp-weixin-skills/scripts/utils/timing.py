@@ -0,0 +1,229 @@
+"""阶段计时 - 轻量级 span 记录，可用作上下文管理器或装饰器"""
+
+import functools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+import unicodedata
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+from utils.logger import bind_log_context, reset_log_context
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """一次计时记录"""
+
+    name: str
+    start: float  # 相对于记录器创建时刻的秒数
+    elapsed_ms: float
+    thread: str
+    attrs: Dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class StageStats:
+    """按阶段名汇总的耗时"""
+
+    name: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    errors: int = 0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.avg_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "errors": self.errors,
+        }
+
+
+class Timings:
+    """线程安全的 span 记录器
+
+    记录开销只有两次 perf_counter 和一次列表追加，默认始终开启；
+    是否输出由调用方（如 CLI 的 --timings）决定。
+
+    max_spans 限制保留的 span 数量（只保留最近的），供常驻进程使用。
+    """
+
+    def __init__(self, max_spans: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+
+    def limit(self, max_spans: Optional[int]):
+        """设置保留的 span 上限（超出时丢弃最早的记录）"""
+        with self._lock:
+            self._spans = deque(self._spans, maxlen=max_spans)
+
+    def record(
+        self, name: str, start: float, elapsed_ms: float, error: Optional[str] = None, **attrs
+    ):
+        span = Span(
+            name=name,
+            start=start - self._origin,
+            elapsed_ms=elapsed_ms,
+            thread=threading.current_thread().name,
+            attrs=attrs,
+            error=error,
+        )
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    @property
+    def wall_ms(self) -> float:
+        """从记录器创建到现在的耗时"""
+        return (time.perf_counter() - self._origin) * 1000
+
+    def reset(self):
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._spans = deque(maxlen=self._spans.maxlen)
+
+    def stages(self) -> List[StageStats]:
+        """按阶段名汇总，保持首次出现的顺序"""
+        stats: Dict[str, StageStats] = {}
+        for span in self.spans:
+            stage = stats.setdefault(span.name, StageStats(span.name))
+            stage.count += 1
+            stage.total_ms += span.elapsed_ms
+            stage.max_ms = max(stage.max_ms, span.elapsed_ms)
+            if span.error:
+                stage.errors += 1
+        return list(stats.values())
+
+    def to_dict(self) -> Dict:
+        return {
+            "wall_ms": round(self.wall_ms, 2),
+            "stages": [stage.to_dict() for stage in self.stages()],
+            "spans": [
+                {
+                    **asdict(span),
+                    "start": round(span.start * 1000, 2),
+                    "elapsed_ms": round(span.elapsed_ms, 2),
+                }
+                for span in self.spans
+            ],
+        }
+
+    def write_json(self, path: Path, **extra):
+        """写出 JSON 报告，extra 中的字段并入顶层（如命令名）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({**extra, **self.to_dict()}, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+
+    def format_table(self) -> str:
+        """格式化为阶段耗时表"""
+        stages = self.stages()
+        lines = [
+            " ".join(
+                [
+                    _pad("阶段", 24),
+                    _pad("次数", 6, True),
+                    _pad("总耗时(ms)", 12, True),
+                    _pad("平均(ms)", 10, True),
+                    _pad("最大(ms)", 10, True),
+                ]
+            ),
+            "-" * 68,
+        ]
+        for stage in stages:
+            lines.append(
+                f"{stage.name:<24} {stage.count:>6} {stage.total_ms:>12.1f} {stage.avg_ms:>10.1f} {stage.max_ms:>10.1f}"
+            )
+        lines.append("-" * 68)
+        lines.append(f"{_pad('总耗时', 24)} {'':>6} {self.wall_ms:>12.1f}")
+        return "\n".join(lines)
+
+
+def _pad(text: str, width: int, right: bool = False) -> str:
+    """按显示宽度填充（中文字符占两列）"""
+    display = sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+    padding = " " * max(0, width - display)
+    return padding + text if right else text + padding
+
+
+# 进程内默认记录器
+_timings = Timings()
+
+
+def get_timings() -> Timings:
+    """返回进程内默认记录器"""
+    return _timings
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Dict]:
+    """记录一段代码的耗时
+
+    产出的字典可在代码块内补充属性（如字节数），随 span 一起记录::
+
+        with span("api.upload_media", media_type="image") as attrs:
+            ...
+            attrs["bytes"] = size
+
+    tracemalloc 开启时（如 --profile-memory）额外记录 mem_peak_kb：span 期间的内存峰值
+    相对于开始时占用的增量。峰值是进程级的，嵌套或并发的 span 会相互重置，数值为下限。
+
+    代码块内的日志记录带有 stage=name。
+    """
+    memory_base = None
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        memory_base = tracemalloc.get_traced_memory()[0]
+
+    context_token = bind_log_context(stage=name)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if memory_base is not None and tracemalloc.is_tracing():
+            attrs["mem_peak_kb"] = round(
+                max(0, tracemalloc.get_traced_memory()[1] - memory_base) / 1024, 1
+            )
+        _timings.record(name, start, elapsed_ms, error=error, **attrs)
+        logger.debug("[Timing] %s: %.1fms", name, elapsed_ms)
+        reset_log_context(context_token)
+
+
+def timed(name: str) -> Callable:
+    """将函数调用记录为 span 的装饰器"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -2,16 +2,51 @@
 
 import logging
 import json
-from typing import Dict
+import os
+import threading
+import time
+from functools import wraps
+from typing import BinaryIO, Dict, Optional
 from dataclasses import dataclass
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-from exceptions import WechatApiError
+from exceptions import MediaTooLargeError, WechatApiError
+from utils.image_encoder import WECHAT_MEDIA_MAX_BYTES
+from utils.logger import Preview
+from utils.metrics import (
+    API_LATENCY,
+    API_REQUESTS,
+    API_RETRIES,
+    TOKEN_REFRESHES,
+    UPLOAD_BYTES,
+    UPLOAD_SIZE,
+)
+from utils.timing import span, timed
 
 logger = logging.getLogger(__name__)
 
+# access_token 失效的错误码（其他进程刷新了 token、token 过期等），刷新后重试一次即可
+TOKEN_INVALID_ERRCODES = (40001, 40014, 42001)
+
+
+def _refresh_on_invalid_token(func):
+    """接口返回 token 失效时作废本次使用的 token，用新 token 重试一次"""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        except WechatApiError as e:
+            if e.errcode not in TOKEN_INVALID_ERRCODES:
+                raise
+            logger.warning("[WechatAPI] access_token 已失效 (errcode=%s)，刷新后重试", e.errcode)
+            self.invalidate_token(getattr(self._local, "token", ""))
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
 
 @dataclass
 class WechatConfig:
@@ -35,9 +70,13 @@ class WechatApiClient:
     }
 
     def __init__(self, config: WechatConfig):
-        logger.info(f"[WechatAPI] 初始化客户端 - AppID: {config.app_id[:8]}***")
+        logger.info("[WechatAPI] 初始化客户端 - AppID: %s***", config.app_id[:8])
         self.config = config
         self._access_token: str = ""
+        self._token_expires_at: float = 0.0
+        self._token_lock = threading.Lock()
+        # 记录每个线程最近一次使用的 token，失效时只作废这一个
+        self._local = threading.local()
         self._session = self._create_session()
 
     def _create_session(self) -> requests.Session:
@@ -45,20 +84,76 @@ class WechatApiClient:
         logger.debug("[WechatAPI] 创建 HTTP 会话")
         session = requests.Session()
 
-        retry_strategy = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+        # 重试耗尽后返回最后一次响应（raise_on_status=False），由 _send 按状态码记录指标
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False,
+        )
         adapter = HTTPAdapter(max_retries=retry_strategy)
         session.mount("https://", adapter)
+        session.mount("http://", adapter)
 
         return session
 
+    def close(self):
+        """关闭 HTTP 会话及其连接池"""
+        self._session.close()
+
+    def _send(self, endpoint: str, method: str, **kwargs) -> requests.Response:
+        """发送请求并记录耗时、重试次数、网络错误和 HTTP 错误指标"""
+        url = f"{self.config.base_url}{self.ENDPOINTS[endpoint]}"
+        start = time.perf_counter()
+        try:
+            response = self._session.request(method, url, timeout=self.config.timeout, **kwargs)
+        except requests.RequestException:
+            API_REQUESTS.labels(endpoint=endpoint, errcode="network").inc()
+            raise
+        finally:
+            API_LATENCY.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+
+        # urllib3 的 Retry 对象记录了本次请求经历的重试
+        retries = getattr(getattr(response.raw, "retries", None), "history", None)
+        if retries:
+            API_RETRIES.labels(endpoint=endpoint).inc(len(retries))
+        # HTTP 错误由调用方 raise_for_status() 抛出，不会再经过 _record，在此按状态码记录
+        if response.status_code >= 400:
+            API_REQUESTS.labels(endpoint=endpoint, errcode=f"http_{response.status_code}").inc()
+        return response
+
+    @staticmethod
+    def _record(endpoint: str, data: Dict) -> Dict:
+        """按 errcode 记录调用结果（成功响应无 errcode 时记为 0）"""
+        API_REQUESTS.labels(endpoint=endpoint, errcode=str(data.get("errcode", 0))).inc()
+        return data
+
+    # access_token 提前刷新的秒数，避免请求途中过期
+    TOKEN_REFRESH_MARGIN = 300
+
     def get_access_token(self) -> str:
-        """获取访问令牌"""
-        if self._access_token:
+        """获取访问令牌（按 expires_in 缓存；多线程共享客户端时只有一个线程去刷新）"""
+        token = self._access_token
+        if token and time.monotonic() < self._token_expires_at:
             logger.debug("[WechatAPI] 使用缓存的 access_token")
-            return self._access_token
-
+        else:
+            with self._token_lock:
+                token = self._access_token
+                if not (token and time.monotonic() < self._token_expires_at):
+                    token = self._fetch_access_token()
+        self._local.token = token
+        return token
+
+    def invalidate_token(self, token: str):
+        """作废失效的 token；其他线程已经换成新 token 时保持不变，避免重复刷新"""
+        with self._token_lock:
+            if token and token == self._access_token:
+                self._access_token = ""
+                self._token_expires_at = 0.0
+
+    def _fetch_access_token(self) -> str:
         logger.info("[WechatAPI] 请求新的 access_token")
-        url = f"{self.config.base_url}{self.ENDPOINTS['token']}"
+        TOKEN_REFRESHES.inc()
         params = {
             "grant_type": "client_credential",
             "appid": self.config.app_id,
@@ -66,101 +161,169 @@ class WechatApiClient:
         }
 
         try:
-            response = self._session.get(url, params=params, timeout=self.config.timeout)
+            with span("api.token"):
+                response = self._send("token", "GET", params=params)
             response.raise_for_status()
 
-            data = response.json()
+            data = self._record("token", response.json())
 
             if "access_token" not in data:
                 error_msg = f"获取 access_token 失败: {data.get('errmsg', '未知错误')}"
-                logger.error(f"[WechatAPI] {error_msg}")
+                logger.error("[WechatAPI] %s", error_msg)
                 raise WechatApiError(error_msg, data.get("errcode"))
 
             self._access_token = data["access_token"]
-            logger.info(f"[WechatAPI] access_token 获取成功")
+            expires_in = int(data.get("expires_in", 7200))
+            self._token_expires_at = time.monotonic() + max(
+                0, expires_in - self.TOKEN_REFRESH_MARGIN
+            )
+            logger.info("[WechatAPI] access_token 获取成功")
             return self._access_token
 
         except requests.RequestException as e:
-            logger.error(f"[WechatAPI] 网络请求失败: {e}")
+            logger.error("[WechatAPI] 网络请求失败: %s", e)
             raise WechatApiError(f"网络请求失败: {e}")
 
-    def upload_media(self, file_path: str, media_type: str = "thumb") -> Dict:
-        """上传永久素材"""
-        logger.info(f"[WechatAPI] 开始上传素材 - 类型: {media_type}")
+    @timed("api.upload_media")
+    @_refresh_on_invalid_token
+    def upload_media(
+        self, file_path: str, media_type: str = "thumb", fileobj: Optional[BinaryIO] = None
+    ) -> Dict:
+        """上传永久素材
+
+        Args:
+            file_path: 素材文件路径；提供 fileobj 时仅用作上传文件名
+            media_type: 素材类型
+            fileobj: 可选的二进制流（如文档包中的内嵌图片），提供时不读取 file_path
+        """
+        logger.info("[WechatAPI] 开始上传素材 - 类型: %s", media_type)
+
+        # 本地预检文件大小，避免超限文件白白走一次网络请求
+        if fileobj is None:
+            self._check_media_size(self._file_size(file_path), media_type)
+        else:
+            self._check_media_size(self._stream_size(fileobj), media_type)
 
-        url = f"{self.config.base_url}{self.ENDPOINTS['upload_media']}"
         params = {
             "access_token": self.get_access_token(),
             "type": media_type,
         }
 
         try:
-            with open(file_path, "rb") as f:
-                files = {"media": f}
-                response = self._session.post(url, params=params, files=files, timeout=self.config.timeout)
+            if fileobj is not None:
+                # token 失效重试时需要从头读取
+                fileobj.seek(0)
+                files = {"media": (os.path.basename(file_path), fileobj)}
+                response = self._send("upload_media", "POST", params=params, files=files)
+            else:
+                with open(file_path, "rb") as f:
+                    files = {"media": f}
+                    response = self._send("upload_media", "POST", params=params, files=files)
+
+            body_size = len(response.request.body or b"")
+            UPLOAD_BYTES.labels(media_type=media_type).inc(body_size)
+            UPLOAD_SIZE.labels(media_type=media_type).observe(body_size)
 
             response.raise_for_status()
-            data = response.json()
+            data = self._record("upload_media", response.json())
 
             if "media_id" not in data:
                 error_msg = f"上传素材失败: {data.get('errmsg', '未知错误')}"
-                logger.error(f"[WechatAPI] {error_msg}")
+                logger.error("[WechatAPI] %s", error_msg)
                 raise WechatApiError(error_msg, data.get("errcode"))
 
-            logger.info(f"[WechatAPI] 素材上传成功")
+            logger.info("[WechatAPI] 素材上传成功")
             return data
 
         except (requests.RequestException, IOError) as e:
-            logger.error(f"[WechatAPI] 上传失败: {e}")
+            logger.error("[WechatAPI] 上传失败: %s", e)
+            raise WechatApiError(f"上传失败: {e}")
+
+    @staticmethod
+    def _file_size(file_path: str) -> int:
+        try:
+            return os.path.getsize(file_path)
+        except OSError as e:
+            logger.error("[WechatAPI] 上传失败: %s", e)
             raise WechatApiError(f"上传失败: {e}")
 
+    @staticmethod
+    def _stream_size(fileobj: BinaryIO) -> int:
+        """获取流的总字节数：优先使用流自带的 size（如文档包内嵌图片），否则 seek 到末尾"""
+        size = getattr(fileobj, "size", None)
+        if isinstance(size, int):
+            return size
+        try:
+            fileobj.seek(0, os.SEEK_END)
+            size = fileobj.tell()
+            fileobj.seek(0)
+        except (OSError, ValueError) as e:
+            logger.error("[WechatAPI] 上传失败: %s", e)
+            raise WechatApiError(f"上传失败: {e}")
+        return size
+
+    def _check_media_size(self, file_size: int, media_type: str) -> None:
+        """检查素材是否超出微信大小限制"""
+        max_bytes = WECHAT_MEDIA_MAX_BYTES.get(media_type)
+        if max_bytes is None:
+            return
+
+        if file_size > max_bytes:
+            error_msg = f"素材超出大小限制: {file_size} 字节 > {max_bytes} 字节 ({media_type})"
+            logger.error("[WechatAPI] %s", error_msg)
+            raise MediaTooLargeError(error_msg)
+
+    @timed("api.upload_draft")
+    @_refresh_on_invalid_token
     def upload_draft(self, articles: list) -> Dict:
         """上传草稿"""
-        logger.info(f"[WechatAPI] 开始上传草稿")
+        logger.info("[WechatAPI] 开始上传草稿")
 
-        url = f"{self.config.base_url}{self.ENDPOINTS['upload_draft']}"
         params = {"access_token": self.get_access_token()}
         payload = {"articles": articles}
 
-        logger.debug(f"[WechatAPI] 草稿数据: {payload}")
+        logger.debug("[WechatAPI] 草稿数据: %s", Preview(payload))
 
         # 手动序列化 JSON，确保中文不被转义
         data = json.dumps(payload, ensure_ascii=False)
 
         try:
             headers = {"Content-Type": "application/json; charset=utf-8"}
-            response = self._session.post(url, params=params, data=data.encode("utf-8"), headers=headers, timeout=self.config.timeout)
+            response = self._send(
+                "upload_draft", "POST", params=params, data=data.encode("utf-8"), headers=headers
+            )
 
-            logger.debug(f"[WechatAPI] 响应状态码: {response.status_code}")
+            logger.debug("[WechatAPI] 响应状态码: %s", response.status_code)
             response.raise_for_status()
 
-            data = response.json()
-            logger.debug(f"[WechatAPI] 响应数据: {data}")
+            data = self._record("upload_draft", response.json())
+            logger.debug("[WechatAPI] 响应数据: %s", Preview(data))
 
             # 检查是否有错误码（有 errcode 且不等于 0 表示有错误）
             errcode = data.get("errcode")
             if errcode is not None and errcode != 0:
                 error_msg = f"上传草稿失败: {data.get('errmsg', '未知错误')}"
-                logger.error(f"[WechatAPI] {error_msg}")
+                logger.error("[WechatAPI] %s", error_msg)
                 raise WechatApiError(error_msg, errcode)
 
             # 成功响应包含 media_id
             media_id = data.get("media_id")
             if media_id:
-                logger.info(f"[WechatAPI] 草稿上传成功 - media_id: {media_id}")
+                logger.info("[WechatAPI] 草稿上传成功 - media_id: %s", media_id)
             else:
-                logger.info(f"[WechatAPI] 草稿上传成功")
+                logger.info("[WechatAPI] 草稿上传成功")
             return data
 
         except requests.RequestException as e:
-            logger.error(f"[WechatAPI] 草稿上传失败: {e}")
+            logger.error("[WechatAPI] 草稿上传失败: %s", e)
             raise WechatApiError(f"草稿上传失败: {e}")
 
+    @timed("api.get_draft")
+    @_refresh_on_invalid_token
     def get_draft(self, media_id: str) -> Dict:
         """获取草稿详情"""
-        logger.info(f"[WechatAPI] 开始获取草稿详情 - media_id: {media_id}")
+        logger.info("[WechatAPI] 开始获取草稿详情 - media_id: %s", media_id)
 
-        url = f"{self.config.base_url}{self.ENDPOINTS['get_draft']}"
         params = {"access_token": self.get_access_token()}
         payload = {"media_id": media_id}
 
@@ -169,38 +332,41 @@ class WechatApiClient:
 
         try:
             headers = {"Content-Type": "application/json; charset=utf-8"}
-            response = self._session.post(url, params=params, data=data.encode("utf-8"), headers=headers, timeout=self.config.timeout)
+            response = self._send(
+                "get_draft", "POST", params=params, data=data.encode("utf-8"), headers=headers
+            )
             response.raise_for_status()
 
-            result = response.json()
-            logger.debug(f"[WechatAPI] 响应数据: {result}")
+            result = self._record("get_draft", response.json())
+            logger.debug("[WechatAPI] 响应数据: %s", Preview(result))
 
             # 检查是否有错误码
             errcode = result.get("errcode")
             if errcode is not None and errcode != 0:
                 error_msg = f"获取草稿失败: {result.get('errmsg', '未知错误')}"
-                logger.error(f"[WechatAPI] {error_msg}")
+                logger.error("[WechatAPI] %s", error_msg)
                 raise WechatApiError(error_msg, errcode)
 
             # 从返回的数据中提取文章信息
             # 返回格式: {"news_item": [{...文章数据...}]}
             articles = result.get("news_item", [])
             if articles:
-                logger.info(f"[WechatAPI] 草稿获取成功 - 文章数: {len(articles)}")
+                logger.info("[WechatAPI] 草稿获取成功 - 文章数: %s", len(articles))
                 return articles[0]  # 返回第一篇文章的数据
             else:
-                logger.warning(f"[WechatAPI] 草稿中没有文章")
+                logger.warning("[WechatAPI] 草稿中没有文章")
                 return {}
 
         except requests.RequestException as e:
-            logger.error(f"[WechatAPI] 获取草稿失败: {e}")
+            logger.error("[WechatAPI] 获取草稿失败: %s", e)
             raise WechatApiError(f"获取草稿失败: {e}")
 
+    @timed("api.update_draft")
+    @_refresh_on_invalid_token
     def update_draft(self, media_id: str, index: int, article: Dict) -> Dict:
         """更新草稿"""
-        logger.info(f"[WechatAPI] 开始更新草稿 - media_id: {media_id}")
+        logger.info("[WechatAPI] 开始更新草稿 - media_id: %s", media_id)
 
-        url = f"{self.config.base_url}{self.ENDPOINTS['update_draft']}"
         params = {"access_token": self.get_access_token()}
 
         # 注意：articles 是对象，不是数组；index 需要转换为字符串
@@ -208,26 +374,28 @@ class WechatApiClient:
 
         # 手动序列化 JSON，确保中文不被转义
         data = json.dumps(payload, ensure_ascii=False)
-        logger.info(f"[WechatAPI] 请求体: {data}")
+        logger.debug("[WechatAPI] 请求体: %s", Preview(payload))
 
         try:
             headers = {"Content-Type": "application/json; charset=utf-8"}
-            response = self._session.post(url, params=params, data=data.encode("utf-8"), headers=headers, timeout=self.config.timeout)
+            response = self._send(
+                "update_draft", "POST", params=params, data=data.encode("utf-8"), headers=headers
+            )
             response.raise_for_status()
 
-            data = response.json()
-            logger.debug(f"[WechatAPI] 响应数据: {data}")
+            data = self._record("update_draft", response.json())
+            logger.debug("[WechatAPI] 响应数据: %s", Preview(data))
 
             # 检查是否有错误码
             errcode = data.get("errcode")
             if errcode is not None and errcode != 0:
                 error_msg = f"更新草稿失败: {data.get('errmsg', '未知错误')}"
-                logger.error(f"[WechatAPI] {error_msg}")
+                logger.error("[WechatAPI] %s", error_msg)
                 raise WechatApiError(error_msg, errcode)
 
-            logger.info(f"[WechatAPI] 草稿更新成功")
+            logger.info("[WechatAPI] 草稿更新成功")
             return data
 
         except requests.RequestException as e:
-            logger.error(f"[WechatAPI] 更新失败: {e}")
+            logger.error("[WechatAPI] 更新失败: %s", e)
             raise WechatApiError(f"更新失败: {e}")
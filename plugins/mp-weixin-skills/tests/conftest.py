@@ -0,0 +1,18 @@
+"""测试公共夹具"""
+
+import pytest
+
+from parsers import ParserFactory
+
+
+@pytest.fixture(autouse=True)
+def isolate_app_dirs(tmp_path, monkeypatch):
+    """输出、临时与缓存目录指向本测试的临时目录，结束时恢复解析器注册与解析缓存
+
+    命令行会按配置全局启用解析缓存，不恢复时后续测试会把缓存写进仓库中的 temp/。
+    """
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path / "output"))
+    monkeypatch.setenv("TEMP_DIR", str(tmp_path / "temp"))
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "temp" / "cache"))
+    with ParserFactory.isolated():
+        yield
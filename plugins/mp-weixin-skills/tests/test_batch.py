@@ -0,0 +1,111 @@
+"""测试批量转换"""
+
+import io
+import logging
+
+from docx import Document
+from PIL import Image
+
+from batch import BatchConverter, BatchOptions
+from parsers import ParserFactory
+
+
+def _make_articles(root, count):
+    for i in range(count):
+        folder = root / ("sub" if i % 2 else "")
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"post{i}.md").write_text(f"# 文章 {i}\n\n正文 **{i}**\n", encoding="utf-8")
+    (root / "notes.txt").write_text("忽略", encoding="utf-8")
+
+
+def test_batch_convert_in_process(tmp_path):
+    """测试单进程转换并生成封面"""
+    source = tmp_path / "articles"
+    _make_articles(source, 2)
+    options = BatchOptions(source_root=source, output_dir=tmp_path / "out")
+    converter = BatchConverter(options, workers=1)
+
+    files = converter.discover()
+    summary = converter.run(files)
+
+    assert len(files) == 2
+    assert summary.succeeded == 2
+    assert (tmp_path / "out" / "post0.html").exists()
+    assert (tmp_path / "out" / "sub" / "post1.html").exists()
+    assert all(r.cover_path.exists() for r in summary.results)
+    assert summary.files_per_second > 0
+
+
+def test_in_process_run_restores_parser_factory(tmp_path):
+    """测试单进程转换结束后恢复全局的解析缓存与解析器注册"""
+    source = tmp_path / "articles"
+    _make_articles(source, 1)
+    options = BatchOptions(
+        source_root=source,
+        output_dir=tmp_path / "out",
+        covers=False,
+        parse_cache_dir=tmp_path / "cache",
+        pdf_image_dir=tmp_path / "pdf_images",
+    )
+    ParserFactory.enable_cache(None)
+    pdf_parser = ParserFactory._parsers.get(".pdf")
+
+    converter = BatchConverter(options, workers=1)
+    summary = converter.run(converter.discover())
+
+    assert summary.succeeded == 1
+    assert ParserFactory._cache is None
+    assert ParserFactory._parsers.get(".pdf") is pdf_parser
+
+
+def test_batch_convert_process_pool(tmp_path):
+    """测试进程池转换并逐个报告进度"""
+    source = tmp_path / "articles"
+    _make_articles(source, 6)
+    options = BatchOptions(source_root=source, output_dir=tmp_path / "out", covers=False)
+    converter = BatchConverter(options, workers=2)
+
+    seen = []
+    summary = converter.run(converter.discover(), progress=seen.append)
+
+    assert summary.succeeded == 6
+    assert len(seen) == 6
+    assert "文章 3" in (tmp_path / "out" / "sub" / "post3.html").read_text(encoding="utf-8")
+
+
+def test_batch_in_process_keeps_cli_logging(tmp_path):
+    """单进程转换不应重置调用方（CLI）的日志处理器"""
+    source = tmp_path / "articles"
+    _make_articles(source, 1)
+    handler = logging.NullHandler()
+    root = logging.getLogger()
+    root.addHandler(handler)
+    try:
+        options = BatchOptions(source_root=source, output_dir=tmp_path / "out", covers=False)
+        BatchConverter(options, workers=1).run([source / "post0.md"])
+        assert handler in root.handlers
+    finally:
+        root.removeHandler(handler)
+
+
+def test_batch_exports_docx_images(tmp_path):
+    """docx 内嵌图片复制到 HTML 旁的目录，src 改写为相对路径"""
+    source = tmp_path / "articles"
+    source.mkdir()
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), "red").save(buffer, "PNG")
+    doc = Document()
+    doc.add_heading("带图片的文档", level=1)
+    doc.add_picture(io.BytesIO(buffer.getvalue()))
+    doc.save(source / "report.docx")
+
+    options = BatchOptions(source_root=source, output_dir=tmp_path / "out", covers=False)
+    summary = BatchConverter(options, workers=1).run([source / "report.docx"])
+
+    assert summary.succeeded == 1
+    html = (tmp_path / "out" / "report.html").read_text(encoding="utf-8")
+    assert "word/media" not in html
+    exported = list((tmp_path / "out" / "report_files").iterdir())
+    assert len(exported) == 1
+    assert f'src="report_files/{exported[0].name}"' in html
+    assert Image.open(exported[0]).size == (40, 30)
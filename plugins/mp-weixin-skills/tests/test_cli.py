@@ -0,0 +1,65 @@
+"""测试命令行接口"""
+
+from click.testing import CliRunner
+
+import cli
+
+
+class FakeApiClient:
+    """记录实例数量与调用的假 API 客户端"""
+
+    instances = []
+
+    def __init__(self, config):
+        self.calls = []
+        self.closed = False
+        FakeApiClient.instances.append(self)
+
+    def upload_media(self, file_path, media_type="thumb", fileobj=None):
+        self.calls.append("upload_media")
+        return {"media_id": "thumb-1"}
+
+    def get_draft(self, media_id):
+        self.calls.append("get_draft")
+        return {"thumb_media_id": "thumb-0"}
+
+    def update_draft(self, media_id, index, article):
+        self.calls.append("update_draft")
+        return {"errcode": 0}
+
+    def close(self):
+        self.closed = True
+
+
+def test_update_reuses_one_api_client(tmp_path, monkeypatch):
+    """测试 update 命令全程只创建一个 API 客户端并在结束时关闭"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("WECHAT_APP_ID", "wx-test")
+    monkeypatch.setenv("WECHAT_APP_SECRET", "secret")
+    monkeypatch.setenv("PARSE_CACHE", "false")
+    monkeypatch.setattr(cli, "WechatApiClient", FakeApiClient)
+    monkeypatch.setattr(cli, "setup_logging", lambda *args, **kwargs: None)
+    FakeApiClient.instances = []
+    (tmp_path / "article.md").write_text("# 标题\n\n正文\n", encoding="utf-8")
+
+    result = CliRunner().invoke(
+        cli.main,
+        ["--env", str(tmp_path / "missing.env"), "update", "media-1", "--source", "article.md"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert len(FakeApiClient.instances) == 1
+    client = FakeApiClient.instances[0]
+    assert client.calls == ["get_draft", "update_draft"]
+    assert client.closed is True
+
+
+def test_cli_context_is_lazy(tmp_path, monkeypatch):
+    """测试未使用 API 的命令不创建客户端"""
+    monkeypatch.setattr(cli, "WechatApiClient", FakeApiClient)
+    FakeApiClient.instances = []
+
+    context = cli.CliContext(str(tmp_path / "missing.env"))
+    context.close()
+
+    assert FakeApiClient.instances == []
@@ -0,0 +1,90 @@
+"""测试远程图片下载缓存"""
+
+import time
+
+from utils.download_cache import DownloadCache
+
+
+def _store(cache, url, size, release=True):
+    part = cache.temp_path(url)
+    part.write_bytes(b"x" * size)
+    path = cache.store(url, part, etag=f'"{url}"')
+    if release:
+        cache.release(url)
+    return path
+
+
+def test_store_and_lookup(tmp_path):
+    """测试写入和查找缓存"""
+    cache = DownloadCache(tmp_path)
+    path = _store(cache, "https://example.com/a.png", 10)
+
+    entry = cache.lookup("https://example.com/a.png")
+
+    assert path.suffix == ".png"
+    assert cache.path_of(entry) == path
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"https://example.com/a.png"'}
+    assert cache.conditional_headers(None) == {}
+
+
+def test_index_persists(tmp_path):
+    """测试缓存索引持久化"""
+    cache = DownloadCache(tmp_path)
+    _store(cache, "https://example.com/a.jpg", 10)
+    cache.save()
+
+    reloaded = DownloadCache(tmp_path)
+
+    assert reloaded.lookup("https://example.com/a.jpg") is not None
+
+
+def test_lru_eviction(tmp_path):
+    """测试超出容量时淘汰最久未使用的条目"""
+    cache = DownloadCache(tmp_path, max_bytes=25)
+    _store(cache, "https://example.com/old.jpg", 10)
+    time.sleep(0.01)
+    _store(cache, "https://example.com/recent.jpg", 10)
+    time.sleep(0.01)
+    cache.hit("https://example.com/old.jpg")
+    cache.release("https://example.com/old.jpg")
+    time.sleep(0.01)
+    _store(cache, "https://example.com/new.jpg", 10)
+
+    assert cache.lookup("https://example.com/recent.jpg") is None
+    assert cache.lookup("https://example.com/old.jpg") is not None
+    assert cache.lookup("https://example.com/new.jpg") is not None
+    assert cache.total_bytes <= 25
+
+
+def test_missing_file_invalidates_entry(tmp_path):
+    """测试缓存文件被删除后条目失效"""
+    cache = DownloadCache(tmp_path)
+    path = _store(cache, "https://example.com/a.jpg", 10)
+    path.unlink()
+
+    assert cache.lookup("https://example.com/a.jpg") is None
+
+
+def test_pinned_files_are_not_evicted(tmp_path):
+    """测试仍在使用的文件不会被其他任务的写入淘汰"""
+    cache = DownloadCache(tmp_path, max_bytes=15)
+    in_use = _store(cache, "https://example.com/in-use.jpg", 10, release=False)
+    time.sleep(0.01)
+    _store(cache, "https://example.com/other.jpg", 10, release=False)
+
+    # 两个文件都在使用中，暂时允许超出容量
+    assert in_use.exists()
+    assert cache.total_bytes == 20
+    cache.release("https://example.com/in-use.jpg")
+    assert not in_use.exists()
+    assert cache.total_bytes <= 15
+
+
+def test_hit_after_eviction_returns_none(tmp_path):
+    """测试重新验证期间条目被淘汰时 hit 返回 None 而不是抛出 KeyError"""
+    cache = DownloadCache(tmp_path, max_bytes=15)
+    _store(cache, "https://example.com/a.jpg", 10)
+    assert cache.lookup("https://example.com/a.jpg") is not None
+    _store(cache, "https://example.com/b.jpg", 10)
+
+    assert cache.hit("https://example.com/a.jpg") is None
@@ -0,0 +1,79 @@
+"""测试图片编码器"""
+
+import random
+
+import pytest
+from PIL import Image
+
+from exceptions import ConversionError
+from utils.image_encoder import ImageEncoder, WECHAT_MEDIA_MAX_BYTES
+
+
+def _noisy_image(width=800, height=400):
+    """生成难以压缩的噪点图片"""
+    rng = random.Random(0)
+    img = Image.new("RGB", (width, height))
+    img.putdata(
+        [
+            (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+            for _ in range(width * height)
+        ]
+    )
+    return img
+
+
+def test_encode_within_budget():
+    """测试按字节预算编码"""
+    encoder = ImageEncoder(max_bytes=WECHAT_MEDIA_MAX_BYTES["thumb"])
+
+    result = encoder.encode(_noisy_image())
+
+    assert result.byte_size <= WECHAT_MEDIA_MAX_BYTES["thumb"]
+    assert result.format == "JPEG"
+    assert result.elapsed_ms >= 0
+    assert result.data[:2] == b"\xff\xd8"
+
+
+def test_encode_without_budget_uses_max_quality():
+    """测试无预算时使用最高质量"""
+    encoder = ImageEncoder(max_quality=90)
+
+    result = encoder.encode(Image.new("RGB", (100, 100), "white"))
+
+    assert result.quality == 90
+    assert result.attempts == 1
+
+
+def test_encode_downscales_when_quality_is_not_enough():
+    """测试最低质量仍超预算时缩小尺寸"""
+    encoder = ImageEncoder(max_bytes=16 * 1024, min_quality=80, max_downscales=10)
+
+    result = encoder.encode(_noisy_image())
+
+    assert result.byte_size <= 16 * 1024
+    assert result.dimensions[0] < 800
+
+
+def test_encode_webp_and_alpha():
+    """测试 WebP 编码与透明通道处理"""
+    img = Image.new("RGBA", (64, 64), (255, 0, 0, 128))
+
+    webp = ImageEncoder(image_format="webp").encode(img)
+    jpeg = ImageEncoder(image_format="jpg").encode(img)
+
+    assert webp.format == "WEBP"
+    assert jpeg.format == "JPEG"
+
+
+def test_encode_impossible_budget():
+    """测试无法满足的预算"""
+    encoder = ImageEncoder(max_bytes=10, max_downscales=1)
+
+    with pytest.raises(ConversionError):
+        encoder.encode(_noisy_image(200, 200))
+
+
+def test_unsupported_format():
+    """测试不支持的格式"""
+    with pytest.raises(ConversionError):
+        ImageEncoder(image_format="bmp")
@@ -0,0 +1,138 @@
+"""测试图片提取器"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.download_cache import DownloadCache
+from utils.image_extractor import ImageExtractor
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """返回固定内容的图片服务，/flaky 首次请求返回 503，支持 ETag 条件请求"""
+
+    hits = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            count = self.hits.get(self.path, 0) + 1
+            self.hits[self.path] = count
+
+        if self.path.startswith("/missing"):
+            self.send_error(404)
+            return
+        if self.path.startswith("/flaky") and count == 1:
+            self.send_error(503)
+            return
+
+        etag = f'"{self.path}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = b"\xff\xd8fake-jpeg" + self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def image_server():
+    _ImageHandler.hits = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", _ImageHandler.hits
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_remote_images_deduplicates(tmp_path, image_server):
+    """测试相同 URL 只下载一次"""
+    base_url, hits = image_server
+    extractor = ImageExtractor(tmp_path, max_workers=4, per_host_limit=2)
+    urls = [f"{base_url}/a.jpg", f"{base_url}/b.jpg", f"{base_url}/a.jpg"]
+
+    downloaded = extractor.download_remote_images(urls)
+    extractor.close()
+
+    assert len(downloaded) == 2
+    assert hits["/a.jpg"] == 1
+    assert downloaded[f"{base_url}/a.jpg"].read_bytes().endswith(b"/a.jpg")
+
+
+def test_download_retries_and_skips_failures(tmp_path, image_server):
+    """测试失败重试并跳过无法下载的图片"""
+    base_url, hits = image_server
+    extractor = ImageExtractor(tmp_path, backoff_factor=0)
+
+    downloaded = extractor.download_remote_images(
+        [f"{base_url}/flaky.jpg", f"{base_url}/missing.jpg"]
+    )
+    extractor.close()
+
+    assert f"{base_url}/flaky.jpg" in downloaded
+    assert f"{base_url}/missing.jpg" not in downloaded
+    assert hits["/flaky.jpg"] == 2
+
+
+def test_extract_and_prepare_images(tmp_path, image_server):
+    """测试提取并下载 Markdown 中的图片"""
+    base_url, _ = image_server
+    (tmp_path / "local.png").write_bytes(b"png")
+    content = (
+        f"![远程]({base_url}/remote.jpg)\n\n![本地](local.png)\n\n![重复]({base_url}/remote.jpg)"
+    )
+    extractor = ImageExtractor(tmp_path / "temp")
+
+    images, local_images = extractor.extract_and_prepare_images(content, "markdown", tmp_path)
+    extractor.close()
+
+    assert len(images) == 3
+    assert len(local_images) == 3
+    assert images[0]["local_path"] == images[2]["local_path"]
+    assert images[1]["local_path"] == tmp_path / "local.png"
+
+
+def test_download_cache_revalidates(tmp_path, image_server):
+    """测试重复下载时使用条件请求复用缓存"""
+    base_url, hits = image_server
+    url = f"{base_url}/cached.jpg"
+
+    first = ImageExtractor(tmp_path / "temp", cache=DownloadCache(tmp_path / "cache"))
+    first_path = first.download_remote_images([url])[url]
+    first.close()
+
+    cache = DownloadCache(tmp_path / "cache")
+    second = ImageExtractor(tmp_path / "temp", cache=cache)
+    second_path = second.download_remote_images([url])[url]
+    second.close()
+
+    assert first_path == second_path
+    assert hits["/cached.jpg"] == 2
+    assert cache.hits == 1
+    assert cache.misses == 0
+    assert list((tmp_path / "temp").iterdir()) == []
+
+
+def test_extract_from_refs(tmp_path):
+    """测试从解析器图片索引构建图片信息"""
+    from parsers.base import ImageRef
+
+    (tmp_path / "a.png").write_bytes(b"a")
+    refs = [ImageRef(src="a.png", alt="a", kind="relative", resolved_path=tmp_path / "a.png")]
+    extractor = ImageExtractor(tmp_path / "temp")
+
+    images = extractor.extract_from_refs(refs)
+
+    assert images[0]["path"] == "a.png"
+    assert extractor.prepare_image(images[0]) == tmp_path / "a.png"
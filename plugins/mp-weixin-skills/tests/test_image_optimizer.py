@@ -0,0 +1,116 @@
+"""测试图片优化器"""
+
+import io
+import os
+import zipfile
+from pathlib import Path
+
+from PIL import Image
+
+from utils.image_optimizer import ImageOptimizer
+
+
+def _save(path: Path, size=(2000, 1000), fmt="JPEG", mode="RGB", **kwargs) -> Path:
+    Image.new(mode, size, "red" if mode == "RGB" else (255, 0, 0, 128)).save(path, fmt, **kwargs)
+    return path
+
+
+def test_optimize_downscales_and_caches(tmp_path):
+    """测试缩放并缓存结果"""
+    source = _save(tmp_path / "photo.jpg")
+    optimizer = ImageOptimizer(tmp_path / "cache", max_width=677)
+
+    first = optimizer.optimize(source)
+    second = optimizer.optimize(source)
+
+    assert first.changed is True
+    assert first.cached is False
+    assert first.dimensions == (677, 338)
+    assert second.cached is True
+    assert second.path == first.path
+
+
+def test_optimize_strips_exif(tmp_path):
+    """测试去除 EXIF 元数据"""
+    exif = Image.Exif()
+    exif[0x010F] = "TestCamera"
+    source = _save(tmp_path / "exif.jpg", size=(100, 100), exif=exif)
+    optimizer = ImageOptimizer(tmp_path / "cache")
+
+    result = optimizer.optimize(source)
+
+    assert result.changed is True
+    with Image.open(result.path) as img:
+        assert not img.getexif()
+
+
+def test_optimize_converts_unsupported_format(tmp_path):
+    """测试转换 WebP 格式"""
+    source = _save(tmp_path / "image.webp", size=(100, 100), fmt="WEBP")
+    optimizer = ImageOptimizer(tmp_path / "cache")
+
+    result = optimizer.optimize(source)
+
+    assert result.path.suffix == ".jpg"
+
+
+def test_optimize_keeps_small_supported_image(tmp_path):
+    """测试无需处理的图片保持原样"""
+    source = _save(tmp_path / "icon.png", size=(100, 100), fmt="PNG", mode="RGBA")
+    optimizer = ImageOptimizer(tmp_path / "cache")
+
+    result = optimizer.optimize(source)
+
+    assert result.changed is False
+    assert result.path == source
+
+
+def test_optimize_images_updates_local_path(tmp_path):
+    """测试批量优化更新图片信息"""
+    source = _save(tmp_path / "photo.jpg")
+    images = [{"path": "photo.jpg", "local_path": source}, {"path": "missing.jpg"}]
+    optimizer = ImageOptimizer(tmp_path / "cache", max_width=800, workers=2)
+
+    optimizer.optimize_images(images)
+
+    assert images[0]["original_local_path"] == source
+    assert images[0]["local_path"] != source
+    assert images[0]["optimized"]["width"] == 800
+    assert "local_path" not in images[1]
+
+
+def test_embedded_passthrough_is_written_to_cache(tmp_path):
+    """测试扩展名未知但无需处理的内嵌图片写入缓存目录，得到可上传的文件"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (100, 100), "red").save(buffer, "JPEG")
+    container = tmp_path / "article.docx"
+    with zipfile.ZipFile(container, "w") as package:
+        package.writestr("word/media/image1.jfif", buffer.getvalue())
+    image_info = {
+        "path": "word/media/image1.jfif",
+        "type": "embedded",
+        "container": container,
+        "part_name": "word/media/image1.jfif",
+        "size": len(buffer.getvalue()),
+    }
+
+    ImageOptimizer(tmp_path / "cache").optimize_image(image_info)
+
+    assert image_info["local_path"].exists()
+    assert image_info["local_path"].suffix == ".jpg"
+    assert image_info["local_path"].read_bytes() == buffer.getvalue()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """测试缓存超出容量时淘汰最久未使用的文件"""
+    optimizer = ImageOptimizer(tmp_path / "cache", max_width=100, max_cache_bytes=1)
+    optimizer.EVICT_MIN_AGE = 0
+
+    paths = []
+    for i, color in enumerate(("red", "green", "blue")):
+        source = tmp_path / f"{i}.png"
+        Image.new("RGB", (400, 200), color).save(source)
+        paths.append(optimizer.optimize(source).path)
+        os.utime(paths[-1], (i, i))
+
+    assert [path.exists() for path in paths] == [False, False, True]
@@ -0,0 +1,97 @@
+"""测试图片流水线"""
+
+import threading
+import time
+
+from utils.image_extractor import ImageExtractor
+from utils.image_pipeline import ImagePipeline
+from utils.image_processor import ImageProcessor
+
+
+class FakeApiClient:
+    """记录上传调用的假 API 客户端"""
+
+    def __init__(self):
+        self.uploads = []
+        self.lock = threading.Lock()
+
+    def upload_media(self, file_path, media_type="image"):
+        with self.lock:
+            self.uploads.append(file_path)
+            index = len(self.uploads)
+        return {"media_id": f"m{index}", "url": f"https://mmbiz.qpic.cn/{index}"}
+
+
+class RecordingOptimizer:
+    """记录执行线程与最大并发数的假优化器"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.threads = set()
+
+    def optimize_image(self, image_info):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return image_info
+
+
+def test_pipeline_uploads_and_replaces(tmp_path):
+    """测试流水线上传图片并替换链接"""
+    (tmp_path / "a.png").write_bytes(b"a")
+    (tmp_path / "b.png").write_bytes(b"b")
+    markdown = "![a](a.png)\n![b](b.png)\n![a again](a.png)\n![missing](missing.png)"
+    html = '<img src="a.png"><img src="b.png"><img src="a.png"><img src="missing.png">'
+
+    api_client = FakeApiClient()
+    extractor = ImageExtractor(tmp_path / "temp", max_workers=2)
+    images = extractor.extract_from_markdown(markdown, tmp_path)
+    pipeline = ImagePipeline(extractor, ImageProcessor(api_client, tmp_path / "temp"), queue_size=1)
+
+    result = pipeline.run(html, images)
+    extractor.close()
+
+    assert len(api_client.uploads) == 2
+    assert 'src="a.png"' not in result
+    assert 'src="b.png"' not in result
+    assert 'src="missing.png"' in result
+    assert images[0]["wechat_url"] == images[2]["wechat_url"]
+    assert "wechat_url" not in images[3]
+
+
+def test_pipeline_without_images():
+    """测试没有图片时原样返回"""
+    pipeline = ImagePipeline(None, None)
+
+    assert pipeline.run("<p>无图片</p>", []) == "<p>无图片</p>"
+
+
+def test_pipeline_optimizes_with_optimizer_workers(tmp_path):
+    """测试优化阶段使用 optimizer.workers 个独立线程，而不是下载线程"""
+    names = [f"{i}.png" for i in range(6)]
+    for name in names:
+        (tmp_path / name).write_bytes(name.encode())
+    markdown = "\n".join(f"![{name}]({name})" for name in names)
+    html = "".join(f'<img src="{name}">' for name in names)
+
+    api_client = FakeApiClient()
+    extractor = ImageExtractor(tmp_path / "temp", max_workers=4)
+    optimizer = RecordingOptimizer(workers=1)
+    pipeline = ImagePipeline(
+        extractor, ImageProcessor(api_client, tmp_path / "temp"), optimizer, queue_size=2
+    )
+
+    result = pipeline.run(html, extractor.extract_from_markdown(markdown, tmp_path))
+    extractor.close()
+
+    assert len(api_client.uploads) == 6
+    assert "0.png" not in result
+    assert optimizer.max_active == 1
+    assert all(name.startswith("optimize") for name in optimizer.threads)
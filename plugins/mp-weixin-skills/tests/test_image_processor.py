@@ -0,0 +1,55 @@
+"""测试图片处理器"""
+
+from utils.image_processor import ImageProcessor, normalize_image_src
+
+
+def _processor(tmp_path):
+    return ImageProcessor(api_client=None, temp_dir=tmp_path)
+
+
+def test_replace_image_urls_single_pass(tmp_path):
+    """测试一次扫描替换多张图片"""
+    html = '<p><img src="a.png" alt="a"><img alt="b" src=\'b.png\'><img src="c.png"></p>'
+
+    result = _processor(tmp_path).replace_image_urls(
+        html, {"a.png": "https://mmbiz.qpic.cn/a", "b.png": "https://mmbiz.qpic.cn/b"}
+    )
+
+    assert result == (
+        '<p><img src="https://mmbiz.qpic.cn/a" alt="a">'
+        '<img alt="b" src=\'https://mmbiz.qpic.cn/b\'><img src="c.png"></p>'
+    )
+
+
+def test_replace_image_urls_encoded_variants(tmp_path):
+    """测试匹配 URL 编码和 HTML 转义后的路径"""
+    html = (
+        '<img src="images/%E5%9B%BE%E7%89%87%201.png">'
+        '<img src="https://example.com/a.png?w=1&amp;h=2">'
+    )
+
+    result = _processor(tmp_path).replace_image_urls(
+        html,
+        {
+            "images/图片 1.png": "https://mmbiz.qpic.cn/1?wx_fmt=png&from=appmsg",
+            "https://example.com/a.png?w=1&h=2": "https://mmbiz.qpic.cn/2",
+        },
+    )
+
+    assert 'src="https://mmbiz.qpic.cn/1?wx_fmt=png&amp;from=appmsg"' in result
+    assert 'src="https://mmbiz.qpic.cn/2"' in result
+
+
+def test_replace_does_not_touch_other_attributes(tmp_path):
+    """测试只替换 img 的 src"""
+    html = '<a href="a.png">a.png</a><img data-src="a.png" src="a.png">'
+
+    result = _processor(tmp_path).replace_image_urls(html, {"a.png": "https://mmbiz.qpic.cn/a"})
+
+    assert result == '<a href="a.png">a.png</a><img data-src="a.png" src="https://mmbiz.qpic.cn/a">'
+
+
+def test_normalize_image_src():
+    """测试路径归一化"""
+    assert normalize_image_src(" a%20b.png ") == "a b.png"
+    assert normalize_image_src("a.png?x=1&amp;y=2") == "a.png?x=1&y=2"
@@ -0,0 +1,227 @@
+"""测试任务日志：步骤续传、失败重试与崩溃恢复"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from mock_wechat import MockSettings, MockWechatServer  # noqa: E402
+
+from config import AppConfig
+from exceptions import ConversionError, MediaTooLargeError, ParserError, WechatApiError
+from journal import JobJournal, JobRunner, is_retryable, retry_delay
+from publisher import Publisher
+from wechat import WechatApiClient, WechatConfig
+
+
+def _config(tmp_path: Path) -> AppConfig:
+    return AppConfig(
+        wechat_app_id="wx-mock",
+        wechat_app_secret="mock-secret",
+        output_dir=tmp_path / "output",
+        temp_dir=tmp_path / "temp",
+        cache_dir=tmp_path / "cache",
+    )
+
+
+def test_rerun_resumes_without_duplicate_uploads(tmp_path):
+    # 草稿新增失败时，图片与封面已经上传
+    with MockWechatServer(MockSettings(errors={"upload_draft": (1.0, -1)})) as mock:
+        article = tmp_path / "article.md"
+        images = "\n\n".join(
+            f"![图 {i}]({mock.base_url}/mock-images/figure-{i}.png)" for i in range(3)
+        )
+        article.write_text(f"# 续传测试\n\n{images}\n", encoding="utf-8")
+
+        client = WechatApiClient(WechatConfig("wx-mock", "mock-secret", base_url=mock.base_url))
+        journal = JobJournal(tmp_path / "jobs.sqlite3")
+        runner = JobRunner(journal, Publisher(_config(tmp_path), client).run_job, retry_base=0.01)
+        try:
+            job = journal.create(
+                "publish", {"file": str(article), "template": None, "no_api": False}
+            )
+            record = runner.execute(job.id)
+            assert record.status == "pending"
+            uploads = mock.state.calls["upload_media"]
+            assert uploads == 4  # 3 张图片 + 封面
+            steps = set(journal.steps(job.id))
+            assert "parse" in steps
+            assert any(key.startswith("cover:") for key in steps)
+
+            # 故障恢复后重新运行：只执行草稿新增
+            mock.state.settings.errors.clear()
+            record = runner.execute(job.id)
+        finally:
+            journal.close()
+            client.close()
+
+        assert record.status == "succeeded", record.error
+        assert record.attempts == 2
+        assert record.result["images_uploaded"] == 3
+        assert record.result["media_id"] in mock.state.drafts
+        assert mock.state.calls["upload_media"] == uploads
+
+
+class FlakyImageClient(WechatApiClient):
+    """正文图片首次上传失败（封面正常）的 API 客户端"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.image_failures = 1
+
+    def upload_media(self, file_path, media_type="thumb", fileobj=None):
+        if media_type == "image" and self.image_failures:
+            self.image_failures -= 1
+            raise WechatApiError("系统繁忙", -1)
+        return super().upload_media(file_path, media_type, fileobj=fileobj)
+
+
+def test_failed_image_upload_reschedules_job(tmp_path):
+    with MockWechatServer() as mock:
+        article = tmp_path / "article.md"
+        article.write_text(
+            f"# 图片失败\n\n![图]({mock.base_url}/mock-images/figure-1.png)\n", encoding="utf-8"
+        )
+
+        client = FlakyImageClient(WechatConfig("wx-mock", "mock-secret", base_url=mock.base_url))
+        journal = JobJournal(tmp_path / "jobs.sqlite3")
+        runner = JobRunner(journal, Publisher(_config(tmp_path), client).run_job, retry_base=0.01)
+        try:
+            job = journal.create("publish", {"file": str(article), "template": None, "no_api": False})
+            record = runner.execute(job.id)
+            # 图片上传失败时不创建草稿，任务等待重试
+            assert record.status == "pending"
+            assert mock.state.calls["upload_draft"] == 0
+
+            record = runner.execute(job.id)
+        finally:
+            journal.close()
+            client.close()
+
+    assert record.status == "succeeded", record.error
+    assert record.result["images_uploaded"] == 1
+    assert "mock-images" not in mock.state.drafts[record.result["media_id"]][0]["content"]
+
+
+def test_resumed_job_regenerates_cover_when_title_changes(tmp_path):
+    with MockWechatServer(MockSettings(errors={"upload_draft": (1.0, -1)})) as mock:
+        article = tmp_path / "article.md"
+        article.write_text("# 旧标题\n\n正文\n", encoding="utf-8")
+
+        client = WechatApiClient(WechatConfig("wx-mock", "mock-secret", base_url=mock.base_url))
+        journal = JobJournal(tmp_path / "jobs.sqlite3")
+        runner = JobRunner(journal, Publisher(_config(tmp_path), client).run_job, retry_base=0.01)
+        try:
+            job = journal.create(
+                "publish", {"file": str(article), "template": None, "no_api": False}
+            )
+            assert runner.execute(job.id).status == "pending"
+            assert mock.state.calls["upload_media"] == 1
+
+            article.write_text("# 新标题\n\n正文\n", encoding="utf-8")
+            mock.state.settings.errors.clear()
+            record = runner.execute(job.id)
+        finally:
+            journal.close()
+            client.close()
+
+    assert record.status == "succeeded", record.error
+    assert mock.state.calls["upload_media"] == 2
+
+
+def test_run_pending_retries_with_backoff(tmp_path):
+    journal = JobJournal(tmp_path / "jobs.sqlite3")
+    calls = {"flaky": 0, "broken": 0}
+
+    def handler(job_type, params, steps):
+        calls[params["file"]] += 1
+        steps.run("first", lambda: {"ok": True})
+        if params["file"] == "flaky" and calls["flaky"] < 2:
+            raise WechatApiError("系统繁忙", -1)
+        if params["file"] == "broken":
+            raise ParserError("无法解析")
+        return {"file": params["file"]}
+
+    flaky = journal.create("publish", {"file": "flaky"})
+    broken = journal.create("publish", {"file": "broken"})
+    runner = JobRunner(
+        journal, handler, concurrency=1, max_attempts=3, retry_base=0.01, retry_max=0.05
+    )
+    records = {record.id: record for record in runner.run_pending()}
+    journal.close()
+
+    assert records[flaky.id].status == "succeeded"
+    assert records[flaky.id].attempts == 2
+    # 不可重试的错误立即放弃
+    assert records[broken.id].status == "failed"
+    assert records[broken.id].attempts == 1
+
+
+def test_run_pending_refills_free_slots(tmp_path):
+    journal = JobJournal(tmp_path / "jobs.sqlite3")
+    finished_at = {}
+
+    def handler(job_type, params, steps):
+        time.sleep(0.5 if params["file"] == "slow" else 0.05)
+        finished_at[params["file"]] = time.monotonic()
+        return {}
+
+    for name in ("slow", "fast1", "fast2", "fast3"):
+        journal.create("publish", {"file": name})
+    records = JobRunner(journal, handler, concurrency=2).run_pending()
+    journal.close()
+
+    assert len(records) == 4
+    # 慢任务执行期间，另一个执行槽依次处理完所有快任务
+    assert finished_at["fast3"] < finished_at["slow"]
+
+
+def test_recover_interrupted_jobs(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    journal = JobJournal(path)
+    job = journal.create("publish", {"file": "a.md"})
+    journal.start(job.id)
+    journal.put_step(job.id, "cover", {"media_id": "m1"})
+    journal.close()
+
+    # 另一个存活进程正在执行时既不恢复也不续传
+    journal = JobJournal(path)
+    journal.owner = "other-host:1"
+    assert journal.start(job.id) is None
+    assert journal.recover() == []
+    assert journal.find_unfinished("publish", {"file": "a.md"}) is None
+    journal.close()
+
+    # 模拟执行进程崩溃：心跳超时后由其他进程恢复
+    journal = JobJournal(path)
+    journal.owner = "other-host:1"
+    journal._execute("UPDATE jobs SET heartbeat_at = 0")
+    pending = journal.recover()
+    assert [record.id for record in pending] == [job.id]
+    assert pending[0].status == "pending"
+    assert journal.get_step(job.id, "cover") == {"media_id": "m1"}
+    assert journal.find_unfinished("publish", {"file": "a.md"}).id == job.id
+    journal.close()
+
+
+@pytest.mark.parametrize("attempt", [1, 2, 5, 20])
+def test_retry_delay_is_bounded(attempt):
+    delay = min(60.0, 2.0 * 2 ** (attempt - 1))
+    assert delay / 2 <= retry_delay(attempt, 2.0, 60.0) <= delay
+
+
+def test_is_retryable():
+    assert is_retryable(WechatApiError("限流", 45009))
+    # token 被其他进程刷新属于暂时性错误
+    assert is_retryable(WechatApiError("access_token 无效", 40001))
+    assert is_retryable(WechatApiError("网络请求失败"))
+    assert not is_retryable(WechatApiError("AppSecret 无效", 40125))
+    assert not is_retryable(MediaTooLargeError("素材超出大小限制"))
+    assert not is_retryable(ValueError("参数错误"))
+    # 响应被截断可以重试，图片无法压缩到预算内则重试也不会成功
+    assert is_retryable(json.JSONDecodeError("Expecting value", "", 0))
+    assert not is_retryable(ConversionError("无法压缩到预算内"))
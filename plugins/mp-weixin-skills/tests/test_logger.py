@@ -42,3 +42,118 @@ def test_third_party_log_levels():
     assert logging.getLogger("urllib3").level == logging.WARNING
     assert logging.getLogger("PIL").level == logging.WARNING
 
+
+def test_setup_logging_queue_mode_flushes_on_shutdown():
+    """测试队列模式：记录由后台线程写出，关闭时全部落盘"""
+    from logging.handlers import QueueHandler
+
+    from utils.logger import shutdown_logging
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log_file = Path(tmpdir) / "queue.log"
+        setup_logging(log_level="DEBUG", log_file=log_file, console_output=False, use_queue=True)
+
+        root = logging.getLogger()
+        assert [type(handler) for handler in root.handlers] == [QueueHandler]
+
+        logger = logging.getLogger("test_queue")
+        for i in range(100):
+            logger.info("队列消息 %d", i)
+        shutdown_logging()
+
+        # 关闭后处理器直接挂回根记录器
+        assert not any(isinstance(handler, QueueHandler) for handler in root.handlers)
+        content = log_file.read_text(encoding="utf-8")
+        assert "队列消息 0" in content
+        assert "队列消息 99" in content
+
+        for handler in root.handlers:
+            handler.close()
+        root.handlers.clear()
+
+
+def test_preview_truncates_lazily():
+    """测试载荷预览：长字符串被截断，且只在输出时序列化"""
+    from utils.logger import Preview
+
+    payload = {"articles": [{"title": "标题", "content": "<p>" + "正文" * 100000 + "</p>"}]}
+    text = str(Preview(payload, limit=100))
+
+    assert len(text) < 200
+    assert "标题" in text
+    assert "共" in text
+
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("不应被序列化")
+
+    logger = logging.getLogger("test_preview")
+    logger.setLevel(logging.INFO)
+    logger.debug("%s", Preview(Exploding()))
+
+
+def _json_lines(log_file: Path) -> list:
+    import json
+
+    return [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines() if line]
+
+
+def test_json_format_carries_job_context_across_threads():
+    """测试 JSON 模式：任务上下文字段在线程池和 span 中保持"""
+    from utils.logger import ContextThreadPoolExecutor, log_context
+    from utils.timing import span
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log_file = Path(tmpdir) / "json.log"
+        setup_logging(log_level="INFO", log_file=log_file, console_output=False, log_format="json")
+        logger = logging.getLogger("test_json")
+
+        def work(i):
+            with span("image.upload"):
+                logger.info("上传 %d", i)
+
+        with log_context(job_id="job-1", source_file="a.md"):
+            logger.info("开始")
+            with ContextThreadPoolExecutor(max_workers=2) as pool:
+                list(pool.map(work, range(2)))
+        logger.info("任务外")
+
+        entries = {entry["message"]: entry for entry in _json_lines(log_file)}
+        root = logging.getLogger()
+        for handler in root.handlers:
+            handler.close()
+        root.handlers.clear()
+
+    assert entries["开始"]["job_id"] == "job-1"
+    assert entries["开始"]["source_file"] == "a.md"
+    assert entries["开始"]["elapsed_ms"] >= 0
+    assert "stage" not in entries["开始"]
+    for i in range(2):
+        assert entries[f"上传 {i}"]["job_id"] == "job-1"
+        assert entries[f"上传 {i}"]["stage"] == "image.upload"
+    assert "job_id" not in entries["任务外"]
+
+
+def test_file_log_rotates_by_size():
+    """测试文件日志按大小轮转"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log_file = Path(tmpdir) / "rotate.log"
+        setup_logging(
+            log_level="INFO",
+            log_file=log_file,
+            console_output=False,
+            max_bytes=2000,
+            backup_count=2,
+        )
+        logger = logging.getLogger("test_rotate")
+        for i in range(200):
+            logger.info("轮转消息 %d", i)
+
+        root = logging.getLogger()
+        for handler in root.handlers:
+            handler.close()
+        root.handlers.clear()
+
+        files = sorted(path.name for path in Path(tmpdir).iterdir())
+        assert files == ["rotate.log", "rotate.log.1", "rotate.log.2"]
+        assert log_file.stat().st_size <= 2000
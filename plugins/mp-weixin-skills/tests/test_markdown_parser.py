@@ -22,3 +22,40 @@ def test_markdown_parser_parse():
     assert result.title == "示例文章"
     assert "<h1" in result.content
     assert result.metadata["source_file"] == "examples/sample.md"
+
+
+def test_markdown_parser_image_index(tmp_path):
+    """测试从 token 流建立图片索引"""
+    source = tmp_path / "article.md"
+    source.write_text(
+        "# 图片测试\n\n"
+        "![行内](<images/图片 1.png>)\n\n"
+        "![引用式][logo]\n\n"
+        "![远程](https://example.com/a.png)\n\n"
+        "[logo]: /abs/logo.png\n",
+        encoding="utf-8",
+    )
+
+    result = MarkdownParser().parse(source)
+    refs = result.image_refs
+
+    assert [ref.kind for ref in refs] == ["relative", "absolute", "remote"]
+    assert refs[0].src == "images/图片 1.png"
+    assert refs[0].alt == "行内"
+    assert refs[0].resolved_path == tmp_path / "images" / "图片 1.png"
+    assert refs[0].line == 3
+    assert refs[1].src == "/abs/logo.png"
+    assert refs[2].resolved_path is None
+    assert [ref.position for ref in refs] == [0, 1, 2]
+    assert result.images == [refs[0].resolved_path, refs[1].resolved_path]
+
+
+def test_markdown_parser_escapes_inline_html_images(tmp_path):
+    """测试未启用 HTML 时内嵌的 <img> 按文本转义，不进入图片索引"""
+    source = tmp_path / "article.md"
+    source.write_text('# 标题\n\n<img src="a.png">\n', encoding="utf-8")
+
+    result = MarkdownParser().parse(source)
+
+    assert result.image_refs == []
+    assert "&lt;img" in result.content
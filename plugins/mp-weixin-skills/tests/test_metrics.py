@@ -0,0 +1,55 @@
+"""测试指标注册表"""
+
+import urllib.request
+
+import pytest
+
+from utils.metrics import MetricsRegistry
+
+
+def test_counter_and_histogram_render():
+    """测试计数器与直方图的 Prometheus 文本格式"""
+    registry = MetricsRegistry()
+    calls = registry.counter("api_calls_total", "调用次数", ("endpoint", "errcode"))
+    latency = registry.histogram("api_seconds", "耗时", ("endpoint",), buckets=(0.1, 1.0))
+
+    calls.labels(endpoint="upload_media", errcode="0").inc()
+    calls.labels(endpoint="upload_media", errcode="45009").inc(2)
+    latency.labels(endpoint="upload_media").observe(0.05)
+    latency.labels(endpoint="upload_media").observe(3)
+
+    text = registry.render()
+
+    assert "# TYPE api_calls_total counter" in text
+    assert 'api_calls_total{endpoint="upload_media",errcode="45009"} 2' in text
+    assert 'api_seconds_bucket{endpoint="upload_media",le="0.1"} 1' in text
+    assert 'api_seconds_bucket{endpoint="upload_media",le="+Inf"} 2' in text
+    assert 'api_seconds_count{endpoint="upload_media"} 2' in text
+
+
+def test_labels_must_match():
+    """测试标签名不匹配时报错"""
+    registry = MetricsRegistry()
+    counter = registry.counter("hits_total", "命中", ("cache",))
+
+    with pytest.raises(ValueError):
+        counter.labels(result="hit")
+    assert registry.counter("hits_total", "命中", ("cache",)) is counter
+
+
+def test_textfile_and_http_server(tmp_path):
+    """测试写入 textfile 与 /metrics 服务"""
+    registry = MetricsRegistry()
+    registry.counter("token_refreshes_total", "刷新次数").inc()
+
+    registry.write_textfile(tmp_path / "mp.prom")
+    assert "token_refreshes_total 1" in (tmp_path / "mp.prom").read_text(encoding="utf-8")
+
+    server = registry.serve(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert "token_refreshes_total 1" in body
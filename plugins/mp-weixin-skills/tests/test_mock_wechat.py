@@ -0,0 +1,114 @@
+"""测试本地模拟微信 API（benchmarks/mock_wechat.py）与 API 客户端的端到端交互"""
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from mock_wechat import ERRCODE_RATE_LIMIT, MockSettings, MockWechatServer  # noqa: E402
+
+from exceptions import MediaTooLargeError, WechatApiError
+from utils.image_encoder import WECHAT_MEDIA_MAX_BYTES
+from utils.metrics import API_REQUESTS
+from wechat import WechatApiClient, WechatConfig
+
+
+def _client(server: MockWechatServer) -> WechatApiClient:
+    settings = server.state.settings
+    return WechatApiClient(
+        WechatConfig(settings.app_id, settings.app_secret, base_url=server.base_url)
+    )
+
+
+def test_publish_flow_against_mock(tmp_path):
+    image = tmp_path / "cover.png"
+    Image.new("RGB", (100, 100), "red").save(image)
+
+    with MockWechatServer() as server:
+        client = _client(server)
+        media = client.upload_media(str(image), "thumb")
+        draft = client.upload_draft(
+            [{"title": "标题", "content": "<p>正文</p>", "thumb_media_id": media["media_id"]}]
+        )
+        client.update_draft(draft["media_id"], 0, {"title": "新标题", "content": "<p>正文</p>"})
+        fetched = client.get_draft(draft["media_id"])
+        client.close()
+
+        summary = server.state.summary()
+
+    assert fetched["title"] == "新标题"
+    assert summary["calls"] == {
+        "token": 1,
+        "upload_media": 1,
+        "upload_draft": 1,
+        "update_draft": 1,
+        "get_draft": 1,
+    }
+    assert summary["media"] == 1
+
+
+def test_mock_rate_limit_returns_errcode(tmp_path):
+    image = tmp_path / "a.png"
+    Image.new("RGB", (10, 10), "blue").save(image)
+
+    with MockWechatServer(MockSettings(rate_limits={"upload_media": 1})) as server:
+        client = _client(server)
+        client.upload_media(str(image), "image")
+        with pytest.raises(WechatApiError) as excinfo:
+            client.upload_media(str(image), "image")
+        client.close()
+
+    assert excinfo.value.errcode == ERRCODE_RATE_LIMIT
+
+
+def test_http_errors_are_counted_by_status():
+    with MockWechatServer() as server:
+        client = _client(server)
+        # 未知路径返回 HTTP 404
+        client.config.base_url = f"{server.base_url}/missing"
+        before = API_REQUESTS.value(endpoint="token", errcode="http_404")
+        with pytest.raises(WechatApiError):
+            client.get_access_token()
+        client.close()
+
+    assert API_REQUESTS.value(endpoint="token", errcode="http_404") == before + 1
+
+
+def test_oversized_stream_is_rejected_before_upload():
+    with MockWechatServer() as server:
+        client = _client(server)
+        stream = io.BytesIO(b"\0" * (WECHAT_MEDIA_MAX_BYTES["thumb"] + 1))
+        with pytest.raises(MediaTooLargeError):
+            client.upload_media("cover.jpg", "thumb", fileobj=stream)
+        client.close()
+
+        assert server.state.calls["upload_media"] == 0
+
+
+def test_rotated_token_is_refreshed_and_retried(tmp_path):
+    image = tmp_path / "cover.png"
+    Image.new("RGB", (100, 100), "red").save(image)
+
+    with MockWechatServer(MockSettings(rotate_tokens=True)) as server:
+        daemon = _client(server)
+        daemon.upload_media(str(image), "thumb")
+
+        # 其他进程获取新 token 后，常驻进程缓存的 token 失效
+        other = _client(server)
+        other.get_access_token()
+
+        media = daemon.upload_media(str(image), "thumb")
+        article = {"title": "标题", "content": "<p>正文</p>", "thumb_media_id": media["media_id"]}
+        draft = daemon.upload_draft([article])
+        daemon.close()
+        other.close()
+
+        summary = server.state.summary()
+
+    assert draft["media_id"]
+    assert summary["calls"]["token"] == 3
+    assert summary["errors"] == {"upload_media:40001": 1}
@@ -0,0 +1,126 @@
+"""测试解析结果缓存"""
+
+import os
+
+from parsers.base import ParserFactory
+from parsers.cache import ParseCache
+from parsers.markdown import MarkdownParser
+
+
+class CountingParser(MarkdownParser):
+    """记录解析次数的解析器"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def parse(self, file_path):
+        self.calls += 1
+        return super().parse(file_path)
+
+
+def _article(tmp_path):
+    source = tmp_path / "article.md"
+    source.write_text("# 标题\n\n正文\n\n![图](images/a.png)\n", encoding="utf-8")
+    return source
+
+
+def test_cache_hit_returns_equal_result(tmp_path):
+    """测试命中缓存时结果与直接解析一致"""
+    source = _article(tmp_path)
+    parser = CountingParser()
+    cache = ParseCache(tmp_path / "cache")
+
+    parsed = parser.parse(source)
+    cache.put(source, parser, parsed)
+    cached = cache.get(source, parser)
+
+    assert cached == parsed
+    assert cache.hits == 1
+
+
+def test_touch_validates_by_hash_and_edit_invalidates(tmp_path):
+    """测试仅修改时间变化时按哈希命中，内容变化时失效"""
+    source = _article(tmp_path)
+    parser = CountingParser()
+    cache = ParseCache(tmp_path / "cache")
+    cache.put(source, parser, parser.parse(source))
+
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get(source, parser) is not None
+
+    source.write_text("# 新标题\n", encoding="utf-8")
+    assert cache.get(source, parser) is None
+
+
+def test_factory_parse_uses_cache(tmp_path):
+    """测试 ParserFactory.parse 透明使用缓存"""
+    source = _article(tmp_path)
+    parser = CountingParser()
+    ParserFactory.register(".md", parser)
+    ParserFactory.enable_cache(ParseCache(tmp_path / "cache"))
+    try:
+        first = ParserFactory.parse(source)
+        second = ParserFactory.parse(source)
+    finally:
+        ParserFactory.enable_cache(None)
+        ParserFactory.register(".md", MarkdownParser())
+
+    assert parser.calls == 1
+    assert second.title == first.title == "标题"
+    assert second.image_refs[0].resolved_path == first.image_refs[0].resolved_path
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """测试超出容量时淘汰最久未使用的条目"""
+    parser = CountingParser()
+    cache = ParseCache(tmp_path / "cache", max_bytes=1)
+
+    sources = []
+    for i in range(3):
+        source = tmp_path / f"a{i}.md"
+        source.write_text(f"# 文章 {i}\n", encoding="utf-8")
+        cache.put(source, parser, parser.parse(source))
+        sources.append(source)
+
+    assert len(list((tmp_path / "cache").glob("*.json"))) == 1
+    assert cache.get(sources[-1], parser) is not None
+
+
+def test_parser_config_change_invalidates(tmp_path):
+    """测试解析器配置变化时不复用旧配置下的结果"""
+
+    class ConfiguredParser(CountingParser):
+        def __init__(self, image_dir):
+            super().__init__()
+            self.image_dir = image_dir
+
+        def cache_config(self):
+            return {"image_dir": self.image_dir}
+
+    source = _article(tmp_path)
+    cache = ParseCache(tmp_path / "cache")
+    parser = ConfiguredParser("images-a")
+    cache.put(source, parser, parser.parse(source))
+
+    assert cache.get(source, ConfiguredParser("images-b")) is None
+    assert cache.get(source, ConfiguredParser("images-a")) is not None
+
+
+def test_put_scans_cache_dir_once(tmp_path, monkeypatch):
+    """测试写入时累加跟踪总大小，未超出容量时不再扫描缓存目录"""
+    scans = []
+    original = ParseCache.total_bytes.fget
+    monkeypatch.setattr(
+        ParseCache, "total_bytes", property(lambda self: scans.append(1) or original(self))
+    )
+    parser = CountingParser()
+    cache = ParseCache(tmp_path / "cache")
+
+    for i in range(3):
+        source = tmp_path / f"a{i}.md"
+        source.write_text(f"# 文章 {i}\n", encoding="utf-8")
+        cache.put(source, parser, parser.parse(source))
+
+    assert len(scans) == 1
@@ -0,0 +1,106 @@
+"""测试 PDF 解析器"""
+
+import io
+
+import fitz
+from PIL import Image
+
+from parsers.pdf import PDFParser
+
+
+def _png(size, color):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _make_pdf(path, pages=3):
+    """每页顶部重复 logo，第 2 页正文中间有一张大图，另有一个小图标"""
+    doc = fitz.open()
+    logo = _png((200, 80), "green")
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(50, 20, 250, 100), stream=logo)
+        page.insert_text((50, 150), f"Page {page_num + 1} intro")
+        page.insert_text((50, 600), f"Page {page_num + 1} outro")
+        if page_num == 1:
+            page.insert_image(fitz.Rect(50, 300, 450, 500), stream=_png((400, 200), "blue"))
+            page.insert_image(fitz.Rect(500, 300, 510, 310), stream=_png((10, 10), "red"))
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_pdf_parser_extracts_images(tmp_path):
+    """测试提取图片、按 xref 去重并跳过小图"""
+    source = _make_pdf(tmp_path / "report.pdf")
+    parser = PDFParser(image_dir=tmp_path / "images", min_image_size=32, workers=2)
+
+    result = parser.parse(source)
+
+    assert len(result.image_refs) == 2
+    assert all(ref.resolved_path.exists() for ref in result.image_refs)
+    logo = result.image_refs[0]
+    assert result.content.count(f'<img src="{logo.src}"') == 3
+
+
+def test_pdf_parser_places_images_by_position(tmp_path):
+    """测试图片按页面纵向位置插入"""
+    source = _make_pdf(tmp_path / "report.pdf")
+    parser = PDFParser(image_dir=tmp_path / "images")
+
+    result = parser.parse(source)
+    figure = result.image_refs[1]
+    content = result.content
+
+    assert content.index("Page 2 intro") < content.index(figure.src) < content.index("Page 2 outro")
+
+
+def test_pdf_parser_keeps_small_images_when_disabled(tmp_path):
+    """测试关闭小图过滤"""
+    source = _make_pdf(tmp_path / "report.pdf", pages=2)
+    parser = PDFParser(image_dir=tmp_path / "images", min_image_size=0)
+
+    result = parser.parse(source)
+
+    assert len(result.image_refs) == 3
+
+
+def test_same_named_pdfs_do_not_share_images(tmp_path):
+    """测试不同目录下的同名 PDF 图片写入不同目录，互不覆盖"""
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    first = _make_pdf(tmp_path / "a" / "report.pdf", pages=1)
+    second = _make_pdf(tmp_path / "b" / "report.pdf", pages=2)
+    parser = PDFParser(image_dir=tmp_path / "images")
+
+    first_refs = parser.parse(first).image_refs
+    second_refs = parser.parse(second).image_refs
+
+    assert first_refs[0].resolved_path.parent != second_refs[0].resolved_path.parent
+    assert first_refs[0].resolved_path.parent.name.startswith("report-")
+    assert all(ref.resolved_path.exists() for ref in first_refs + second_refs)
+
+
+def test_pdf_parser_recovers_structure_from_font_sizes(tmp_path):
+    """测试按字号分布识别标题并合并折行"""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((50, 60), "年度报告", fontname="china-s", fontsize=24)
+    page.insert_text((50, 110), "第一章 概述", fontname="china-s", fontsize=16)
+    page.insert_text((50, 150), "这是正文的第一行\n紧接着的第二行", fontname="china-s", fontsize=11)
+    page.insert_text((50, 220), "Wrapped English\nparagraph text", fontsize=11)
+    page.insert_text(
+        (50, 290), "更多正文内容用于统计正文字号的分布情况", fontname="china-s", fontsize=11
+    )
+    doc.save(tmp_path / "report.pdf")
+    doc.close()
+
+    result = PDFParser(image_dir=tmp_path / "images").parse(tmp_path / "report.pdf")
+    content = result.content
+
+    assert result.title == "年度报告"
+    assert "<h1>年度报告</h1>" in content
+    assert "<h2>第一章 概述</h2>" in content
+    assert "<p>这是正文的第一行紧接着的第二行</p>" in content
+    assert "<p>Wrapped English paragraph text</p>" in content
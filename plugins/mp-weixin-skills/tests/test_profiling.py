@@ -0,0 +1,105 @@
+"""测试性能剖析"""
+
+import cProfile
+import pstats
+import tracemalloc
+
+from click.testing import CliRunner
+
+import cli
+from utils.logger import ContextThreadPoolExecutor
+from utils.profiling import Profiler, collapse_stats
+from utils.timing import Timings, span
+
+
+def _leaf():
+    return sum(i * i for i in range(20000))
+
+
+def _parent():
+    return _leaf() + _leaf()
+
+
+def test_collapse_stats_builds_call_stacks():
+    profile = cProfile.Profile()
+    profile.enable()
+    _parent()
+    profile.disable()
+
+    stacks = collapse_stats(pstats.Stats(profile))
+
+    leaf_stacks = [
+        stack for stack in stacks if stack.split(";")[-1].startswith("test_profiling:_leaf")
+    ]
+    assert leaf_stacks
+    assert all("test_profiling:_parent" in stack for stack in leaf_stacks)
+    assert all(value > 0 for value in stacks.values())
+
+
+def test_profiler_includes_worker_threads(tmp_path):
+    profiler = Profiler(top=10)
+    profiler.start()
+    with ContextThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda _: _parent(), range(2)))
+    report = profiler.write(tmp_path / "threads")
+
+    stats = pstats.Stats(str(report.pstats_path))
+    assert any(name == "_leaf" for _, _, name in stats.stats)
+    assert "test_profiling:_leaf" in report.collapsed_path.read_text(encoding="utf-8")
+
+
+def test_span_records_memory_peak_when_tracing(monkeypatch):
+    timings = Timings()
+    monkeypatch.setattr("utils.timing._timings", timings)
+
+    tracemalloc.start()
+    try:
+        with span("alloc"):
+            data = [bytes(1024) for _ in range(1024)]
+            del data
+    finally:
+        tracemalloc.stop()
+
+    assert timings.spans[0].attrs["mem_peak_kb"] >= 1024
+
+
+def _article(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    article = tmp_path / "article.md"
+    article.write_text("# 标题\n\n正文\n", encoding="utf-8")
+    return str(article)
+
+
+def test_cli_profile_writes_pstats_and_collapsed(tmp_path, monkeypatch):
+    article = _article(tmp_path, monkeypatch)
+    base = tmp_path / "prof" / "run"
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "--env",
+            "missing.env",
+            "--profile",
+            str(base),
+            "--profile-top",
+            "3",
+            "publish",
+            article,
+            "--no-api",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "prof" / "run.pstats").exists()
+    assert (tmp_path / "prof" / "run.collapsed").exists()
+    assert "累计耗时最高的 3 个函数" in result.output
+
+
+def test_cli_profile_without_path_before_subcommand(tmp_path, monkeypatch):
+    article = _article(tmp_path, monkeypatch)
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path / "output"))
+    result = CliRunner().invoke(
+        cli.main, ["--env", "missing.env", "--profile", "publish", article, "--no-api"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert list((tmp_path / "output" / "profile").glob("publish-*.pstats"))
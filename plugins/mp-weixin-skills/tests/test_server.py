@@ -0,0 +1,142 @@
+"""测试常驻发布服务的任务接口"""
+
+import http.client
+import json
+import socket
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from mock_wechat import MockWechatServer  # noqa: E402
+
+from config import AppConfig
+from publisher import Publisher
+from server import JobManager, create_server
+from wechat import WechatApiClient, WechatConfig
+
+
+def _config(tmp_path: Path) -> AppConfig:
+    return AppConfig(
+        wechat_app_id="wx-mock",
+        wechat_app_secret="mock-secret",
+        output_dir=tmp_path / "output",
+        temp_dir=tmp_path / "temp",
+        cache_dir=tmp_path / "cache",
+    )
+
+
+def _request(server, method: str, path: str, body=None):
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request(method, path, body=json.dumps(body) if body is not None else None)
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response.status, data
+
+
+@pytest.fixture
+def article(tmp_path):
+    path = tmp_path / "article.md"
+    path.write_text("# 服务测试\n\n正文内容\n", encoding="utf-8")
+    return path
+
+
+def test_publish_job_against_mock_api(tmp_path, article):
+    with MockWechatServer() as mock:
+        client = WechatApiClient(WechatConfig("wx-mock", "mock-secret", base_url=mock.base_url))
+        manager = JobManager(Publisher(_config(tmp_path), client), workers=2)
+        server = create_server(manager, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            status, data = _request(
+                server, "POST", "/jobs", {"type": "publish", "file": str(article), "wait": 30}
+            )
+            job = json.loads(data)
+            assert status == 200, job
+            assert job["status"] == "succeeded", job
+            assert job["result"]["title"] == "服务测试"
+            assert job["result"]["media_id"] in mock.state.drafts
+
+            status, data = _request(server, "GET", f"/jobs/{job['id']}")
+            assert status == 200
+            assert json.loads(data)["status"] == "succeeded"
+
+            # 第二个任务复用同一个 access_token
+            _request(server, "POST", "/jobs", {"type": "publish", "file": str(article), "wait": 30})
+            assert mock.state.calls["token"] == 1
+
+            status, data = _request(server, "GET", "/metrics")
+            assert status == 200
+            assert b'mp_weixin_jobs_total{type="publish",status="succeeded"}' in data
+        finally:
+            server.shutdown()
+            server.server_close()
+            manager.shutdown()
+            client.close()
+
+
+def test_invalid_job_returns_400(tmp_path):
+    manager = JobManager(Publisher(_config(tmp_path)), workers=1, root=tmp_path)
+    server = create_server(manager, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        status, data = _request(
+            server, "POST", "/jobs", {"type": "publish", "file": "/etc/hostname"}
+        )
+        assert status == 400
+        assert "不在允许的目录中" in json.loads(data)["error"]
+
+        status, _ = _request(server, "POST", "/jobs", {"type": "delete", "file": "x"})
+        assert status == 400
+
+        # wait 不合法时不提交任务
+        article = tmp_path / "a.md"
+        article.write_text("# 标题\n", encoding="utf-8")
+        body = {"file": str(article), "no_api": True, "wait": "soon"}
+        status, data = _request(server, "POST", "/jobs", body)
+        assert status == 400
+        assert "wait" in json.loads(data)["error"]
+        assert manager.list() == []
+
+        status, _ = _request(server, "GET", "/jobs/missing")
+        assert status == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+        manager.shutdown()
+
+
+def test_unix_socket_server(tmp_path, article):
+    manager = JobManager(Publisher(_config(tmp_path)), workers=1)
+    socket_path = tmp_path / "mp.sock"
+    server = create_server(manager, socket_path=socket_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        body = json.dumps({"file": str(article), "no_api": True, "wait": 30}).encode("utf-8")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(socket_path))
+            client.sendall(
+                b"POST /jobs HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            response = b""
+            while chunk := client.recv(65536):
+                response += chunk
+
+        head, _, payload = response.partition(b"\r\n\r\n")
+        assert head.startswith(b"HTTP/1.1 200")
+        job = json.loads(payload)
+        assert job["status"] == "succeeded", job
+        assert Path(job["result"]["html_path"]).exists()
+    finally:
+        server.shutdown()
+        server.server_close()
+        manager.shutdown()
+
+    assert not socket_path.exists()
@@ -46,3 +46,15 @@ def test_template_cover_generator_theme_color():
 
     assert result.image_path.exists()
     assert result.metadata.get("theme_color") == "#ff0000"
+
+
+def test_template_cover_generator_long_title():
+    """测试长标题自动换行"""
+    generator = TemplateCoverGenerator()
+    title = "一篇标题非常长的文章：介绍如何将 Markdown 文档转换为微信公众号格式并自动发布到草稿箱"
+
+    result = generator.generate(title, "")
+
+    assert result.image_path.exists()
+    assert len(result.metadata["title_lines"]) > 1
+    assert "".join(result.metadata["title_lines"]).replace(" ", "").startswith("一篇标题")
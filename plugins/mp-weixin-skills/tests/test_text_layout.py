@@ -0,0 +1,95 @@
+"""测试封面文字排版"""
+
+from PIL import ImageFont
+
+from covers.text_layout import ELLIPSIS, GlyphMetricsCache, TextLayout
+
+
+class FixedWidthFont:
+    """每个字符宽度固定的测试字体"""
+
+    path = "fixed"
+    size = 10
+
+    def __init__(self):
+        self.calls = 0
+
+    def getlength(self, text):
+        self.calls += 1
+        return 10.0 * len(text)
+
+
+def test_glyph_metrics_cached_per_glyph():
+    """测试每个字形只测量一次"""
+    font = FixedWidthFont()
+    metrics = GlyphMetricsCache()
+
+    assert metrics.text_width(font, "标题标题") == 40.0
+    assert metrics.text_width(font, "标题") == 20.0
+    assert font.calls == 2
+
+
+def test_glyph_metrics_skips_unidentifiable_fonts():
+    """测试无法可靠标识的字体（如内存中的默认字体）不进入共享缓存"""
+    metrics = GlyphMetricsCache()
+    font = ImageFont.load_default()
+
+    assert metrics.font_key(font) is None
+    metrics.text_width(font, "ab")
+    assert metrics._tables == {}
+
+
+def test_wrap_cjk_breaks_between_characters():
+    """测试中文可在任意字间换行"""
+    layout = TextLayout()
+
+    lines = layout.wrap("微信公众号文章发布工具", FixedWidthFont(), 50)
+
+    assert lines == ["微信公众号", "文章发布工", "具"]
+
+
+def test_wrap_keeps_latin_words_and_punctuation():
+    """测试英文单词不拆分，标点不出现在行首"""
+    layout = TextLayout()
+
+    lines = layout.wrap("使用Python发布，简单", FixedWidthFont(), 80)
+
+    assert "Python" in "".join(lines)
+    assert all(not line.startswith("，") for line in lines)
+    assert any("Python" in line for line in lines)
+
+
+def test_fit_reduces_font_size():
+    """测试字号自适应"""
+    layout = TextLayout()
+
+    result = layout.fit(
+        "一个非常非常长的中文标题用来测试自动换行和字号自适应功能是否正常",
+        lambda size: ImageFont.load_default(size),
+        max_width=400,
+        max_lines=3,
+        max_size=40,
+        min_size=20,
+    )
+
+    assert len(result.lines) <= 3
+    assert result.font_size <= 40
+    assert all(width <= 400 for width in result.line_widths)
+
+
+def test_fit_truncates_with_ellipsis():
+    """测试最小字号仍放不下时截断"""
+    layout = TextLayout()
+
+    result = layout.fit(
+        "很长" * 50,
+        lambda size: FixedWidthFont(),
+        max_width=100,
+        max_lines=2,
+        max_size=10,
+        min_size=10,
+    )
+
+    assert result.truncated is True
+    assert len(result.lines) == 2
+    assert result.lines[-1].endswith(ELLIPSIS)
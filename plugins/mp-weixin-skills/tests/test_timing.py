@@ -0,0 +1,54 @@
+"""测试阶段计时"""
+
+import json
+
+import pytest
+
+from utils.timing import Timings, get_timings, span, timed
+
+
+def test_span_records_attrs_and_errors():
+    """测试 span 记录属性，异常时标记错误并继续抛出"""
+    timings = get_timings()
+    timings.reset()
+
+    with span("upload", media_type="image") as attrs:
+        attrs["bytes"] = 10
+    with pytest.raises(ValueError):
+        with span("upload"):
+            raise ValueError("boom")
+
+    spans = timings.spans
+    assert spans[0].attrs == {"media_type": "image", "bytes": 10}
+    assert spans[1].error == "ValueError"
+    stage = timings.stages()[0]
+    assert (stage.name, stage.count, stage.errors) == ("upload", 2, 1)
+
+
+def test_timed_decorator_and_json_report(tmp_path):
+    """测试装饰器计时并写出 JSON 报告"""
+    timings = get_timings()
+    timings.reset()
+
+    @timed("build")
+    def build(value):
+        return value * 2
+
+    assert build(2) == 4
+    timings.write_json(tmp_path / "timings.json", command="publish")
+
+    report = json.loads((tmp_path / "timings.json").read_text(encoding="utf-8"))
+    assert report["command"] == "publish"
+    assert report["stages"][0]["name"] == "build"
+    assert report["stages"][0]["count"] == 1
+    assert "build" in timings.format_table()
+
+
+def test_stages_keep_first_seen_order():
+    """测试汇总保持阶段首次出现的顺序"""
+    timings = Timings()
+    for name in ("parse", "build", "parse"):
+        timings.record(name, 0.0, 1.0)
+
+    assert [s.name for s in timings.stages()] == ["parse", "build"]
+    assert timings.stages()[0].total_ms == 2.0
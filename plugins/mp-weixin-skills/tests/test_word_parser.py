@@ -0,0 +1,190 @@
+"""测试 Word 解析器"""
+
+import io
+
+from docx import Document
+from PIL import Image
+
+from parsers.word import WordParser
+from utils.image_extractor import ImageExtractor
+from utils.image_pipeline import ImagePipeline
+from utils.image_processor import ImageProcessor
+
+
+def _png_bytes(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (20, 20), color).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def _make_docx(path):
+    doc = Document()
+    doc.add_heading("Word 图片测试", level=1)
+    doc.add_paragraph("第一段")
+    doc.add_picture(_png_bytes("red"))
+    doc.add_paragraph("第二段")
+    doc.add_picture(_png_bytes("blue"))
+    doc.add_picture(_png_bytes("red"))
+    doc.save(path)
+    return path
+
+
+class StreamingApiClient:
+    """记录流式上传内容的假 API 客户端"""
+
+    def __init__(self):
+        self.uploads = []
+
+    def upload_media(self, file_path, media_type="image", fileobj=None):
+        self.uploads.append((file_path, fileobj.read()))
+        return {"media_id": "m", "url": f"https://mmbiz.qpic.cn/{len(self.uploads)}"}
+
+
+def test_word_parser_extracts_embedded_images(tmp_path):
+    """测试提取内嵌图片并按位置插入"""
+    source = _make_docx(tmp_path / "article.docx")
+
+    result = WordParser().parse(source)
+    refs = result.image_refs
+
+    assert len(refs) == 3
+    assert all(ref.kind == "embedded" for ref in refs)
+    assert refs[0].part_name.startswith("word/media/")
+    assert refs[0].src == refs[2].src
+    assert refs[0].src != refs[1].src
+    assert result.content.index("第二段") < result.content.index(f'<img src="{refs[1].src}"')
+
+
+def test_word_images_stream_from_package(tmp_path):
+    """测试内嵌图片直接从 .docx 包中流式上传"""
+    source = _make_docx(tmp_path / "article.docx")
+    parsed = WordParser().parse(source)
+
+    api_client = StreamingApiClient()
+    extractor = ImageExtractor(tmp_path / "temp")
+    images = extractor.extract_from_refs(parsed.image_refs)
+    pipeline = ImagePipeline(extractor, ImageProcessor(api_client, tmp_path / "temp"))
+
+    html = pipeline.run(parsed.content, images)
+    extractor.close()
+
+    assert len(api_client.uploads) == 2
+    assert api_client.uploads[0][1][:4] == b"\x89PNG"
+    assert "word/media" not in html
+    assert list((tmp_path / "temp").iterdir()) == []
+
+
+def test_open_embedded_owns_package(tmp_path):
+    """测试内嵌图片流持有文档包，关闭流时一并关闭"""
+    source = _make_docx(tmp_path / "article.docx")
+    ref = WordParser().parse(source).image_refs[0]
+    image_info = {"container": str(source), "part_name": ref.part_name}
+
+    with ImageExtractor.open_embedded(image_info) as stream:
+        data = stream.read()
+        assert stream.size == len(data)
+        stream.seek(0)
+        assert stream.read(4) == b"\x89PNG"
+        package = stream._package
+
+    assert stream.closed
+    assert package.fp is None
+
+
+def test_word_parser_converts_structure(tmp_path):
+    """测试行内格式、超链接、列表和表格转换为 HTML"""
+    from docx.opc.constants import RELATIONSHIP_TYPE
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    doc = Document()
+    doc.add_heading("结构测试", level=1)
+    doc.add_heading("小节", level=2)
+
+    para = doc.add_paragraph("普通")
+    para.add_run("加粗").bold = True
+    para.add_run("斜体").italic = True
+    r_id = para.part.relate_to(
+        "https://example.com/a?b=1&c=2", RELATIONSHIP_TYPE.HYPERLINK, is_external=True
+    )
+    link = OxmlElement("w:hyperlink")
+    link.set(qn("r:id"), r_id)
+    run = OxmlElement("w:r")
+    text = OxmlElement("w:t")
+    text.text = "链接"
+    run.append(text)
+    link.append(run)
+    para._p.append(link)
+
+    doc.add_paragraph("要点一", style="List Bullet")
+    doc.add_paragraph("要点二", style="List Bullet 2")
+    doc.add_paragraph("步骤", style="List Number")
+
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "名称"
+    table.cell(1, 0).text = "a < b"
+    doc.save(tmp_path / "structure.docx")
+
+    result = WordParser().parse(tmp_path / "structure.docx")
+    content = result.content.replace("\n", "")
+
+    assert result.title == "结构测试"
+    assert "<h1>结构测试</h1>" in content
+    assert "<h2>小节</h2>" in content
+    assert "<p>普通<strong>加粗</strong><em>斜体</em>" in content
+    assert '<a href="https://example.com/a?b=1&amp;c=2">链接</a>' in content
+    assert "<ul><li>要点一<ul><li>要点二</li></ul></li></ul>" in content
+    assert "<ol><li>步骤</li></ol>" in content
+    assert "<th>名称</th>" in content
+    assert "<td>a &lt; b</td>" in content
+    assert content.index("</ol>") < content.index("<table>")
+
+
+def test_word_parser_ignores_non_list_styles(tmp_path):
+    """测试 List Paragraph 等非列表样式及 numId 为 0 的段落按普通段落输出"""
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    doc = Document()
+    doc.add_paragraph("缩进正文", style="List Paragraph")
+    doc.add_paragraph("续写正文", style="List Continue")
+    para = doc.add_paragraph("取消编号", style="List Number")
+    num_pr = OxmlElement("w:numPr")
+    num_id = OxmlElement("w:numId")
+    num_id.set(qn("w:val"), "0")
+    num_pr.append(num_id)
+    para._p.get_or_add_pPr().append(num_pr)
+    doc.save(tmp_path / "lists.docx")
+
+    content = WordParser().parse(tmp_path / "lists.docx").content
+
+    assert "<li>" not in content
+    assert "<p>缩进正文</p>" in content
+    assert "<p>续写正文</p>" in content
+    assert "<p>取消编号</p>" in content
+
+
+def test_stream_reader_releases_processed_blocks(tmp_path):
+    """测试流式读取时已处理的块被清除"""
+    from parsers.docx_stream import DocxStreamReader
+
+    doc = Document()
+    for i in range(20):
+        doc.add_paragraph(f"段落 {i}")
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "单元格"
+    doc.save(tmp_path / "long.docx")
+
+    texts = []
+    with DocxStreamReader(tmp_path / "long.docx") as reader:
+        for block in reader.iter_blocks():
+            texts.append("".join(block.itertext()))
+            previous = block.getprevious()
+            if previous is not None:
+                # 只保留上一个已清空的块
+                assert len(previous) == 0
+                assert previous.getprevious() is None
+
+    assert texts[0] == "段落 0"
+    assert texts[-1] == "单元格"
+    assert len(texts) == 21